@@ -0,0 +1,95 @@
+"""
+Prefix lookups of SiteProfiles for autocompleting addresses.
+
+Prefixes are matched against the `*_normalized` columns, which have the "C"
+collation and are backed by indexes on `(organization_uuid, <column>)`, and the
+results of the hottest organizations are kept in an in-process LRU cache.
+Every column is looked up in the order of its index, so that a lookup reads
+at most `limit` index entries even for a short prefix.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.db.models import F, Value
+
+from .filters import Normalize
+
+FIELDS = ('name', 'address_line1', 'postcode', 'city')
+VALUES = ('uuid',) + FIELDS
+MIN_PREFIX_LENGTH = 2
+
+CACHE_MAX_ORGANIZATIONS = 100
+CACHE_MAX_PREFIXES = 1000
+CACHE_TIMEOUT = 60
+
+
+def search(queryset, prefix, limit):
+    """
+    Return dicts with the `VALUES` of at most `limit` SiteProfiles of the
+    queryset having a field of `FIELDS` starting with the prefix, ignoring
+    case, accents and repeated whitespace, ordered by name.
+
+    The candidates are the UNION of the first `limit` matches of every field
+    in the order of its index, so the lookups stop early instead of sorting
+    all matches of the prefix.
+    """
+    prefix = Normalize(Value(prefix))
+    lookups = [queryset.filter(**{f'{field}_normalized__startswith': prefix}).order_by(
+        F(f'{field}_normalized').asc()).values(*VALUES)[:limit] for field in FIELDS]
+    return list(lookups[0].union(*lookups[1:]).order_by('name', 'uuid')[:limit])
+
+
+class PrefixCache(object):
+    """
+    Thread-safe LRU cache of autocomplete results by organization and
+    prefix. At most `max_organizations` organizations are kept, each with at
+    most `max_prefixes` entries; the least recently used ones are evicted
+    first. Entries expire after `timeout` seconds, so results written by
+    other processes show up eventually.
+    """
+
+    def __init__(self, max_organizations=CACHE_MAX_ORGANIZATIONS, max_prefixes=CACHE_MAX_PREFIXES,
+                 timeout=CACHE_TIMEOUT):
+        self.max_organizations = max_organizations
+        self.max_prefixes = max_prefixes
+        self.timeout = timeout
+        self._organizations = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, organization_uuid, key):
+        with self._lock:
+            entries = self._organizations.get(organization_uuid)
+            if entries is None or key not in entries:
+                return None
+            self._organizations.move_to_end(organization_uuid)
+            expires, value = entries[key]
+            if expires < time.monotonic():
+                del entries[key]
+                return None
+            entries.move_to_end(key)
+            return value
+
+    def set(self, organization_uuid, key, value):
+        with self._lock:
+            entries = self._organizations.get(organization_uuid)
+            if entries is None:
+                entries = self._organizations[organization_uuid] = OrderedDict()
+                while len(self._organizations) > self.max_organizations:
+                    self._organizations.popitem(last=False)
+            self._organizations.move_to_end(organization_uuid)
+            entries[key] = (time.monotonic() + self.timeout, value)
+            entries.move_to_end(key)
+            while len(entries) > self.max_prefixes:
+                entries.popitem(last=False)
+
+    def invalidate(self, organization_uuid):
+        with self._lock:
+            self._organizations.pop(organization_uuid, None)
+
+    def clear(self):
+        with self._lock:
+            self._organizations.clear()
+
+
+cache = PrefixCache()
@@ -0,0 +1,678 @@
+"""
+Benchmark scenarios for the query paths of the location service.
+
+Run them with `python manage.py benchmark <scenario> --rows 10000 100000`.
+Every scenario seeds a fresh organization with random SiteProfiles; the
+management command rolls the whole run back afterwards.
+"""
+import json
+import random
+import statistics
+import time
+import uuid
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.test.utils import override_settings
+from rest_framework import renderers as drf_renderers
+from rest_framework.test import APIRequestFactory
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import geo, tiles as vector_tiles
+from .autocomplete import cache as autocomplete_cache
+from .filters import SiteProfileFilter
+from .models import ProfileType, SiteProfile, WorkflowLevel2Membership
+from .pagination import KeysetPagination
+from .renderers import JSONRenderer, MessagePackRenderer
+from .rows import RowSerializer
+from .serializers import SiteProfileClusterSerializer, SiteProfileMarkerSerializer, SiteProfileSerializer
+from .views import SiteProfileViewSet
+
+SCENARIOS = {}
+
+SEED_BATCH_SIZE = 5000
+
+
+def scenario(name, scratch_database_only=False):
+    """
+    Register a benchmark function under the given name. Scenarios that lock
+    or change the schema are `scratch_database_only`.
+    """
+    def decorator(func):
+        func.scratch_database_only = scratch_database_only
+        SCENARIOS[name] = func
+        return func
+    return decorator
+
+
+class Seeder(object):
+    """Grows the SiteProfile table of one organization to a target size."""
+
+    def __init__(self, organization_uuid=None, seed=42):
+        self.organization_uuid = organization_uuid or uuid.uuid4()
+        self.random = random.Random(seed)  # nosec
+        self.rows = 0
+
+    def make_siteprofile(self, index):
+        return SiteProfile(
+            organization_uuid=self.organization_uuid,
+            name=f'Site {index}',
+            address_line1=f'Street {self.random.randint(1, 5000)}',
+            postcode=str(self.random.randint(10000, 99999)),
+            city=self.random.choice(('Berlin', 'Madrid', 'London', 'Paris', 'Roma', 'Wien')),
+            country=self.random.choice(('DE', 'ES', 'GB', 'FR', 'IT', 'AT')),
+            latitude=round(self.random.uniform(-60, 70), 6),
+            longitude=round(self.random.uniform(-180, 180), 6),
+            workflowlevel2_uuid=[str(uuid.uuid4())],
+        )
+
+    def grow(self, rows):
+        while self.rows < rows:
+            batch = min(SEED_BATCH_SIZE, rows - self.rows)
+            SiteProfile.objects.bulk_create(
+                [self.make_siteprofile(self.rows + i) for i in range(batch)])
+            self.rows += batch
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE location_siteprofile')
+
+
+def measure(func, repeat):
+    """Median wall time of `func` in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def list_view(organization_uuid, action='list', method='get'):
+    """Return a function calling a SiteProfileViewSet action as the given organization."""
+    # Extra actions are built with their initkwargs (e.g. renderer_classes), as the router does.
+    view = SiteProfileViewSet.as_view({method: action}, **getattr(getattr(SiteProfileViewSet, action), 'kwargs', {}))
+    factory = APIRequestFactory()
+
+    def call(query='', data=None, **kwargs):
+        request = getattr(factory, method)(query, data, format='json')
+        request.session = {'jwt_organization_uuid': str(organization_uuid)}
+        return view(request, **kwargs)
+    return call
+
+
+def write_table(stdout, headers, rows):
+    widths = [max(len(str(value)) for value in column) for column in zip(headers, *rows)]
+    for row in [headers] + rows:
+        stdout.write('  '.join(str(value).rjust(width) for value, width in zip(row, widths)))
+
+
+@scenario('radius')
+def radius(stdout, rows, repeat):
+    """Radius search: full scan filtered in Python vs. the `near` filter."""
+    seeder = Seeder()
+    latitude, longitude, radius_km = 48.8566, 2.3522, 500
+    queryset = SiteProfile.objects.filter(organization_uuid=seeder.organization_uuid)
+
+    def full_scan():
+        return [siteprofile for siteprofile in queryset.all()
+                if geo.haversine_km(latitude, longitude,
+                                    float(siteprofile.latitude), float(siteprofile.longitude)) <= radius_km]
+
+    def indexed():
+        return list(SiteProfileFilter(
+            {'near': f'{latitude},{longitude}', 'radius_km': radius_km}, queryset=queryset).qs)
+
+    results = []
+    for size in rows:
+        seeder.grow(size)
+        full_scan_ms, indexed_ms = measure(full_scan, repeat), measure(indexed, repeat)
+        results.append((size, len(indexed()), f'{full_scan_ms:.2f}', f'{indexed_ms:.2f}',
+                        f'{full_scan_ms / indexed_ms:.1f}x'))
+    write_table(stdout, ('rows', 'matches', 'full_scan_ms', 'indexed_ms', 'speedup'), results)
+
+
+@scenario('nearest')
+def nearest(stdout, rows, repeat):
+    """k nearest SiteProfiles: sorting the whole organization vs. expanding rings."""
+    seeder = Seeder()
+    latitude, longitude, k = 48.8566, 2.3522, 10
+    queryset = SiteProfile.objects.filter(organization_uuid=seeder.organization_uuid)
+
+    def sort_all():
+        return sorted(queryset.all(), key=lambda siteprofile: geo.haversine_km(
+            latitude, longitude, float(siteprofile.latitude), float(siteprofile.longitude)))[:k]
+
+    def rings():
+        return list(geo.nearest(queryset, latitude, longitude, k))
+
+    results = []
+    for size in rows:
+        seeder.grow(size)
+        sort_all_ms, rings_ms = measure(sort_all, repeat), measure(rings, repeat)
+        results.append((size, f'{sort_all_ms:.2f}', f'{rings_ms:.2f}', f'{sort_all_ms / rings_ms:.1f}x'))
+    write_table(stdout, ('rows', 'sort_all_ms', 'rings_ms', 'speedup'), results)
+
+
+@scenario('bbox')
+def bbox(stdout, rows, repeat):
+    """Viewport query: full SiteProfiles filtered in Python vs. `bbox` filter with marker fields."""
+    seeder = Seeder()
+    min_longitude, min_latitude, max_longitude, max_latitude = -10.0, 35.0, 30.0, 60.0
+    queryset = SiteProfile.objects.filter(organization_uuid=seeder.organization_uuid)
+
+    def full_scan():
+        return SiteProfileSerializer([
+            siteprofile for siteprofile in queryset.all()
+            if min_latitude <= siteprofile.latitude <= max_latitude and
+            min_longitude <= siteprofile.longitude <= max_longitude], many=True).data
+
+    def markers():
+        filtered = SiteProfileFilter(
+            {'bbox': f'{min_longitude},{min_latitude},{max_longitude},{max_latitude}'}, queryset=queryset).qs
+        return SiteProfileMarkerSerializer(
+            filtered.only('uuid', 'name', 'latitude', 'longitude', 'profiletype'), many=True).data
+
+    results = []
+    for size in rows:
+        seeder.grow(size)
+        full_scan_ms, markers_ms = measure(full_scan, repeat), measure(markers, repeat)
+        results.append((size, len(markers()), f'{full_scan_ms:.2f}', f'{markers_ms:.2f}',
+                        f'{full_scan_ms / markers_ms:.1f}x'))
+    write_table(stdout, ('rows', 'matches', 'full_scan_ms', 'markers_ms', 'speedup'), results)
+
+
+@scenario('clusters')
+def clusters(stdout, rows, repeat):
+    """Zoomed-out map: marker list for client-side clustering vs. clusters built in the database."""
+    seeder = Seeder()
+    zoom = 3
+    queryset = SiteProfile.objects.filter(organization_uuid=seeder.organization_uuid)
+
+    def markers():
+        return json.dumps(SiteProfileMarkerSerializer(
+            queryset.only('uuid', 'name', 'latitude', 'longitude', 'profiletype'), many=True).data, cls=JSONEncoder)
+
+    def database_clusters():
+        return json.dumps(SiteProfileClusterSerializer(geo.clusters(queryset, zoom), many=True).data)
+
+    results = []
+    for size in rows:
+        seeder.grow(size)
+        markers_ms, clusters_ms = measure(markers, repeat), measure(database_clusters, repeat)
+        results.append((size, f'{markers_ms:.2f}', f'{clusters_ms:.2f}',
+                        f'{len(markers()) // 1024}', f'{len(database_clusters()) // 1024}'))
+    write_table(stdout, ('rows', 'markers_ms', 'clusters_ms', 'markers_kb', 'clusters_kb'), results)
+
+
+@scenario('tiles')
+def tiles(stdout, rows, repeat):
+    """Vector tiles: throughput of the tile endpoint and of the encoder alone, over all tiles of a zoom level."""
+    seeder = Seeder()
+    zoom = 3
+    coordinates = [(x, y) for x in range(2 ** zoom) for y in range(2 ** zoom)]
+    view = list_view(seeder.organization_uuid, 'tiles')
+
+    def endpoint():
+        for x, y in coordinates:
+            view(z=str(zoom), x=str(x), y=str(y))
+
+    def load_points():
+        return [(float(longitude), float(latitude), {'id': str(uuid), 'name': name, 'profiletype': profiletype})
+                for uuid, name, profiletype, latitude, longitude in SiteProfile.objects.filter(
+                    organization_uuid=seeder.organization_uuid).values_list(
+                    'uuid', 'name', 'profiletype', 'latitude', 'longitude')]
+
+    def encoder():
+        vector_tiles.encode_points('siteprofiles', points, 0, 0, 0)
+
+    results = []
+    for size in rows:
+        seeder.grow(size)
+        points = load_points()
+        endpoint_ms, encoder_ms = measure(endpoint, repeat), measure(encoder, repeat)
+        results.append((size, len(coordinates), f'{len(coordinates) / endpoint_ms * 1000:.1f}',
+                        f'{size / encoder_ms * 1000:.0f}'))
+    write_table(stdout, ('rows', 'tiles', 'endpoint_tiles_per_s', 'encoder_points_per_s'), results)
+
+
+@scenario('pagination')
+def pagination(stdout, rows, repeat):
+    """Last page of the list: limit/offset vs. keyset pagination."""
+    seeder = Seeder()
+    limit = 50
+    view = list_view(seeder.organization_uuid)
+    paginator = KeysetPagination()
+    paginator.ordering = ('name', 'uuid')
+
+    results = []
+    for size in rows:
+        seeder.grow(size)
+        offset = max(size - limit, 0)
+        last_row = SiteProfile.objects.filter(
+            organization_uuid=seeder.organization_uuid).order_by(*paginator.ordering)[max(offset - 1, 0)]
+        cursor = paginator.encode_cursor(paginator.get_position(last_row))
+        offset_ms = measure(lambda: view(f'?limit={limit}&offset={offset}'), repeat)
+        cursor_ms = measure(lambda: view(f'?limit={limit}&cursor={cursor}'), repeat)
+        results.append((size, f'{offset_ms:.2f}', f'{cursor_ms:.2f}', f'{offset_ms / cursor_ms:.1f}x'))
+    write_table(stdout, ('rows', 'offset_ms', 'cursor_ms', 'speedup'), results)
+
+
+@scenario('count')
+def count(stdout, rows, repeat):
+    """First page of the list with an exact, estimated or no count, unfiltered and filtered."""
+    seeder = Seeder()
+    view = list_view(seeder.organization_uuid)
+
+    results = []
+    for size in rows:
+        seeder.grow(size)
+        for query in ('', '&search=Berlin'):
+            timings = [measure(lambda: view(f'?count={mode}{query}'), repeat) for mode in ('true', 'estimate', 'false')]
+            results.append((size, query or '-', *(f'{timing:.2f}' for timing in timings)))
+    write_table(stdout, ('rows', 'filter', 'exact_ms', 'estimate_ms', 'no_count_ms'), results)
+
+
+@scenario('bulk_create')
+def bulk_create(stdout, rows, repeat):
+    """Importing SiteProfiles: one POST per SiteProfile vs. the bulk endpoint. `--rows` is the import size."""
+    seeder = Seeder()
+    profiletype = ProfileType.objects.create(name='Benchmark', organization_uuid=seeder.organization_uuid)
+    create = list_view(seeder.organization_uuid, 'create', 'post')
+    bulk = list_view(seeder.organization_uuid, 'bulk', 'post')
+    single_rows = 500
+
+    def make_rows(size):
+        return [dict(SiteProfileSerializer(seeder.make_siteprofile(index)).data, profiletype=profiletype.pk)
+                for index in range(size)]
+
+    results = []
+    for size in rows:
+        data = make_rows(size)
+        single_ms = measure(lambda: [create(data=row) for row in data[:single_rows]], repeat)
+        bulk_ms = measure(lambda: bulk(data=data), repeat)
+        results.append((size, f'{min(size, single_rows) / single_ms * 1000:.0f}', f'{size / bulk_ms * 1000:.0f}'))
+    write_table(stdout, ('rows', 'single_rows_per_s', 'bulk_rows_per_s'), results)
+
+
+@scenario('upsert')
+def upsert(stdout, rows, repeat):
+    """Daily re-import through the upsert endpoint: first import, unchanged feed and feed with 1% changes."""
+    seeder = Seeder()
+    view = list_view(seeder.organization_uuid, 'upsert', 'post')
+
+    def make_rows(size):
+        return [dict(SiteProfileSerializer(seeder.make_siteprofile(index)).data, external_id=f'ext-{index}')
+                for index in range(size)]
+
+    def import_rows(data):
+        for start in range(0, len(data), SiteProfileViewSet.bulk_max_rows):
+            view(data=data[start:start + SiteProfileViewSet.bulk_max_rows])
+
+    results = []
+    for size in rows:
+        data = make_rows(size)
+        changed = [dict(row, notes='changed') if index % 100 == 0 else row for index, row in enumerate(data)]
+        SiteProfile.objects.filter(organization_uuid=seeder.organization_uuid).delete()
+        first_ms = measure(lambda: import_rows(data), 1)
+        unchanged_ms = measure(lambda: import_rows(data), repeat)
+        changed_ms = measure(lambda: (import_rows(changed), import_rows(data)), repeat) / 2
+        results.append((size, f'{size / first_ms * 1000:.0f}', f'{size / unchanged_ms * 1000:.0f}',
+                        f'{size / changed_ms * 1000:.0f}'))
+    write_table(stdout, ('rows', 'first_rows_per_s', 'unchanged_rows_per_s', 'changed_rows_per_s'), results)
+
+
+@scenario('bulk_update')
+def bulk_update(stdout, rows, repeat):
+    """Re-tagging all SiteProfiles: one PATCH per SiteProfile vs. a single bulk PATCH."""
+    seeder = Seeder()
+    profiletype = ProfileType.objects.create(name='Benchmark', organization_uuid=seeder.organization_uuid)
+    partial_update = list_view(seeder.organization_uuid, 'partial_update', 'patch')
+    bulk = list_view(seeder.organization_uuid, 'bulk_update', 'patch')
+    single_rows = 500
+    values = {'profiletype': profiletype.pk, 'name': 'Retagged'}
+
+    results = []
+    for size in rows:
+        seeder.grow(size)
+        uuids = list(SiteProfile.objects.filter(
+            organization_uuid=seeder.organization_uuid).values_list('uuid', flat=True)[:single_rows])
+        single_ms = measure(lambda: [partial_update(data=values, pk=uuid) for uuid in uuids], repeat)
+        bulk_ms = measure(lambda: bulk('?search=Street', data={'values': values}), repeat)
+        results.append((size, f'{len(uuids) / single_ms * 1000:.0f}', f'{size / bulk_ms * 1000:.0f}'))
+    write_table(stdout, ('rows', 'single_rows_per_s', 'bulk_rows_per_s'), results)
+
+
+@scenario('workflowlevel2')
+def workflowlevel2(stdout, rows, repeat):
+    """Attaching a WorkflowLevel2 to all SiteProfiles: read-modify-write per SiteProfile vs. one set-based update."""
+    seeder = Seeder()
+    view = list_view(seeder.organization_uuid, 'workflowlevel2', 'post')
+    queryset = SiteProfile.objects.filter(organization_uuid=seeder.organization_uuid)
+
+    def per_row(workflowlevel2_uuid):
+        for siteprofile in queryset.all():
+            siteprofile.workflowlevel2_uuid = (siteprofile.workflowlevel2_uuid or []) + [workflowlevel2_uuid]
+            siteprofile.save()
+
+    def set_based(workflowlevel2_uuid):
+        view('?search=Street', data={'workflowlevel2_uuid': workflowlevel2_uuid, 'operation': 'add'})
+
+    results = []
+    for size in rows:
+        seeder.grow(size)
+        per_row_ms = measure(lambda: per_row(str(uuid.uuid4())), repeat)
+        set_based_ms = measure(lambda: set_based(str(uuid.uuid4())), repeat)
+        results.append((size, f'{per_row_ms:.2f}', f'{set_based_ms:.2f}', f'{per_row_ms / set_based_ms:.1f}x'))
+    write_table(stdout, ('rows', 'per_row_ms', 'set_based_ms', 'speedup'), results)
+
+
+@scenario('workflowlevel2_filter')
+def workflowlevel2_filter(stdout, rows, repeat):
+    """`workflowlevel2_uuid` filter with 10, 100 and 1000 UUIDs: OR of `@>` clauses vs. a single `&&` overlap."""
+    seeder = Seeder()
+    queryset = SiteProfile.objects.filter(organization_uuid=seeder.organization_uuid)
+
+    def contains_chain(values):
+        params = Q()
+        for value in values:
+            params |= Q(workflowlevel2_uuid__contains=[value])
+        return list(queryset.filter(params).values_list('uuid', flat=True))
+
+    def overlap(values):
+        filtered = SiteProfileFilter({'workflowlevel2_uuid': ','.join(values)}, queryset=queryset).qs
+        return list(filtered.values_list('uuid', flat=True))
+
+    results = []
+    for size in rows:
+        seeder.grow(size)
+        existing = [values[0] for values in queryset.values_list('workflowlevel2_uuid', flat=True)[:1000]]
+        for count in (10, 100, 1000):
+            values = (existing + [str(uuid.uuid4()) for _ in range(count)])[:count]
+            contains_ms = measure(lambda: contains_chain(values), repeat)
+            overlap_ms = measure(lambda: overlap(values), repeat)
+            results.append((size, count, f'{contains_ms:.2f}', f'{overlap_ms:.2f}',
+                            f'{contains_ms / overlap_ms:.1f}x'))
+    write_table(stdout, ('rows', 'uuids', 'contains_or_ms', 'overlap_ms', 'speedup'), results)
+
+
+@scenario('batch_get')
+def batch_get(stdout, rows, repeat):
+    """Resolving 1000 SiteProfiles by UUID: `uuid` query parameter of the list vs. POST batch_get."""
+    seeder = Seeder()
+    view = list_view(seeder.organization_uuid)
+    batch_get_view = list_view(seeder.organization_uuid, 'batch_get', 'post')
+    count = 1000
+
+    results = []
+    for size in rows:
+        seeder.grow(size)
+        uuids = [str(uuid) for uuid in SiteProfile.objects.filter(
+            organization_uuid=seeder.organization_uuid).values_list('uuid', flat=True)[:count]]
+        query = f'?limit={count}&uuid={",".join(uuids)}'
+        query_ms = measure(lambda: view(query), repeat)
+        batch_get_ms = measure(lambda: batch_get_view(data=uuids), repeat)
+        results.append((size, len(uuids), len(query), f'{query_ms:.2f}', f'{batch_get_ms:.2f}'))
+    write_table(stdout, ('rows', 'uuids', 'url_length', 'query_ms', 'batch_get_ms'), results)
+
+
+@scenario('workflowlevel2_membership')
+def workflowlevel2_membership(stdout, rows, repeat):
+    """SiteProfiles of a WorkflowLevel2 and counts per WorkflowLevel2: GIN-indexed array vs. membership table."""
+    seeder = Seeder()
+    queryset = SiteProfile.objects.filter(organization_uuid=seeder.organization_uuid)
+    memberships = WorkflowLevel2Membership.objects.filter(organization_uuid=seeder.organization_uuid)
+
+    def array_counts():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT workflowlevel2.uuid, COUNT(*) '
+                           'FROM location_siteprofile, unnest(workflowlevel2_uuid) AS workflowlevel2(uuid) '
+                           'WHERE organization_uuid = %s GROUP BY workflowlevel2.uuid ORDER BY workflowlevel2.uuid '
+                           'LIMIT 50', [seeder.organization_uuid])
+            return cursor.fetchall()
+
+    def membership_counts():
+        return list(memberships.values('workflowlevel2_uuid').annotate(
+            count=Count('siteprofile')).order_by('workflowlevel2_uuid')[:50])
+
+    results = []
+    for size in rows:
+        seeder.grow(size)
+        workflowlevel2_uuid = queryset.values_list('workflowlevel2_uuid', flat=True).first()[0]
+        array_ms = measure(lambda: list(queryset.filter(workflowlevel2_uuid__contains=[workflowlevel2_uuid])), repeat)
+        membership_ms = measure(lambda: list(queryset.filter(
+            workflowlevel2_memberships__workflowlevel2_uuid=workflowlevel2_uuid)), repeat)
+        results.append((size, f'{array_ms:.2f}', f'{membership_ms:.2f}',
+                        f'{measure(array_counts, repeat):.2f}', f'{measure(membership_counts, repeat):.2f}'))
+    write_table(stdout, ('rows', 'array_lookup_ms', 'membership_lookup_ms', 'array_counts_ms',
+                         'membership_counts_ms'), results)
+
+
+@scenario('search', scratch_database_only=True)
+def search(stdout, rows, repeat):
+    """
+    `search` on the list with and without the trigram indexes. The indexes are
+    dropped inside the benchmark transaction, which locks the SiteProfile
+    table until the run is rolled back, so it only runs against a scratch
+    database.
+    """
+    seeder = Seeder()
+    view = list_view(seeder.organization_uuid)
+    queries = ('?search=Street 42', '?search=Berlin&count=false', '?search=Street 4&search_rank=true')
+
+    results = []
+    for size in rows:
+        seeder.grow(size)
+        with transaction.atomic():
+            indexed = [measure(lambda: view(query), repeat) for query in queries]
+            with connection.cursor() as cursor:
+                for field in SiteProfileViewSet.search_fields:
+                    cursor.execute(f'DROP INDEX location_siteprofile_{field}_normalized_trgm')
+            unindexed = [measure(lambda: view(query), repeat) for query in queries]
+            transaction.set_rollback(True)
+        for query, indexed_ms, unindexed_ms in zip(queries, indexed, unindexed):
+            results.append((size, query, f'{unindexed_ms:.2f}', f'{indexed_ms:.2f}',
+                            f'{unindexed_ms / indexed_ms:.1f}x'))
+    write_table(stdout, ('rows', 'query', 'unindexed_ms', 'trigram_ms', 'speedup'), results)
+
+
+@scenario('full_text')
+def full_text(stdout, rows, repeat):
+    """Searching all text fields: ILIKE over every field vs. the ranked `q` full-text search."""
+    seeder = Seeder()
+    view = list_view(seeder.organization_uuid)
+    queryset = SiteProfile.objects.filter(organization_uuid=seeder.organization_uuid)
+    text_fields = ('name', 'address_line1', 'address_line2', 'address_line3', 'address_line4', 'postcode', 'city',
+                   'administrative_level1', 'administrative_level2', 'administrative_level3',
+                   'administrative_level4', 'notes')
+
+    def ilike(text):
+        matches = Q()
+        for field in text_fields:
+            matches |= Q(**{f'{field}__icontains': text})
+        return list(queryset.filter(matches).order_by('name')[:50])
+
+    results = []
+    for size in rows:
+        seeder.grow(size)
+        for text in ('Berlin', 'Street 42'):
+            ilike_ms = measure(lambda: ilike(text), repeat)
+            full_text_ms = measure(lambda: view(f'?q={text}&count=false'), repeat)
+            results.append((size, text, f'{ilike_ms:.2f}', f'{full_text_ms:.2f}'))
+    write_table(stdout, ('rows', 'text', 'ilike_ms', 'full_text_ms'), results)
+
+
+@scenario('autocomplete')
+def autocomplete(stdout, rows, repeat):
+    """
+    Typing a prefix: `search` on the list vs. the autocomplete endpoint
+    without and with its in-process cache, with the p99 of the uncached
+    autocomplete over all prefixes.
+    """
+    seeder = Seeder()
+    view = list_view(seeder.organization_uuid)
+    autocomplete_view = list_view(seeder.organization_uuid, 'autocomplete')
+    prefixes = ('Si', 'Site 4', 'Street 12', 'Ber', '1234')
+
+    results = []
+    for size in rows:
+        seeder.grow(size)
+        timings = []
+        for prefix in prefixes:
+            search_ms = measure(lambda: view(f'?search={prefix}&count=false&limit=10'), repeat)
+
+            def uncached():
+                autocomplete_cache.clear()
+                autocomplete_view(f'?prefix={prefix}')
+            uncached_ms = [measure(uncached, 1) for _ in range(repeat)]
+            timings.extend(uncached_ms)
+            cached_ms = measure(lambda: autocomplete_view(f'?prefix={prefix}'), repeat)
+            results.append((size, prefix, f'{search_ms:.2f}', f'{statistics.median(uncached_ms):.2f}',
+                            f'{cached_ms:.2f}'))
+        timings.sort()
+        p99_ms = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        results.append((size, 'p99', '', f'{p99_ms:.2f}', ''))
+    write_table(stdout, ('rows', 'prefix', 'search_ms', 'autocomplete_ms', 'cached_ms'), results)
+
+
+@scenario('sparse_fieldsets')
+def sparse_fieldsets(stdout, rows, repeat):
+    """Pages of 1000 SiteProfiles with typical `fields`/`omit` subsets: response size and time to render."""
+    seeder = Seeder()
+    view = list_view(seeder.organization_uuid)
+    subsets = ('', '&fields=id,name,latitude,longitude', '&fields=id,name,address_line1,postcode,city',
+               '&omit=notes')
+
+    results = []
+    for size in rows:
+        seeder.grow(size)
+        for subset in subsets:
+            query = f'?limit=1000&count=false{subset}'
+            content_bytes = len(view(query).render().content)
+            render_ms = measure(lambda: view(query).render(), repeat)
+            results.append((size, subset.lstrip('&') or 'all', content_bytes, f'{render_ms:.2f}'))
+    write_table(stdout, ('rows', 'subset', 'bytes', 'render_ms'), results)
+
+
+@scenario('row_serializer')
+def row_serializer(stdout, rows, repeat):
+    """
+    Representing a page of 7000 SiteProfiles: SiteProfileSerializer over
+    model instances vs. RowSerializer over `values_list()` rows, including
+    the query. The rendered JSON of both has to be identical.
+    """
+    seeder = Seeder()
+    queryset = SiteProfile.objects.filter(organization_uuid=seeder.organization_uuid).order_by('name', 'uuid')
+    serializer = SiteProfileSerializer()
+    fast_serializer = RowSerializer(serializer)
+    page_size = KeysetPagination.max_limit
+
+    def serialize():
+        return SiteProfileSerializer(queryset[:page_size], many=True).data
+
+    def serialize_rows():
+        return fast_serializer.to_representation_many(fast_serializer.get_queryset(queryset)[:page_size])
+
+    results = []
+    for size in rows:
+        seeder.grow(size)
+        renderer = drf_renderers.JSONRenderer()
+        identical = renderer.render(serialize()) == renderer.render(serialize_rows())
+        serializer_ms = measure(serialize, repeat)
+        rows_ms = measure(serialize_rows, repeat)
+        results.append((size, min(size, page_size), f'{serializer_ms:.2f}', f'{rows_ms:.2f}',
+                        f'{serializer_ms / rows_ms:.1f}x', 'yes' if identical else 'NO'))
+    write_table(stdout, ('rows', 'page', 'serializer_ms', 'row_serializer_ms', 'speedup', 'identical'), results)
+
+
+@scenario('renderers')
+def renderers(stdout, rows, repeat):
+    """Encoding list pages of up to 7000 SiteProfiles: DRF JSON vs. our JSON (orjson when installed) and MessagePack."""
+    seeder = Seeder()
+    view = list_view(seeder.organization_uuid)
+    encoders = (('drf_json', drf_renderers.JSONRenderer()), ('json', JSONRenderer()),
+                ('msgpack', MessagePackRenderer()))
+
+    results = []
+    for size in rows:
+        seeder.grow(size)
+        for page_size in sorted({min(size, page_size) for page_size in (100, 1000, KeysetPagination.max_limit)}):
+            data = view(f'?limit={page_size}&count=false').data
+            timings = [f'{measure(lambda: renderer.render(data), repeat):.2f}' for _, renderer in encoders]
+            sizes = [len(renderer.render(data)) for _, renderer in encoders]
+            results.append((size, page_size, *timings, *sizes))
+    headers = ('rows', 'page') + tuple(f'{name}_ms' for name, _ in encoders) + tuple(
+        f'{name}_bytes' for name, _ in encoders)
+    write_table(stdout, headers, results)
+
+
+@scenario('database_json')
+def database_json(stdout, rows, repeat):
+    """List pages rendered from Python vs. with the JSON of the SiteProfiles built by Postgres, in pages per second."""
+    seeder = Seeder()
+    view = list_view(seeder.organization_uuid)
+
+    def render(query):
+        response = view(query)
+        return response.render() if hasattr(response, 'render') else response
+
+    results = []
+    for size in rows:
+        seeder.grow(size)
+        for page_size in sorted({min(size, page_size) for page_size in (1000, KeysetPagination.max_limit)}):
+            query = f'?limit={page_size}'
+            with override_settings(SITEPROFILE_DATABASE_JSON=False):
+                python_ms = measure(lambda: render(query), repeat)
+            with override_settings(SITEPROFILE_DATABASE_JSON=True):
+                database_ms = measure(lambda: render(query), repeat)
+            results.append((size, page_size, f'{1000 / python_ms:.1f}', f'{1000 / database_ms:.1f}',
+                            f'{python_ms / database_ms:.1f}x'))
+    write_table(stdout, ('rows', 'page', 'python_pages_per_s', 'database_pages_per_s', 'speedup'), results)
+
+
+@scenario('conditional_get')
+def conditional_get(stdout, rows, repeat):
+    """Revalidating a page of 1000 SiteProfiles: full response vs. If-None-Match answered with 304 Not Modified."""
+    seeder = Seeder()
+    view = SiteProfileViewSet.as_view({'get': 'list'})
+    factory = APIRequestFactory()
+
+    def get(**headers):
+        request = factory.get('?limit=1000', **headers)
+        request.session = {'jwt_organization_uuid': str(seeder.organization_uuid)}
+        response = view(request)
+        return response.render() if hasattr(response, 'render') else response
+
+    results = []
+    for size in rows:
+        seeder.grow(size)
+        etag = get()['ETag']
+        full_ms = measure(get, repeat)
+        not_modified_ms = measure(lambda: get(HTTP_IF_NONE_MATCH=etag), repeat)
+        status = get(HTTP_IF_NONE_MATCH=etag).status_code
+        results.append((size, f'{full_ms:.2f}', f'{not_modified_ms:.2f}', f'{full_ms / not_modified_ms:.1f}x', status))
+    write_table(stdout, ('rows', 'full_ms', 'not_modified_ms', 'speedup', 'status'), results)
+
+
+@scenario('response_cache')
+def response_cache(stdout, rows, repeat):
+    """Reading a page of 1000 SiteProfiles without vs. with the local response cache, in pages per second."""
+    seeder = Seeder()
+    view = list_view(seeder.organization_uuid)
+
+    def render():
+        response = view('?limit=1000')
+        return response.render() if hasattr(response, 'render') else response
+
+    cached_settings = dict(settings.RESPONSE_CACHE, BACKEND='local')
+    results = []
+    for size in rows:
+        seeder.grow(size)
+        with override_settings(RESPONSE_CACHE=dict(cached_settings, BACKEND='')):
+            uncached_ms = measure(render, repeat)
+        with override_settings(RESPONSE_CACHE=cached_settings):
+            render()
+            cached_ms = measure(render, repeat)
+            status = render()['X-Cache']
+        results.append((size, f'{1000 / uncached_ms:.1f}', f'{1000 / cached_ms:.1f}',
+                        f'{uncached_ms / cached_ms:.1f}x', status))
+    write_table(stdout, ('rows', 'uncached_pages_per_s', 'cached_pages_per_s', 'speedup', 'cache'), results)
@@ -0,0 +1,112 @@
+"""
+Set-based writes of many SiteProfiles at once.
+"""
+import hashlib
+import json
+
+from django.db import connection
+from django.db.models import CharField, F, Func, Value
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import SiteProfile
+
+UPSERT_BATCH_SIZE = 1000
+
+# Columns written by an upsert but not part of the content of a SiteProfile.
+UPSERT_META_FIELDS = ('uuid', 'organization_uuid', 'external_id', 'content_hash', 'create_date', 'edit_date')
+# Columns maintained by triggers.
+DERIVED_FIELDS = ('search_vector', 'name_normalized', 'address_line1_normalized', 'postcode_normalized',
+                  'city_normalized')
+# Columns that an upsert only writes when it inserts the row.
+UPSERT_INSERT_ONLY_FIELDS = ('uuid', 'organization_uuid', 'external_id', 'create_date')
+
+
+def content_fields():
+    return [field for field in SiteProfile._meta.concrete_fields
+            if field.name not in UPSERT_META_FIELDS + DERIVED_FIELDS]
+
+
+def content_hash(values):
+    """SHA-256 of the content column values of a SiteProfile."""
+    data = json.dumps(values, cls=JSONEncoder, separators=(',', ':'))
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def upsert_sql(rows):
+    fields = SiteProfile._meta.concrete_fields
+    table = SiteProfile._meta.db_table
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(field.column) for field in fields)
+    placeholders = '({})'.format(', '.join(['%s'] * len(fields)))
+    updates = ', '.join(f'{quote(field.column)} = EXCLUDED.{quote(field.column)}'
+                        for field in fields if field.name not in UPSERT_INSERT_ONLY_FIELDS)
+    return (f'INSERT INTO {table} ({columns}) VALUES {", ".join([placeholders] * rows)} '
+            f'ON CONFLICT ({quote("organization_uuid")}, {quote("external_id")}) DO UPDATE SET {updates} '
+            f'WHERE {table}.{quote("content_hash")} IS DISTINCT FROM EXCLUDED.{quote("content_hash")} '
+            f'RETURNING {quote("external_id")}, {quote("uuid")}, xmax = 0')
+
+
+def upsert_siteprofiles(organization_uuid, rows, batch_size=UPSERT_BATCH_SIZE):
+    """
+    Create or update the SiteProfiles of the organization identified by the
+    `external_id` of each row with `INSERT ... ON CONFLICT DO UPDATE`.
+
+    `rows` are validated attribute dicts with distinct external_ids. Fields
+    missing from a row are reset to their defaults. Existing SiteProfiles
+    whose content hash is unchanged are not written at all, so neither their
+    `edit_date` changes nor their row is rewritten.
+
+    Return a dict by external_id of `(uuid, created)` of the written
+    SiteProfiles; unchanged ones are left out.
+    """
+    fields = SiteProfile._meta.concrete_fields
+    hashed_fields = content_fields()
+    now = timezone.now()
+    written = {}
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            params = []
+            batch = rows[start:start + batch_size]
+            for attrs in batch:
+                siteprofile = SiteProfile(**dict(
+                    attrs, organization_uuid=organization_uuid, create_date=now, edit_date=now))
+                siteprofile.content_hash = content_hash(
+                    [field.get_db_prep_save(getattr(siteprofile, field.attname), connection)
+                     for field in hashed_fields])
+                params.extend(field.get_db_prep_save(getattr(siteprofile, field.attname), connection)
+                              for field in fields)
+            cursor.execute(upsert_sql(len(batch)), params)
+            written.update((external_id, (uuid, created)) for external_id, uuid, created in cursor.fetchall())
+    return written
+
+
+class ArrayAppend(Func):
+    function = 'array_append'
+
+
+class ArrayRemove(Func):
+    function = 'array_remove'
+
+
+def update_workflowlevel2(queryset, workflowlevel2_uuid, add=True):
+    """
+    Add the WorkflowLevel2 UUID to, or remove it from, the
+    `workflowlevel2_uuid` of all SiteProfiles of the queryset with a single
+    UPDATE. Only the SiteProfiles that change are written: additions skip
+    the ones already containing the UUID, and removals select the ones
+    containing it, which is answered by the GIN index. Return the number of
+    updated SiteProfiles.
+    """
+    field = SiteProfile._meta.get_field('workflowlevel2_uuid')
+    element = Cast(Value(workflowlevel2_uuid), CharField(max_length=field.base_field.max_length))
+    contains = {'workflowlevel2_uuid__contains': [workflowlevel2_uuid]}
+    if add:
+        queryset = queryset.exclude(**contains)
+        value = ArrayAppend(Coalesce(F('workflowlevel2_uuid'), Value([], output_field=field)), element,
+                            output_field=field)
+    else:
+        queryset = queryset.filter(**contains)
+        value = ArrayRemove(F('workflowlevel2_uuid'), element, output_field=field)
+    return queryset.update(workflowlevel2_uuid=value, edit_date=timezone.now(), content_hash='')
@@ -0,0 +1,114 @@
+"""
+JSON representation of models built by Postgres.
+
+`DatabaseJSONSerializer` has the rows of a page turned into the JSON objects
+of their representation with `row_to_json()`, so that the page is answered
+by joining the JSON texts from the database, without instantiating models
+nor encoding in Python.
+"""
+from django.contrib.postgres.fields import ArrayField
+from django.db import connection
+from django.db.models import TextField
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from rest_framework import relations, serializers
+from rest_framework.settings import ISO_8601, api_settings
+
+from .renderers import escape_line_separators
+
+# ISO 8601 in UTC like DRF, which leaves out the microseconds when they are zero. `%%` is
+# the escaped modulo operator, as the SQL is run with query parameters.
+DATETIME_SQL = (
+    "to_char({column} AT TIME ZONE 'UTC', 'YYYY-MM-DD\"T\"HH24:MI:SS') || "
+    "CASE WHEN date_part('microseconds', {column})::integer %% 1000000 = 0 THEN '' "
+    "ELSE to_char({column} AT TIME ZONE 'UTC', '.US') END || 'Z'")
+
+
+def column_sql(field, model_field):
+    """
+    Return the SQL template of the representation of the serializer field,
+    or None when Postgres can not represent it like the serializer.
+    """
+    if isinstance(field, serializers.UUIDField):
+        return '{column}::text' if field.uuid_format == 'hex_verbose' else None
+    if type(field) is serializers.CharField:
+        return '{column}::text'
+    if type(field) is serializers.IntegerField:
+        return '{column}'
+    if isinstance(field, serializers.ChoiceField):
+        # Choices are stored as their string keys, e.g. alpha2 codes for countries.
+        return None if getattr(field, 'country_dict', False) else '{column}'
+    if isinstance(field, serializers.DecimalField):
+        coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+        if not coerce_to_string or field.localize or field.decimal_places != model_field.decimal_places:
+            return None
+        return '{column}::text'
+    if isinstance(field, serializers.DateTimeField):
+        output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+        if (output_format is None or output_format.lower() != ISO_8601 or
+                timezone.get_current_timezone_name() != 'UTC'):
+            return None
+        return DATETIME_SQL
+    if isinstance(field, relations.PrimaryKeyRelatedField) and field.pk_field is None:
+        return '{column}'
+    if (isinstance(field, serializers.ListField) and type(field.child) is serializers.CharField and
+            isinstance(model_field, ArrayField)):
+        return '{column}'
+    return None
+
+
+class DatabaseJSONSerializer(object):
+    """
+    Represents rows of the model of a ModelSerializer as JSON built by
+    Postgres, with the same keys and values as the serializer. Use
+    `is_supported()` to find out whether all fields of the serializer can be
+    represented.
+
+    A page is read in two queries: `get_queryset()` selects only the keys of
+    the rows, so that paginating and counting do not build any JSON, and
+    `render()` fetches the JSON of the page by primary key.
+    """
+
+    def __init__(self, serializer):
+        self.model = serializer.Meta.model
+        opts = self.model._meta
+        quote = connection.ops.quote_name
+        self.supported = True
+        select = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            model_field = opts.get_field(field.source)
+            template = column_sql(field, model_field)
+            if template is None:
+                self.supported = False
+                return
+            column = f'{quote(opts.db_table)}.{quote(model_field.column)}'
+            select.append(f'{template.format(column=column)} AS {quote(name)}')
+        self.sql = f'SELECT row_to_json(representation)::text FROM (SELECT {", ".join(select)}) representation'
+
+    def is_supported(self):
+        return self.supported
+
+    def get_queryset(self, queryset):
+        """
+        Rows of the queryset with the primary key and the ordering fields,
+        which cursor pagination reads from the last row.
+        """
+        pk = self.model._meta.pk.attname
+        concrete_fields = {field.attname for field in self.model._meta.concrete_fields}
+        ordering = [term.lstrip('-') for term in queryset.query.order_by if isinstance(term, str)]
+        return queryset.values_list(pk, *[column for column in ordering if column in concrete_fields and column != pk],
+                                    named=True)
+
+    def render(self, queryset, rows):
+        """
+        JSON array as bytes of the rows, whose JSON is read from the queryset
+        in a single query. Rows deleted in the meantime are left out.
+        """
+        pk = self.model._meta.pk.attname
+        keys = [getattr(row, pk) for row in rows]
+        representations = dict(queryset.order_by().filter(pk__in=keys).annotate(
+            json=RawSQL(self.sql, (), output_field=TextField())).values_list(pk, 'json'))
+        content = ','.join(representations[key] for key in keys if key in representations)
+        return escape_line_separators(b'[' + content.encode('utf-8') + b']')
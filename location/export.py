@@ -0,0 +1,52 @@
+"""
+Streaming of large exports without holding them in memory.
+"""
+import zlib
+
+from rest_framework.utils.encoders import JSONEncoder
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+EXPORT_CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+
+
+def ndjson_stream(objects, to_representation):
+    """Yield the objects as newline-delimited JSON, buffered into chunks of about BUFFER_SIZE bytes."""
+    encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    buffer, size = [], 0
+    for obj in objects:
+        line = (encoder.encode(to_representation(obj)) + '\n').encode('utf-8')
+        buffer.append(line)
+        size += len(line)
+        if size >= BUFFER_SIZE:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzip_stream(chunks):
+    """Compress a stream of byte chunks into a gzip stream on the fly."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def accepts_gzip(request):
+    """Whether the Accept-Encoding of the request allows gzip, by name or by `*`, with a quality above zero."""
+    qualities = {}
+    for coding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, *params = (part.strip() for part in coding.split(';'))
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.lower()] = quality
+    return qualities.get('gzip', qualities.get('*', 0.0)) > 0
@@ -1,24 +1,251 @@
-from django.db.models import Q
+from django import forms
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db.models import F, Func, Q, TextField, Value
+from django.db.models.functions import Greatest
 from django_filters import rest_framework as django_filters
+from django_filters.fields import BaseCSVField
+from rest_framework import filters as drf_filters
+from rest_framework.compat import coreapi, coreschema
+from rest_framework.exceptions import ValidationError
 
-from location.models import SiteProfile
+from location import geo
+from location.models import SiteProfile, WorkflowLevel2Membership
 
 
 class BaseInArrayFilter(django_filters.BaseInFilter):
+    """
+    Matches the rows whose array shares at least one item with the values,
+    as a single overlap (`&&`) predicate that can be answered by a GIN index.
+    """
 
     def filter(self, qs, value):
         if not value:
             return qs
-        params = Q()
-        for item in value:
-            params |= Q(**{f'{self.field_name}__contains': [item, ]})
-        return qs.filter(params)
+        return qs.filter(**{f'{self.field_name}__overlap': list(value)})
+
+
+class CoordinatesField(BaseCSVField):
+    """Comma-separated list of a fixed number of decimal coordinates."""
+    default_error_messages = {
+        'invalid_values': 'Expects {length} comma-separated values.',
+    }
+
+    def __init__(self, *args, length=2, **kwargs):
+        self.length = length
+        super().__init__(*args, **kwargs)
+
+    def clean(self, value):
+        value = super().clean(value)
+        if value and len(value) != self.length:
+            raise forms.ValidationError(
+                self.error_messages['invalid_values'].format(length=self.length),
+                code='invalid_values')
+        return value
+
+
+class CoordinatesFilter(django_filters.BaseCSVFilter, django_filters.NumberFilter):
+    base_field_class = CoordinatesField
+
+
+def validate_point(name, latitude, longitude):
+    if not (geo.MIN_LATITUDE <= latitude <= geo.MAX_LATITUDE and
+            geo.MIN_LONGITUDE <= longitude <= geo.MAX_LONGITUDE):
+        raise ValidationError({name: ['Coordinates out of range.']})
 
 
 class SiteProfileFilter(django_filters.FilterSet):
     workflowlevel2_uuid = BaseInArrayFilter()
     uuid = django_filters.BaseInFilter()
+    near = CoordinatesFilter(
+        method='filter_near', length=2,
+        help_text='Point as `latitude,longitude`. Requires `radius_km`.')
+    radius_km = django_filters.NumberFilter(
+        method='filter_radius_km', min_value=0,
+        help_text='Radius in km around the `near` point.')
+    bbox = CoordinatesFilter(
+        method='filter_bbox', length=4,
+        help_text='Bounding box as `min_longitude,min_latitude,max_longitude,max_latitude`. '
+                  'Boxes crossing the antimeridian have `min_longitude > max_longitude`.')
 
     class Meta:
         model = SiteProfile
         fields = ('profiletype__id', 'uuid', 'workflowlevel2_uuid', )
+
+    def filter_near(self, queryset, name, value):
+        """
+        Prefilter by the bounding box of the circle, which can be answered by
+        the (organization_uuid, latitude, longitude) index, then keep only the
+        rows within the exact great-circle distance.
+        """
+        radius_km = self.form.cleaned_data.get('radius_km')
+        if radius_km is None:
+            raise ValidationError({'radius_km': ['This parameter is required together with `near`.']})
+        latitude, longitude = (float(v) for v in value)
+        validate_point(name, latitude, longitude)
+        radius_km = float(radius_km)
+        return queryset.filter(
+            geo.bounding_box_q(*geo.bounding_box(latitude, longitude, radius_km))
+        ).annotate(
+            distance=geo.GreatCircleDistance(latitude, longitude)
+        ).filter(distance__lte=radius_km)
+
+    def filter_radius_km(self, queryset, name, value):
+        """Only used together with `near`."""
+        return queryset
+
+    def filter_bbox(self, queryset, name, value):
+        min_longitude, min_latitude, max_longitude, max_latitude = (float(v) for v in value)
+        validate_point(name, min_latitude, min_longitude)
+        validate_point(name, max_latitude, max_longitude)
+        if min_latitude > max_latitude:
+            raise ValidationError({name: ['min_latitude must not be greater than max_latitude.']})
+        return queryset.filter(geo.bounding_box_q(
+            min_latitude, max_latitude, geo.split_antimeridian(min_longitude, max_longitude)))
+
+
+class WorkflowLevel2MembershipFilter(django_filters.FilterSet):
+    workflowlevel2_uuid = django_filters.BaseInFilter(help_text='Comma-separated list of WorkflowLevel2 UUIDs.')
+    siteprofile = django_filters.BaseInFilter(help_text='Comma-separated list of SiteProfile UUIDs.')
+
+    class Meta:
+        model = WorkflowLevel2Membership
+        fields = ('workflowlevel2_uuid', 'siteprofile', )
+
+
+class Normalize(Func):
+    """Unaccented, lower-cased text with collapsed whitespace, like the `*_normalized` columns of SiteProfile."""
+    function = 'location_normalize'
+    output_field = TextField()
+
+
+class TrigramSearchFilter(drf_filters.SearchFilter):
+    """
+    SearchFilter that matches the search terms accent- and case-insensitively.
+    Both the terms and the search fields are normalized: the fields are read
+    from their `<field>_normalized` shadow columns, which are maintained by a
+    trigger and indexed with pg_trgm, so the substring matches are answered
+    by the indexes.
+
+    With `search_rank=true` the results are ordered by their best trigram
+    similarity to the search terms. It has to come after the OrderingFilter
+    in `filter_backends` so that the ranking is not ordered away.
+    """
+    rank_query_param = 'search_rank'
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = getattr(view, 'search_fields', None)
+        terms = self.get_search_terms(request)
+        if not search_fields or not terms:
+            return queryset
+        normalized_fields = [f'{field}_normalized' for field in search_fields]
+        for term in terms:
+            matches = Q()
+            for field in normalized_fields:
+                matches |= Q(**{f'{field}__contains': Normalize(Value(term))})
+            queryset = queryset.filter(matches)
+        if request.query_params.get(self.rank_query_param, 'false').lower() != 'true':
+            return queryset
+        similarities = [TrigramSimilarity(field, Normalize(Value(' '.join(terms)))) for field in normalized_fields]
+        similarity = Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+        return queryset.annotate(similarity=similarity).order_by('-similarity', *queryset.query.order_by)
+
+    def get_schema_fields(self, view):
+        return super().get_schema_fields(view) + [
+            coreapi.Field(
+                name=self.rank_query_param,
+                required=False,
+                location='query',
+                schema=coreschema.Boolean(
+                    title='Search rank',
+                    description='Order the search results by similarity to the search terms.'
+                )
+            ),
+        ]
+
+
+class FullTextSearchFilter(drf_filters.BaseFilterBackend):
+    """
+    Matches the `q` query parameter against the view's `search_vector_field`
+    and orders the results by relevance. Like TrigramSearchFilter it has to
+    come after the OrderingFilter in `filter_backends`.
+    """
+    query_param = 'q'
+    config = 'simple'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.query_param, '').strip()
+        if not text:
+            return queryset
+        search_vector_field = getattr(view, 'search_vector_field', 'search_vector')
+        query = SearchQuery(text, config=self.config)
+        return queryset.filter(**{search_vector_field: query}).annotate(
+            rank=SearchRank(F(search_vector_field), query)).order_by('-rank', *queryset.query.order_by)
+
+    def get_schema_fields(self, view):
+        return [
+            coreapi.Field(
+                name=self.query_param,
+                required=False,
+                location='query',
+                schema=coreschema.String(
+                    title='Full-text search',
+                    description='Words to search for in all text fields, ordered by relevance.'
+                )
+            ),
+        ]
+
+
+class SparseFieldsetFilter(drf_filters.BaseFilterBackend):
+    """
+    Selects the fields of the representation with the `fields` or `omit`
+    query parameters (comma-separated field names) in the view's
+    `sparse_fieldset_actions`. The view passes `get_fieldset()` as `fields`
+    to its serializer, whose RowSerializer reads only the columns behind
+    them. Filtering only validates the parameters.
+    """
+    fields_query_param = 'fields'
+    omit_query_param = 'omit'
+
+    def get_fieldset(self, request, view):
+        """Names of the selected fields, or None when all fields are represented."""
+        if request is None or getattr(view, 'action', None) not in getattr(view, 'sparse_fieldset_actions', ()):
+            return None
+        fields = [name for name in request.query_params.get(self.fields_query_param, '').split(',') if name]
+        omit = [name for name in request.query_params.get(self.omit_query_param, '').split(',') if name]
+        if not fields and not omit:
+            return None
+        available = list(view.get_serializer_class()().fields)
+        errors = {}
+        for param, names in ((self.fields_query_param, fields), (self.omit_query_param, omit)):
+            unknown = [name for name in names if name not in available]
+            if unknown:
+                errors[param] = [f'Unknown fields: {", ".join(unknown)}.']
+        if errors:
+            raise ValidationError(errors)
+        return [name for name in available if (not fields or name in fields) and name not in omit]
+
+    def filter_queryset(self, request, queryset, view):
+        self.get_fieldset(request, view)
+        return queryset
+
+    def get_schema_fields(self, view):
+        return [
+            coreapi.Field(
+                name=self.fields_query_param,
+                required=False,
+                location='query',
+                schema=coreschema.String(
+                    title='Fields',
+                    description='Comma-separated names of the fields to return.'
+                )
+            ),
+            coreapi.Field(
+                name=self.omit_query_param,
+                required=False,
+                location='query',
+                schema=coreschema.String(
+                    title='Omitted fields',
+                    description='Comma-separated names of the fields not to return.'
+                )
+            ),
+        ]
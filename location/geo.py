@@ -0,0 +1,156 @@
+"""
+Geographic helpers for querying SiteProfiles by their latitude/longitude.
+
+Coordinates are WGS84 decimal degrees. Distances are great-circle distances
+in kilometers on a spherical earth.
+"""
+import math
+
+from django.db.models import Avg, Count, F, FloatField, Func, IntegerField, Q, Value
+
+EARTH_RADIUS_KM = 6371.0088
+MIN_LATITUDE, MAX_LATITUDE = -90.0, 90.0
+MIN_LONGITUDE, MAX_LONGITUDE = -180.0, 180.0
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+
+NEAREST_INITIAL_RADIUS_KM = 1.0
+NEAREST_GROWTH_FACTOR = 4
+
+# Clusters are computed on a grid with this many cells per 256px map tile.
+CLUSTER_CELLS_PER_TILE = 4
+
+
+def haversine_km(latitude1, longitude1, latitude2, longitude2):
+    """Great-circle distance in km between two points."""
+    phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+    delta_phi = math.radians(latitude2 - latitude1)
+    delta_lambda = math.radians(longitude2 - longitude1)
+    a = (math.sin(delta_phi / 2) ** 2 +
+         math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def split_antimeridian(min_longitude, max_longitude):
+    """
+    Return a list of `(min, max)` longitude ranges inside [-180, 180]
+    covering the given range. A range crossing the antimeridian, given either
+    as `min > max` or with bounds outside [-180, 180], is split in two.
+    """
+    if min_longitude > max_longitude:
+        return [(min_longitude, MAX_LONGITUDE), (MIN_LONGITUDE, max_longitude)]
+    if max_longitude - min_longitude >= 360:
+        return [(MIN_LONGITUDE, MAX_LONGITUDE)]
+    if min_longitude < MIN_LONGITUDE:
+        return [(min_longitude + 360, MAX_LONGITUDE), (MIN_LONGITUDE, max_longitude)]
+    if max_longitude > MAX_LONGITUDE:
+        return [(min_longitude, MAX_LONGITUDE), (MIN_LONGITUDE, max_longitude - 360)]
+    return [(min_longitude, max_longitude)]
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Return `(min_latitude, max_latitude, longitude_ranges)` of the smallest box
+    containing every point within `radius_km` of the given point.
+
+    See http://janmatuschek.de/LatitudeLongitudeBoundingCoordinates
+    """
+    angular_radius = radius_km / EARTH_RADIUS_KM
+    min_latitude = latitude - math.degrees(angular_radius)
+    max_latitude = latitude + math.degrees(angular_radius)
+    if min_latitude <= MIN_LATITUDE or max_latitude >= MAX_LATITUDE:
+        # A pole is inside the circle: every longitude is covered.
+        return (max(min_latitude, MIN_LATITUDE), min(max_latitude, MAX_LATITUDE),
+                [(MIN_LONGITUDE, MAX_LONGITUDE)])
+    delta_longitude = math.degrees(
+        math.asin(min(1.0, math.sin(angular_radius) / math.cos(math.radians(latitude)))))
+    longitude_ranges = split_antimeridian(longitude - delta_longitude, longitude + delta_longitude)
+    return min_latitude, max_latitude, longitude_ranges
+
+
+def bounding_box_q(min_latitude, max_latitude, longitude_ranges,
+                   latitude_field='latitude', longitude_field='longitude'):
+    """Build a range filter matching the index on (organization_uuid, latitude, longitude)."""
+    longitude_q = Q()
+    for min_longitude, max_longitude in longitude_ranges:
+        longitude_q |= Q(**{f'{longitude_field}__range': (min_longitude, max_longitude)})
+    return Q(**{f'{latitude_field}__range': (min_latitude, max_latitude)}) & longitude_q
+
+
+class GreatCircleDistance(Func):
+    """
+    Haversine distance in km from the row's coordinates to a fixed point,
+    computed by the database.
+    """
+    template = (
+        '2 * {radius} * ASIN(LEAST(1, SQRT('
+        'POWER(SIN(RADIANS({row_lat} - {lat}) / 2), 2) + '
+        'COS(RADIANS({lat})) * COS(RADIANS({row_lat})) * '
+        'POWER(SIN(RADIANS({row_lng} - {lng}) / 2), 2))))'
+    )
+
+    def __init__(self, latitude, longitude, latitude_field='latitude', longitude_field='longitude'):
+        super().__init__(F(latitude_field), F(longitude_field),
+                         Value(float(latitude)), Value(float(longitude)),
+                         output_field=FloatField())
+
+    def as_sql(self, compiler, connection, **extra_context):
+        (row_lat, row_lat_params), (row_lng, row_lng_params), (lat, lat_params), (lng, lng_params) = [
+            compiler.compile(expression) for expression in self.get_source_expressions()]
+        sql = self.template.format(radius=EARTH_RADIUS_KM, row_lat=row_lat, row_lng=row_lng, lat=lat, lng=lng)
+        params = (row_lat_params + lat_params + lat_params + row_lat_params +
+                  row_lng_params + lng_params)
+        return sql, params
+
+
+def nearest(queryset, latitude, longitude, k):
+    """
+    Return the `k` rows of the queryset closest to the given point, ordered by
+    distance and annotated with `distance` (km).
+
+    The search radius starts small and grows until the ring contains `k` rows,
+    so only the index range around the point is read instead of sorting every
+    row of the organization by distance.
+    """
+    radius_km = NEAREST_INITIAL_RADIUS_KM
+    while True:
+        radius_km = min(radius_km, MAX_DISTANCE_KM)
+        candidates = queryset.filter(
+            bounding_box_q(*bounding_box(latitude, longitude, radius_km))
+        ).annotate(
+            distance=GreatCircleDistance(latitude, longitude)
+        ).filter(distance__lte=radius_km)
+        if radius_km >= MAX_DISTANCE_KM or candidates[:k].count() >= k:
+            return candidates.order_by('distance', 'uuid')[:k]
+        radius_km *= NEAREST_GROWTH_FACTOR
+
+
+class Floor(Func):
+    function = 'FLOOR'
+    output_field = IntegerField()
+
+
+def cluster_cell_size(zoom):
+    """Size in degrees of a cluster grid cell at the given map zoom level."""
+    return 360 / (2 ** zoom) / CLUSTER_CELLS_PER_TILE
+
+
+def clusters(queryset, zoom):
+    """
+    Aggregate the rows of the queryset into grid cells in the database and
+    return one dict per non-empty cell with its `count` and the `latitude`
+    and `longitude` of the centroid of its rows.
+    """
+    cell_size = cluster_cell_size(zoom)
+    cells = queryset.annotate(
+        cell_x=Floor(F('longitude') / cell_size),
+        cell_y=Floor(F('latitude') / cell_size),
+    ).order_by().values('cell_x', 'cell_y').annotate(
+        count=Count('*'),
+        centroid_latitude=Avg('latitude'),
+        centroid_longitude=Avg('longitude'),
+    )
+    return [{
+        'count': cell['count'],
+        'latitude': float(cell['centroid_latitude']),
+        'longitude': float(cell['centroid_longitude']),
+    } for cell in cells]
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from location import benchmarks
+
+
+class Command(BaseCommand):
+    help = ('Runs a benchmark scenario against the configured database. '
+            'All data created by the benchmark is rolled back at the end.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=sorted(benchmarks.SCENARIOS))
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000],
+                            help='Table sizes (SiteProfiles in the benchmarked organization).')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Number of timed runs per measurement; the median is reported.')
+
+    def handle(self, *args, **options):
+        scenario = benchmarks.SCENARIOS[options['scenario']]
+        if scenario.scratch_database_only and not settings.BENCHMARK_SCRATCH_DATABASE:
+            raise CommandError(f"The {options['scenario']} scenario locks the SiteProfile table. Run it only against a "
+                               f"scratch database, with BENCHMARK_SCRATCH_DATABASE=True.")
+        # The scenarios call the views with APIRequestFactory requests, whose host is 'testserver'.
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']), transaction.atomic():
+            scenario(self.stdout, rows=sorted(options['rows']), repeat=options['repeat'])
+            transaction.set_rollback(True)
@@ -0,0 +1,17 @@
+# Generated by Django 2.1.15 on 2026-10-17 16:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location', '0009_profiletype_is_global'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='siteprofile',
+            index=models.Index(fields=['organization_uuid', 'latitude', 'longitude'], name='location_si_organiz_01eada_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.1.15 on 2026-10-17 16:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location', '0010_auto_20261017_1610'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profiletype',
+            index=models.Index(fields=['organization_uuid', 'name', 'id'], name='location_pr_organiz_714a20_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='siteprofile',
+            index=models.Index(fields=['organization_uuid', 'name', 'uuid'], name='location_si_organiz_ba3f85_idx'),
+        ),
+    ]
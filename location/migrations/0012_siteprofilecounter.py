@@ -0,0 +1,80 @@
+# Generated by Django 2.1.15 on 2026-10-17 16:19
+
+from django.db import migrations, models
+
+COUNTER_TRIGGERS = """
+CREATE FUNCTION location_siteprofilecounter_insert() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO location_siteprofilecounter (organization_uuid, count)
+    SELECT organization_uuid, COUNT(*) FROM new_rows GROUP BY organization_uuid
+    ON CONFLICT (organization_uuid)
+    DO UPDATE SET count = location_siteprofilecounter.count + EXCLUDED.count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION location_siteprofilecounter_delete() RETURNS trigger AS $$
+BEGIN
+    UPDATE location_siteprofilecounter counter
+    SET count = counter.count - deleted.count
+    FROM (SELECT organization_uuid, COUNT(*) AS count FROM old_rows GROUP BY organization_uuid) deleted
+    WHERE counter.organization_uuid = deleted.organization_uuid;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION location_siteprofilecounter_move() RETURNS trigger AS $$
+BEGIN
+    UPDATE location_siteprofilecounter SET count = count - 1
+    WHERE organization_uuid = OLD.organization_uuid;
+    INSERT INTO location_siteprofilecounter (organization_uuid, count) VALUES (NEW.organization_uuid, 1)
+    ON CONFLICT (organization_uuid) DO UPDATE SET count = location_siteprofilecounter.count + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER location_siteprofilecounter_insert
+AFTER INSERT ON location_siteprofile
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE location_siteprofilecounter_insert();
+
+CREATE TRIGGER location_siteprofilecounter_delete
+AFTER DELETE ON location_siteprofile
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE location_siteprofilecounter_delete();
+
+CREATE TRIGGER location_siteprofilecounter_move
+AFTER UPDATE OF organization_uuid ON location_siteprofile
+FOR EACH ROW WHEN (OLD.organization_uuid IS DISTINCT FROM NEW.organization_uuid)
+EXECUTE PROCEDURE location_siteprofilecounter_move();
+
+INSERT INTO location_siteprofilecounter (organization_uuid, count)
+SELECT organization_uuid, COUNT(*) FROM location_siteprofile GROUP BY organization_uuid;
+"""
+
+DROP_COUNTER_TRIGGERS = """
+DROP TRIGGER location_siteprofilecounter_insert ON location_siteprofile;
+DROP TRIGGER location_siteprofilecounter_delete ON location_siteprofile;
+DROP TRIGGER location_siteprofilecounter_move ON location_siteprofile;
+DROP FUNCTION location_siteprofilecounter_insert();
+DROP FUNCTION location_siteprofilecounter_delete();
+DROP FUNCTION location_siteprofilecounter_move();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location', '0011_auto_20261017_1618'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteProfileCounter',
+            fields=[
+                ('organization_uuid', models.UUIDField(help_text='UUID of the organization.', primary_key=True, serialize=False, verbose_name='Organization UUID')),
+                ('count', models.BigIntegerField(default=0, help_text='Number of SiteProfiles of the organization.')),
+            ],
+        ),
+        migrations.RunSQL(COUNTER_TRIGGERS, DROP_COUNTER_TRIGGERS),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 2.1.15 on 2026-10-17 16:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location', '0012_siteprofilecounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='siteprofile',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Hash of the content written by the last bulk upsert.', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='siteprofile',
+            name='external_id',
+            field=models.CharField(blank=True, help_text='Reference of the SiteProfile in an external system, unique per organization.', max_length=255, null=True, verbose_name='External ID'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='siteprofile',
+            unique_together={('organization_uuid', 'external_id')},
+        ),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 2.1.15 on 2026-10-17 16:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+MEMBERSHIP_TRIGGERS = """
+CREATE FUNCTION location_workflowlevel2membership_insert() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO location_workflowlevel2membership (siteprofile_id, workflowlevel2_uuid, organization_uuid)
+    SELECT DISTINCT new_rows.uuid, workflowlevel2.uuid, new_rows.organization_uuid
+    FROM new_rows, unnest(new_rows.workflowlevel2_uuid) AS workflowlevel2(uuid);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION location_workflowlevel2membership_update() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM location_workflowlevel2membership membership
+    USING old_rows JOIN new_rows ON old_rows.uuid = new_rows.uuid
+    WHERE membership.siteprofile_id = old_rows.uuid
+    AND (old_rows.workflowlevel2_uuid IS DISTINCT FROM new_rows.workflowlevel2_uuid OR
+         old_rows.organization_uuid IS DISTINCT FROM new_rows.organization_uuid);
+
+    INSERT INTO location_workflowlevel2membership (siteprofile_id, workflowlevel2_uuid, organization_uuid)
+    SELECT DISTINCT new_rows.uuid, workflowlevel2.uuid, new_rows.organization_uuid
+    FROM old_rows JOIN new_rows ON old_rows.uuid = new_rows.uuid,
+         unnest(new_rows.workflowlevel2_uuid) AS workflowlevel2(uuid)
+    WHERE old_rows.workflowlevel2_uuid IS DISTINCT FROM new_rows.workflowlevel2_uuid OR
+          old_rows.organization_uuid IS DISTINCT FROM new_rows.organization_uuid;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION location_workflowlevel2membership_delete() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM location_workflowlevel2membership
+    WHERE siteprofile_id IN (SELECT uuid FROM old_rows);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER location_workflowlevel2membership_insert
+AFTER INSERT ON location_siteprofile
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE location_workflowlevel2membership_insert();
+
+CREATE TRIGGER location_workflowlevel2membership_update
+AFTER UPDATE ON location_siteprofile
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE location_workflowlevel2membership_update();
+
+CREATE TRIGGER location_workflowlevel2membership_delete
+AFTER DELETE ON location_siteprofile
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE location_workflowlevel2membership_delete();
+
+INSERT INTO location_workflowlevel2membership (siteprofile_id, workflowlevel2_uuid, organization_uuid)
+SELECT DISTINCT siteprofile.uuid, workflowlevel2.uuid, siteprofile.organization_uuid
+FROM location_siteprofile siteprofile, unnest(siteprofile.workflowlevel2_uuid) AS workflowlevel2(uuid);
+"""
+
+DROP_MEMBERSHIP_TRIGGERS = """
+DROP TRIGGER location_workflowlevel2membership_insert ON location_siteprofile;
+DROP TRIGGER location_workflowlevel2membership_update ON location_siteprofile;
+DROP TRIGGER location_workflowlevel2membership_delete ON location_siteprofile;
+DROP FUNCTION location_workflowlevel2membership_insert();
+DROP FUNCTION location_workflowlevel2membership_update();
+DROP FUNCTION location_workflowlevel2membership_delete();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location', '0013_siteprofile_external_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkflowLevel2Membership',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('workflowlevel2_uuid', models.CharField(help_text='UUID of the WorkflowLevel2.', max_length=36)),
+                ('organization_uuid', models.UUIDField(help_text='UUID of the organization of the SiteProfile.', verbose_name='Organization UUID')),
+                ('siteprofile', models.ForeignKey(help_text='UUID of the SiteProfile.', on_delete=django.db.models.deletion.DO_NOTHING, related_name='workflowlevel2_memberships', to='location.SiteProfile')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='workflowlevel2membership',
+            index=models.Index(fields=['organization_uuid', 'workflowlevel2_uuid', 'siteprofile'], name='location_wo_organiz_a56dbf_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='workflowlevel2membership',
+            unique_together={('siteprofile', 'workflowlevel2_uuid')},
+        ),
+        migrations.RunSQL(MEMBERSHIP_TRIGGERS, DROP_MEMBERSHIP_TRIGGERS),
+    ]
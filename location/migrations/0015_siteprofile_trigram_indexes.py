@@ -0,0 +1,30 @@
+# Generated by Django 2.1.15 on 2026-10-17 16:36
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# The SearchFilter matches with `UPPER(field::text) LIKE UPPER('%term%')`,
+# which these indexes answer. The planner combines them with the
+# organization_uuid index (GIN has no uuid operator class before
+# PostgreSQL 11, so it can not be part of them).
+SEARCH_FIELDS = ('address_line1', 'postcode', 'city')
+
+TRIGRAM_INDEXES = ''.join(
+    f'CREATE INDEX location_siteprofile_{field}_trgm ON location_siteprofile '
+    f'USING gin (UPPER({field}::text) gin_trgm_ops);\n'
+    for field in SEARCH_FIELDS)
+
+DROP_TRIGRAM_INDEXES = ''.join(
+    f'DROP INDEX location_siteprofile_{field}_trgm;\n' for field in SEARCH_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location', '0014_workflowlevel2membership'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunSQL(TRIGRAM_INDEXES, DROP_TRIGRAM_INDEXES),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 2.1.15 on 2026-10-17 16:40
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+# The document is built with the 'simple' configuration, without stemming or
+# stop words, as addresses are written in many languages.
+SEARCH_VECTOR_TRIGGER = """
+CREATE FUNCTION location_siteprofile_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('simple', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('simple', concat_ws(' ', NEW.address_line1, NEW.address_line2, NEW.address_line3,
+                                                  NEW.address_line4, NEW.postcode, NEW.city)), 'B') ||
+        setweight(to_tsvector('simple', concat_ws(' ', NEW.administrative_level1, NEW.administrative_level2,
+                                                  NEW.administrative_level3, NEW.administrative_level4)), 'C') ||
+        setweight(to_tsvector('simple', coalesce(NEW.notes, '')), 'D');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER location_siteprofile_search_vector
+BEFORE INSERT OR UPDATE OF name, address_line1, address_line2, address_line3, address_line4, postcode, city,
+    administrative_level1, administrative_level2, administrative_level3, administrative_level4, notes, search_vector
+ON location_siteprofile
+FOR EACH ROW EXECUTE PROCEDURE location_siteprofile_search_vector();
+
+UPDATE location_siteprofile SET search_vector = NULL;
+"""
+
+DROP_SEARCH_VECTOR_TRIGGER = """
+DROP TRIGGER location_siteprofile_search_vector ON location_siteprofile;
+DROP FUNCTION location_siteprofile_search_vector();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location', '0015_siteprofile_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='siteprofile',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, help_text='Weighted full-text document of the SiteProfile, maintained by a trigger.', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='siteprofile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='location_si_search__7b4c9d_gin'),
+        ),
+        migrations.RunSQL(SEARCH_VECTOR_TRIGGER, DROP_SEARCH_VECTOR_TRIGGER),
+    ]
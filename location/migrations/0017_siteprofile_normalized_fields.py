@@ -0,0 +1,79 @@
+# Generated by Django 2.1.15 on 2026-10-17 16:45
+
+from django.contrib.postgres.operations import UnaccentExtension
+from django.db import migrations, models
+
+SEARCH_FIELDS = ('address_line1', 'postcode', 'city')
+
+# location_normalize() is declared immutable, although unaccent() is not, so
+# that it can be folded into constant search patterns. The unaccent
+# dictionary must not change without refreshing the normalized columns.
+NORMALIZE_FUNCTION = """
+CREATE FUNCTION location_normalize(value text) RETURNS text AS $$
+    SELECT lower(btrim(regexp_replace(unaccent('unaccent'::regdictionary, coalesce(value, '')), '\\s+', ' ', 'g')));
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE FUNCTION location_siteprofile_normalized_fields() RETURNS trigger AS $$
+BEGIN
+    NEW.address_line1_normalized := location_normalize(NEW.address_line1);
+    NEW.postcode_normalized := location_normalize(NEW.postcode);
+    NEW.city_normalized := location_normalize(NEW.city);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER location_siteprofile_normalized_fields
+BEFORE INSERT OR UPDATE OF address_line1, postcode, city,
+    address_line1_normalized, postcode_normalized, city_normalized
+ON location_siteprofile
+FOR EACH ROW EXECUTE PROCEDURE location_siteprofile_normalized_fields();
+
+UPDATE location_siteprofile SET city_normalized = '';
+"""
+
+DROP_NORMALIZE_FUNCTION = """
+DROP TRIGGER location_siteprofile_normalized_fields ON location_siteprofile;
+DROP FUNCTION location_siteprofile_normalized_fields();
+DROP FUNCTION location_normalize(text);
+"""
+
+# The SearchFilter matches the normalized columns instead of UPPER(field::text).
+TRIGRAM_INDEXES = ''.join(
+    f'DROP INDEX location_siteprofile_{field}_trgm;\n'
+    f'CREATE INDEX location_siteprofile_{field}_normalized_trgm ON location_siteprofile '
+    f'USING gin ({field}_normalized gin_trgm_ops);\n'
+    for field in SEARCH_FIELDS)
+
+DROP_TRIGRAM_INDEXES = ''.join(
+    f'DROP INDEX location_siteprofile_{field}_normalized_trgm;\n'
+    f'CREATE INDEX location_siteprofile_{field}_trgm ON location_siteprofile '
+    f'USING gin (UPPER({field}::text) gin_trgm_ops);\n'
+    for field in SEARCH_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location', '0016_siteprofile_search_vector'),
+    ]
+
+    operations = [
+        UnaccentExtension(),
+        migrations.AddField(
+            model_name='siteprofile',
+            name='address_line1_normalized',
+            field=models.TextField(blank=True, default='', editable=False, help_text='address_line1 unaccented, lower-cased and with collapsed whitespace, maintained by a trigger.'),
+        ),
+        migrations.AddField(
+            model_name='siteprofile',
+            name='city_normalized',
+            field=models.TextField(blank=True, default='', editable=False, help_text='city unaccented, lower-cased and with collapsed whitespace, maintained by a trigger.'),
+        ),
+        migrations.AddField(
+            model_name='siteprofile',
+            name='postcode_normalized',
+            field=models.TextField(blank=True, default='', editable=False, help_text='postcode unaccented, lower-cased and with collapsed whitespace, maintained by a trigger.'),
+        ),
+        migrations.RunSQL(NORMALIZE_FUNCTION, DROP_NORMALIZE_FUNCTION),
+        migrations.RunSQL(TRIGRAM_INDEXES, DROP_TRIGRAM_INDEXES),
+    ]
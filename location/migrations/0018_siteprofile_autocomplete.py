@@ -0,0 +1,70 @@
+# Generated by Django 2.1.15 on 2026-10-17 16:50
+
+from django.db import migrations, models
+
+NORMALIZED_FIELDS_TRIGGER = """
+CREATE OR REPLACE FUNCTION location_siteprofile_normalized_fields() RETURNS trigger AS $$
+BEGIN
+    NEW.name_normalized := location_normalize(NEW.name);
+    NEW.address_line1_normalized := location_normalize(NEW.address_line1);
+    NEW.postcode_normalized := location_normalize(NEW.postcode);
+    NEW.city_normalized := location_normalize(NEW.city);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER location_siteprofile_normalized_fields ON location_siteprofile;
+CREATE TRIGGER location_siteprofile_normalized_fields
+BEFORE INSERT OR UPDATE OF name, address_line1, postcode, city,
+    name_normalized, address_line1_normalized, postcode_normalized, city_normalized
+ON location_siteprofile
+FOR EACH ROW EXECUTE PROCEDURE location_siteprofile_normalized_fields();
+
+UPDATE location_siteprofile SET name_normalized = '';
+"""
+
+PREVIOUS_NORMALIZED_FIELDS_TRIGGER = """
+CREATE OR REPLACE FUNCTION location_siteprofile_normalized_fields() RETURNS trigger AS $$
+BEGIN
+    NEW.address_line1_normalized := location_normalize(NEW.address_line1);
+    NEW.postcode_normalized := location_normalize(NEW.postcode);
+    NEW.city_normalized := location_normalize(NEW.city);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER location_siteprofile_normalized_fields ON location_siteprofile;
+CREATE TRIGGER location_siteprofile_normalized_fields
+BEFORE INSERT OR UPDATE OF address_line1, postcode, city,
+    address_line1_normalized, postcode_normalized, city_normalized
+ON location_siteprofile
+FOR EACH ROW EXECUTE PROCEDURE location_siteprofile_normalized_fields();
+"""
+
+AUTOCOMPLETE_FIELDS = ('name', 'address_line1', 'postcode', 'city')
+
+# Prefix (LIKE 'prefix%') lookups on the normalized columns within the organization.
+PREFIX_INDEXES = ''.join(
+    f'CREATE INDEX location_siteprofile_{field}_prefix ON location_siteprofile '
+    f'(organization_uuid, {field}_normalized text_pattern_ops);\n'
+    for field in AUTOCOMPLETE_FIELDS)
+
+DROP_PREFIX_INDEXES = ''.join(
+    f'DROP INDEX location_siteprofile_{field}_prefix;\n' for field in AUTOCOMPLETE_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location', '0017_siteprofile_normalized_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='siteprofile',
+            name='name_normalized',
+            field=models.TextField(blank=True, default='', editable=False, help_text='name unaccented, lower-cased and with collapsed whitespace, maintained by a trigger.'),
+        ),
+        migrations.RunSQL(NORMALIZED_FIELDS_TRIGGER, PREVIOUS_NORMALIZED_FIELDS_TRIGGER),
+        migrations.RunSQL(PREFIX_INDEXES, DROP_PREFIX_INDEXES),
+    ]
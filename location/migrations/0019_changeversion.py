@@ -0,0 +1,98 @@
+# Generated by Django 2.1.15 on 2026-10-17 17:40
+
+from django.db import migrations, models
+
+ALL_ORGANIZATIONS = '00000000-0000-0000-0000-000000000000'
+
+
+def changed_organizations(resource, tables):
+    """SELECT of the organizations whose version a statement on the given transition tables increases."""
+    selects = [f'SELECT organization_uuid FROM {table}' for table in tables]
+    if resource == 'profiletype':
+        selects += [f"SELECT '{ALL_ORGANIZATIONS}'::uuid FROM {table} WHERE is_global" for table in tables]
+    return ' UNION '.join(selects)
+
+
+def version_triggers(resource):
+    return f"""
+CREATE FUNCTION location_changeversion_{resource}() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM location_changeversion_increase('{resource}', ARRAY({changed_organizations(resource, ['new_rows'])}));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM location_changeversion_increase('{resource}', ARRAY(
+            {changed_organizations(resource, ['new_rows', 'old_rows'])}));
+    ELSE
+        PERFORM location_changeversion_increase('{resource}', ARRAY({changed_organizations(resource, ['old_rows'])}));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER location_changeversion_insert
+AFTER INSERT ON location_{resource}
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE location_changeversion_{resource}();
+
+CREATE TRIGGER location_changeversion_update
+AFTER UPDATE ON location_{resource}
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE location_changeversion_{resource}();
+
+CREATE TRIGGER location_changeversion_delete
+AFTER DELETE ON location_{resource}
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE PROCEDURE location_changeversion_{resource}();
+"""
+
+
+VERSION_TRIGGERS = """
+CREATE FUNCTION location_changeversion_increase(changed_resource text, organization_uuids uuid[]) RETURNS void AS $$
+    INSERT INTO location_changeversion (resource, organization_uuid, version, edit_date)
+    SELECT DISTINCT changed_resource, organization_uuid, 1, now() FROM unnest(organization_uuids) organization_uuid
+    ON CONFLICT (resource, organization_uuid)
+    DO UPDATE SET version = location_changeversion.version + 1,
+                  edit_date = GREATEST(location_changeversion.edit_date, EXCLUDED.edit_date);
+$$ LANGUAGE sql;
+""" + version_triggers('siteprofile') + version_triggers('profiletype') + f"""
+INSERT INTO location_changeversion (resource, organization_uuid, version, edit_date)
+SELECT 'siteprofile', organization_uuid, 1, MAX(edit_date) FROM location_siteprofile GROUP BY organization_uuid
+UNION ALL
+SELECT 'profiletype', organization_uuid, 1, MAX(edit_date) FROM location_profiletype GROUP BY organization_uuid
+UNION ALL
+SELECT 'profiletype', '{ALL_ORGANIZATIONS}', 1, MAX(edit_date) FROM location_profiletype WHERE is_global HAVING COUNT(*) > 0;
+"""
+
+DROP_VERSION_TRIGGERS = ''.join(f"""
+DROP TRIGGER location_changeversion_insert ON location_{resource};
+DROP TRIGGER location_changeversion_update ON location_{resource};
+DROP TRIGGER location_changeversion_delete ON location_{resource};
+DROP FUNCTION location_changeversion_{resource}();
+""" for resource in ('siteprofile', 'profiletype')) + """
+DROP FUNCTION location_changeversion_increase(text, uuid[]);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location', '0018_siteprofile_autocomplete'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resource', models.CharField(choices=[('siteprofile', 'SiteProfile'), ('profiletype', 'ProfileType')], help_text='Changed model.', max_length=20)),
+                ('organization_uuid', models.UUIDField(help_text='UUID of the organization.', verbose_name='Organization UUID')),
+                ('version', models.BigIntegerField(default=0, help_text='Number of changes of the model in the organization.')),
+                ('edit_date', models.DateTimeField(help_text='Timestamp of the last change of the model in the organization.')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='changeversion',
+            unique_together={('resource', 'organization_uuid')},
+        ),
+        migrations.RunSQL(VERSION_TRIGGERS, DROP_VERSION_TRIGGERS),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+AUTOCOMPLETE_FIELDS = ('name', 'address_line1', 'postcode', 'city')
+
+# With the "C" collation, a plain btree index on the normalized columns answers
+# LIKE 'prefix%' and returns the matches in the order of the column, so that
+# autocomplete lookups can stop after LIMIT rows. text_pattern_ops indexes only
+# answer the LIKE.
+C_COLLATION = ''.join(
+    f'DROP INDEX location_siteprofile_{field}_prefix;\n'
+    f'ALTER TABLE location_siteprofile ALTER COLUMN {field}_normalized TYPE text COLLATE "C";\n'
+    f'CREATE INDEX location_siteprofile_{field}_prefix ON location_siteprofile '
+    f'(organization_uuid, {field}_normalized);\n'
+    for field in AUTOCOMPLETE_FIELDS)
+
+DEFAULT_COLLATION = ''.join(
+    f'DROP INDEX location_siteprofile_{field}_prefix;\n'
+    f'ALTER TABLE location_siteprofile ALTER COLUMN {field}_normalized TYPE text COLLATE "default";\n'
+    f'CREATE INDEX location_siteprofile_{field}_prefix ON location_siteprofile '
+    f'(organization_uuid, {field}_normalized text_pattern_ops);\n'
+    for field in AUTOCOMPLETE_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location', '0019_changeversion'),
+    ]
+
+    operations = [
+        migrations.RunSQL(C_COLLATION, DEFAULT_COLLATION),
+    ]
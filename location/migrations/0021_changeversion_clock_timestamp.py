@@ -0,0 +1,40 @@
+from django.db import migrations
+
+# now() is the start of the transaction: a transaction that started before the
+# last committed change but commits after it would leave edit_date, and so the
+# Last-Modified of the responses, unchanged. clock_timestamp() in the UPDATE is
+# evaluated once the row lock is held, i.e. after the previous change of the
+# version committed, so edit_date increases with every version.
+CLOCK_TIMESTAMP = """
+CREATE OR REPLACE FUNCTION location_changeversion_increase(changed_resource text, organization_uuids uuid[])
+RETURNS void AS $$
+    INSERT INTO location_changeversion (resource, organization_uuid, version, edit_date)
+    SELECT DISTINCT changed_resource, organization_uuid, 1, clock_timestamp()
+    FROM unnest(organization_uuids) organization_uuid
+    ON CONFLICT (resource, organization_uuid)
+    DO UPDATE SET version = location_changeversion.version + 1,
+                  edit_date = GREATEST(location_changeversion.edit_date, clock_timestamp());
+$$ LANGUAGE sql;
+"""
+
+NOW = """
+CREATE OR REPLACE FUNCTION location_changeversion_increase(changed_resource text, organization_uuids uuid[])
+RETURNS void AS $$
+    INSERT INTO location_changeversion (resource, organization_uuid, version, edit_date)
+    SELECT DISTINCT changed_resource, organization_uuid, 1, now() FROM unnest(organization_uuids) organization_uuid
+    ON CONFLICT (resource, organization_uuid)
+    DO UPDATE SET version = location_changeversion.version + 1,
+                  edit_date = GREATEST(location_changeversion.edit_date, EXCLUDED.edit_date);
+$$ LANGUAGE sql;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('location', '0020_siteprofile_normalized_c_collation'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CLOCK_TIMESTAMP, NOW),
+    ]
@@ -3,6 +3,7 @@ import uuid
 
 from django.contrib.postgres.fields import ArrayField
 from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django_countries.fields import CountryField
 
@@ -19,6 +20,11 @@ class ProfileType(models.Model):
     edit_date = models.DateTimeField(auto_now=True, help_text='Timestamp when the SiteProfile was last modified (automatically set, ISO format).')
     is_global = models.BooleanField(default=False, help_text="All organizations have access to global ProfileTypes.")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['organization_uuid', 'name', 'id']),
+        ]
+
 
 class SiteProfile(models.Model):
     """
@@ -51,8 +57,76 @@ class SiteProfile(models.Model):
     edit_date = models.DateTimeField(auto_now=True, help_text='Timestamp when the SiteProfile was last modified (set automatically, ISO format)')
 
     workflowlevel2_uuid = ArrayField(models.CharField(max_length=36), blank=True, null=True, help_text='Array of WorkflowLevel2s associated with the SiteProfile.')
+    external_id = models.CharField('External ID', max_length=255, blank=True, null=True, help_text='Reference of the SiteProfile in an external system, unique per organization.')
+    content_hash = models.CharField(max_length=64, blank=True, default='', editable=False, help_text='Hash of the content written by the last bulk upsert.')
+    name_normalized = models.TextField(blank=True, default='', editable=False, help_text='name unaccented, lower-cased and with collapsed whitespace, maintained by a trigger.')
+    address_line1_normalized = models.TextField(blank=True, default='', editable=False, help_text='address_line1 unaccented, lower-cased and with collapsed whitespace, maintained by a trigger.')
+    postcode_normalized = models.TextField(blank=True, default='', editable=False, help_text='postcode unaccented, lower-cased and with collapsed whitespace, maintained by a trigger.')
+    city_normalized = models.TextField(blank=True, default='', editable=False, help_text='city unaccented, lower-cased and with collapsed whitespace, maintained by a trigger.')
+    search_vector = SearchVectorField(null=True, editable=False, help_text='Weighted full-text document of the SiteProfile, maintained by a trigger.')
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['workflowlevel2_uuid']),
+            GinIndex(fields=['search_vector']),
+            models.Index(fields=['organization_uuid', 'latitude', 'longitude']),
+            models.Index(fields=['organization_uuid', 'name', 'uuid']),
+        ]
+        unique_together = (('organization_uuid', 'external_id'), )
+
+    def save(self, *args, **kwargs):
+        # Only bulk upserts record the content they wrote; any other write
+        # makes the next upsert of the SiteProfile rewrite it.
+        self.content_hash = ''
+        super().save(*args, **kwargs)
+
+
+class SiteProfileCounter(models.Model):
+    """
+    Number of SiteProfiles of an organization. It is maintained by triggers
+    on the SiteProfile table, so bulk inserts and deletes keep it exact too.
+    """
+    organization_uuid = models.UUIDField('Organization UUID', primary_key=True, help_text='UUID of the organization.')
+    count = models.BigIntegerField(default=0, help_text='Number of SiteProfiles of the organization.')
+
+
+class ChangeVersion(models.Model):
+    """
+    Version of the SiteProfiles or ProfileTypes of an organization, increased
+    by every statement that changes any of them, and the time of the last
+    change. It is maintained by triggers, so bulk writes count too. Changes
+    of global ProfileTypes are also counted for ALL_ORGANIZATIONS.
+    """
+    SITEPROFILE = 'siteprofile'
+    PROFILETYPE = 'profiletype'
+    RESOURCES = (
+        (SITEPROFILE, 'SiteProfile'),
+        (PROFILETYPE, 'ProfileType'),
+    )
+    ALL_ORGANIZATIONS = uuid.UUID(int=0)
+
+    resource = models.CharField(max_length=20, choices=RESOURCES, help_text='Changed model.')
+    organization_uuid = models.UUIDField('Organization UUID', help_text='UUID of the organization.')
+    version = models.BigIntegerField(default=0, help_text='Number of changes of the model in the organization.')
+    edit_date = models.DateTimeField(help_text='Timestamp of the last change of the model in the organization.')
+
+    class Meta:
+        unique_together = (('resource', 'organization_uuid'), )
+
+
+class WorkflowLevel2Membership(models.Model):
+    """
+    One WorkflowLevel2 UUID of a SiteProfile. It normalizes
+    `SiteProfile.workflowlevel2_uuid` into B-tree indexed rows for looking up
+    the SiteProfiles of a WorkflowLevel2 and the WorkflowLevel2s of
+    SiteProfiles. It is maintained by triggers on the SiteProfile table.
+    """
+    siteprofile = models.ForeignKey(SiteProfile, on_delete=models.DO_NOTHING, related_name='workflowlevel2_memberships', help_text='UUID of the SiteProfile.')
+    workflowlevel2_uuid = models.CharField(max_length=36, help_text='UUID of the WorkflowLevel2.')
+    organization_uuid = models.UUIDField('Organization UUID', help_text='UUID of the organization of the SiteProfile.')
 
     class Meta:
+        unique_together = (('siteprofile', 'workflowlevel2_uuid'), )
         indexes = [
-            GinIndex(fields=['workflowlevel2_uuid'])
+            models.Index(fields=['organization_uuid', 'workflowlevel2_uuid', 'siteprofile']),
         ]
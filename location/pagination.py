@@ -1,6 +1,252 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import Q
+from rest_framework.compat import coreapi, coreschema
+from rest_framework.exceptions import ValidationError
 from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+COUNT_EXACT = 'true'
+COUNT_NONE = 'false'
+COUNT_ESTIMATE = 'estimate'
+
+
+def estimate_count(queryset):
+    """Number of rows of the queryset estimated by the query planner, without running the query."""
+    try:
+        sql, params = queryset.order_by().query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(LimitOffsetPagination):
+    """
+    Cursor pagination that seeks to the position after the last row of the
+    previous page instead of skipping `offset` rows, so every page costs the
+    same regardless of its depth, and that never counts the rows.
+
+    The position is the value of the first ordering field plus the primary key
+    as a tiebreaker. Both are encoded in an opaque `cursor` query parameter;
+    an empty `cursor` requests the first page.
+    """
+    default_limit = 50
+    max_limit = 7000
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+
+        position = self.decode_cursor(request.query_params[self.cursor_query_param], queryset)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(position))
+
+        results = list(queryset[:self.limit + 1])
+        self.has_next = len(results) > self.limit
+        results = results[:self.limit]
+        self.next_position = self.get_position(results[-1]) if self.has_next else None
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_ordering(self, queryset):
+        """Return the (field, primary key) ordering used as the position of a row."""
+        model = queryset.model
+        pk_name = model._meta.pk.name
+        ordering = [term for term in queryset.query.order_by if isinstance(term, str)] or [pk_name]
+        direction = '-' if ordering[0].startswith('-') else ''
+        field_name = ordering[0].lstrip('-')
+        if field_name in ('pk', pk_name):
+            return (direction + pk_name, )
+        field = next((field for field in model._meta.concrete_fields if field.name == field_name), None)
+        if field is None or field.null:
+            raise ValidationError(
+                {self.cursor_query_param: [f'Cursor pagination does not support ordering by "{field_name}".']})
+        return (direction + field_name, direction + pk_name)
+
+    def get_position(self, instance):
+        return [str(getattr(instance, term.lstrip('-'))) for term in self.ordering]
+
+    def get_position_filter(self, position):
+        """
+        Match the rows after `position`. The redundant `field >= value` lets
+        the database start an index range scan at the position.
+        """
+        lookup = 'lt' if self.ordering[0].startswith('-') else 'gt'
+        names = [term.lstrip('-') for term in self.ordering]
+        if len(names) == 1:
+            return Q(**{f'{names[0]}__{lookup}': position[0]})
+        return Q(**{f'{names[0]}__{lookup}e': position[0]}) & (
+            Q(**{f'{names[0]}__{lookup}': position[0]}) |
+            Q(**{names[0]: position[0], f'{names[1]}__{lookup}': position[1]}))
+
+    def encode_cursor(self, position):
+        data = json.dumps({'o': self.ordering, 'p': position}, separators=(',', ':'))
+        return urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor, queryset):
+        """Return the validated position of the cursor, or None for the first page."""
+        if not cursor:
+            return None
+        try:
+            data = json.loads(urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8'))
+            if data['o'] != list(self.ordering) or len(data['p']) != len(self.ordering):
+                raise ValueError
+            return [queryset.model._meta.get_field(term.lstrip('-')).to_python(value)
+                    for term, value in zip(self.ordering, data['p'])]
+        except Exception:
+            raise ValidationError({self.cursor_query_param: [self.invalid_cursor_message]})
+
+    def get_schema_fields(self, view):
+        return [
+            coreapi.Field(
+                name=self.limit_query_param,
+                required=False,
+                location='query',
+                schema=coreschema.Integer(
+                    title='Limit',
+                    description='Number of results to return per page.'
+                )
+            ),
+            coreapi.Field(
+                name=self.cursor_query_param,
+                required=False,
+                location='query',
+                schema=coreschema.String(
+                    title='Cursor',
+                    description='Pagination cursor. Send it empty to request the first page.'
+                )
+            ),
+        ]
 
 
 class DefaultLimitOffsetPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination. Clients opt in to keyset pagination by sending
+    the `cursor` query parameter.
+
+    The `count` query parameter controls the count of the response:
+    `true` (default) counts exactly, `false` omits the count and `estimate`
+    returns a cheap count flagged with `approximate`. Both take the view's
+    exact `get_cached_count(queryset)` when it has one for the queryset;
+    otherwise exact counts run COUNT(*) and estimates come from the query
+    planner.
+    """
     default_limit = 50
     max_limit = 7000
+    count_query_param = 'count'
+    count_modes = (COUNT_EXACT, COUNT_NONE, COUNT_ESTIMATE)
+    keyset_pagination_class = KeysetPagination
+
+    keyset_paginator = None
+    count_mode = COUNT_EXACT
+    view = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.keyset_pagination_class and self.keyset_pagination_class.cursor_query_param in request.query_params:
+            self.keyset_paginator = self.keyset_pagination_class()
+            return self.keyset_paginator.paginate_queryset(queryset, request, view)
+
+        self.count_mode = self.get_count_mode(request)
+        self.view = view
+        if self.count_mode == COUNT_EXACT:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        self.request = request
+        if self.count_mode == COUNT_ESTIMATE:
+            self.count, self.approximate = self.get_estimated_count(queryset, view)
+        results = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(results) > self.limit
+        return results[:self.limit]
+
+    def get_paginated_response(self, data):
+        if self.keyset_paginator:
+            return self.keyset_paginator.get_paginated_response(data)
+        if self.count_mode == COUNT_EXACT:
+            return super().get_paginated_response(data)
+        count = [('count', self.count), ('approximate', self.approximate)] if self.count_mode == COUNT_ESTIMATE else []
+        return Response(OrderedDict(count + [
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_count_mode(self, request):
+        count_mode = request.query_params.get(self.count_query_param, COUNT_EXACT).lower()
+        if count_mode not in self.count_modes:
+            raise ValidationError({self.count_query_param: [f'Must be one of {", ".join(self.count_modes)}.']})
+        return count_mode
+
+    def get_cached_count(self, queryset, view):
+        get_cached_count = getattr(view, 'get_cached_count', None)
+        return get_cached_count(queryset) if get_cached_count else None
+
+    def get_count(self, queryset):
+        count = self.get_cached_count(queryset, self.view)
+        return super().get_count(queryset) if count is None else count
+
+    def get_estimated_count(self, queryset, view):
+        """Return `(count, approximate)`."""
+        count = self.get_cached_count(queryset, view)
+        if count is not None:
+            return count, False
+        return estimate_count(queryset), True
+
+    def get_next_link(self):
+        if self.count_mode == COUNT_EXACT:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        url = replace_query_param(self.request.build_absolute_uri(), self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+    def get_schema_fields(self, view):
+        cursor_fields = []
+        if self.keyset_pagination_class:
+            cursor_fields = [field for field in self.keyset_pagination_class().get_schema_fields(view)
+                             if field.name == self.keyset_pagination_class.cursor_query_param]
+        return super().get_schema_fields(view) + cursor_fields + [
+            coreapi.Field(
+                name=self.count_query_param,
+                required=False,
+                location='query',
+                schema=coreschema.Enum(
+                    self.count_modes,
+                    title='Count',
+                    description='`true` for an exact count, `false` for no count or `estimate` for an '
+                                'approximate count.'
+                )
+            ),
+        ]
+
+
+class AggregateLimitOffsetPagination(DefaultLimitOffsetPagination):
+    """Limit/offset pagination for lists of aggregated rows, which have no position for keyset pagination."""
+    keyset_pagination_class = None
@@ -0,0 +1,73 @@
+"""
+Renderers of the API responses.
+
+The JSON renderer uses orjson when it is installed and falls back to the
+standard library otherwise. MessagePack is meant for service-to-service
+calls.
+"""
+import msgpack
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import export, tiles
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def escape_line_separators(content):
+    """Like the DRF renderer, escape the line separators of UTF-8 JSON that are not valid in JavaScript."""
+    return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """
+    Renders compact JSON with orjson when it is installed. Indented,
+    ASCII-only or non-compact JSON is rendered by the standard library like
+    in the DRF renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or not self.compact or self.ensure_ascii or
+                self.get_indent(accepted_media_type, renderer_context or {})):
+            return super().render(data, accepted_media_type, renderer_context)
+        return escape_line_separators(
+            orjson.dumps(data, default=self.encoder_class().default, option=orjson.OPT_NON_STR_KEYS))
+
+
+class PassthroughRenderer(renderers.BaseRenderer):
+    """
+    Accepts the media type of an action that responds with its own
+    HttpResponse, so that content negotiation does not answer 406 Not
+    Acceptable. Errors negotiated to it have no body.
+    """
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data if isinstance(data, bytes) else b''
+
+
+class VectorTileRenderer(PassthroughRenderer):
+    media_type = tiles.CONTENT_TYPE
+    format = 'mvt'
+
+
+class NDJSONRenderer(PassthroughRenderer):
+    media_type = export.NDJSON_CONTENT_TYPE
+    format = 'ndjson'
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """Renders MessagePack, converting values it does not know like the JSON encoder of DRF."""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=JSONEncoder().default, use_bin_type=True)
@@ -0,0 +1,175 @@
+"""
+Cache of rendered GET responses.
+
+Responses are cached under their ETag (see `ConditionalGetMixin`), which is
+derived from the organization, the URL with its normalized query, the format
+and the ChangeVersions of the organization. Every write changes the versions,
+so entries never have to be invalidated: the next request looks up a new key
+and the stale entries are evicted or expire.
+
+The backend is configured by `settings.RESPONSE_CACHE`: `local` keeps a
+bounded LRU cache in every process, `django` uses a cache of Django's cache
+framework shared by all processes. Every process logs its hits and misses
+to the `location.responsecache` logger after every `LOG_INTERVAL` lookups.
+"""
+import abc
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+KEY_PREFIX = 'location:response:'
+LOG_INTERVAL = 1000
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache(abc.ABC):
+    """
+    Base class of the backends, which implement `_get()` and `_set()`.
+    Counts the hits and misses of the process and logs them after every
+    `log_interval` lookups.
+    """
+
+    def __init__(self, timeout, max_entry_bytes, log_interval=LOG_INTERVAL):
+        self.timeout = timeout
+        self.max_entry_bytes = max_entry_bytes
+        self.log_interval = log_interval
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def get(self, key):
+        """Return `(content, content_type)` of the cached response, or None."""
+        value = self._get(key)
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            log = self.log_interval and (self.hits + self.misses) % self.log_interval == 0
+        if log:
+            self.log_stats()
+        return value
+
+    def set(self, key, content, content_type):
+        """Cache the response content, unless it is larger than `max_entry_bytes`."""
+        if len(content) <= self.max_entry_bytes:
+            self._set(key, (bytes(content), content_type))
+
+    def stats(self):
+        with self._stats_lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def log_stats(self):
+        stats = self.stats()
+        lookups = stats['hits'] + stats['misses']
+        logger.info('Response cache: %s (hit rate %.1f%%)',
+                    ', '.join(f'{value} {name}' for name, value in stats.items()),
+                    100 * stats['hits'] / lookups if lookups else 0)
+
+    @abc.abstractmethod
+    def _get(self, key):
+        """Return the value cached under the key, or None."""
+
+    @abc.abstractmethod
+    def _set(self, key, value):
+        """Cache the value under the key for `timeout` seconds."""
+
+
+class LocalResponseCache(ResponseCache):
+    """
+    Thread-safe LRU cache in the process, holding at most `max_entries`
+    responses of at most `max_bytes` in total. The least recently used ones
+    are evicted first.
+    """
+
+    def __init__(self, timeout, max_entry_bytes, max_entries, max_bytes, log_interval=LOG_INTERVAL):
+        super().__init__(timeout, max_entry_bytes, log_interval)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                self._delete(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key, value):
+        with self._lock:
+            if key in self._entries:
+                self._delete(key)
+            self._entries[key] = (time.monotonic() + self.timeout, value)
+            self.bytes += len(value[0])
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._delete(next(iter(self._entries)))
+
+    def _delete(self, key):
+        _, (content, _) = self._entries.pop(key)
+        self.bytes -= len(content)
+
+    def stats(self):
+        stats = super().stats()
+        with self._lock:
+            stats.update(entries=len(self._entries), bytes=self.bytes)
+        return stats
+
+
+class DjangoResponseCache(ResponseCache):
+    """Responses in a cache of Django's cache framework, whose size is bounded by its own `OPTIONS`."""
+
+    def __init__(self, timeout, max_entry_bytes, alias, log_interval=LOG_INTERVAL):
+        super().__init__(timeout, max_entry_bytes, log_interval)
+        self.cache = caches[alias]
+
+    def _get(self, key):
+        return self.cache.get(KEY_PREFIX + key)
+
+    def _set(self, key, value):
+        self.cache.set(KEY_PREFIX + key, value, self.timeout)
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the response cache configured in the settings, or None when it is disabled."""
+    global _response_cache
+    config = settings.RESPONSE_CACHE
+    if not config['BACKEND']:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            if config['BACKEND'] == 'local':
+                _response_cache = LocalResponseCache(
+                    config['TIMEOUT'], config['MAX_ENTRY_BYTES'], config['MAX_ENTRIES'], config['MAX_BYTES'],
+                    config['LOG_INTERVAL'])
+            elif config['BACKEND'] == 'django':
+                _response_cache = DjangoResponseCache(
+                    config['TIMEOUT'], config['MAX_ENTRY_BYTES'], config['CACHE_ALIAS'], config['LOG_INTERVAL'])
+            else:
+                raise ValueError(f"Unknown RESPONSE_CACHE backend {config['BACKEND']!r}.")
+        return _response_cache
+
+
+@receiver(setting_changed)
+def reset_response_cache(setting, **kwargs):
+    global _response_cache
+    if setting == 'RESPONSE_CACHE':
+        with _response_cache_lock:
+            _response_cache = None
@@ -1,6 +1,24 @@
+import re
+
 from rest_framework import routers
 from . import views
 
-router = routers.SimpleRouter()
+# url_path of an action that serves a file, e.g. r'export\.ndjson'.
+FILE_URL_PATH = re.compile(r'\\\.\w+$')
+
+
+class Router(routers.SimpleRouter):
+    """SimpleRouter that routes the actions serving a file without the trailing slash, e.g. `export.ndjson`."""
+
+    def get_routes(self, viewset):
+        return [route._replace(url=route.url.replace('{trailing_slash}', ''))
+                if any(FILE_URL_PATH.search(getattr(getattr(viewset, name, None), 'url_path', ''))
+                       for name in route.mapping.values())
+                else route
+                for route in super().get_routes(viewset)]
+
+
+router = Router()
 router.register(r'profiletypes', views.ProfileTypeViewSet)
 router.register(r'siteprofiles', views.SiteProfileViewSet)
+router.register(r'workflowlevel2', views.WorkflowLevel2ViewSet)
@@ -0,0 +1,105 @@
+"""
+Read-only representation of models straight from database rows.
+
+`RowSerializer` produces the same output as the `to_representation()` of a
+ModelSerializer, but reads `values_list()` rows instead of instantiating the
+models, and converts every column with a function picked once per field
+instead of running the serializer fields for every row.
+"""
+from rest_framework import relations, serializers
+from rest_framework.settings import api_settings
+
+
+def memoize(convert):
+    """Cache the conversions of a column with few distinct values, like a country code."""
+    cache = {}
+
+    def memoized(value):
+        try:
+            return cache[value]
+        except KeyError:
+            result = cache[value] = convert(value)
+            return result
+    return memoized
+
+
+def decimal_converter(field):
+    """Format Decimals that already have the decimal places of the field without quantizing them."""
+    coerce_to_string = getattr(field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.decimal_places is None:
+        return field.to_representation
+    exponent = -field.decimal_places
+
+    def convert(value):
+        if value.as_tuple().exponent == exponent:
+            return '{:f}'.format(value)
+        return field.to_representation(value)
+    return convert
+
+
+def converter(field):
+    """Return a function turning a non-null column value into the representation of the serializer field."""
+    if isinstance(field, serializers.ChoiceField):
+        return memoize(field.to_representation)
+    if isinstance(field, serializers.UUIDField) and field.uuid_format == 'hex_verbose':
+        return str
+    if type(field) is serializers.CharField:
+        return str
+    if type(field) is serializers.IntegerField:
+        return int
+    if isinstance(field, serializers.DecimalField):
+        return decimal_converter(field)
+    if isinstance(field, relations.PrimaryKeyRelatedField) and field.pk_field is None:
+        return lambda value: value
+    if isinstance(field, serializers.ListField):
+        convert_item = converter(field.child)
+        return lambda value: [None if item is None else convert_item(item) for item in value]
+    return field.to_representation
+
+
+class RowSerializer(object):
+    """
+    Represents rows of the model of a ModelSerializer like the serializer
+    does. Every readable field of the serializer must have a model field as
+    its source. `extra_columns` are read into the rows without being
+    represented, e.g. for object permission checks.
+    """
+
+    def __init__(self, serializer, extra_columns=()):
+        opts = serializer.Meta.model._meta
+        self.model = serializer.Meta.model
+        self.columns = []
+        self.fields = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            column = self._add_column(opts.get_field(field.source).attname)
+            self.fields.append((name, column, converter(field)))
+        for column in (opts.pk.attname, ) + tuple(extra_columns):
+            self._add_column(opts.get_field(column).attname)
+
+    def _add_column(self, column):
+        if column not in self.columns:
+            self.columns.append(column)
+        return self.columns.index(column)
+
+    def get_queryset(self, queryset):
+        """
+        Rows of the queryset with the columns of the representation, plus its
+        ordering fields, which cursor pagination reads from the last row.
+        """
+        concrete_fields = {field.attname for field in self.model._meta.concrete_fields}
+        ordering = [term.lstrip('-') for term in queryset.query.order_by if isinstance(term, str)]
+        columns = self.columns + [column for column in ordering
+                                  if column in concrete_fields and column not in self.columns]
+        return queryset.values_list(*columns, named=True)
+
+    def to_representation(self, row):
+        representation = {}
+        for name, column, convert in self.fields:
+            value = row[column]
+            representation[name] = None if value is None else convert(value)
+        return representation
+
+    def to_representation_many(self, rows):
+        return [self.to_representation(row) for row in rows]
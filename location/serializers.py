@@ -2,7 +2,7 @@ from rest_framework import serializers
 from django_countries.serializer_fields import CountryField
 from django_countries import Countries
 
-from . import models
+from . import autocomplete, models
 
 
 class ProfileTypeSerializer(serializers.ModelSerializer):
@@ -20,29 +20,92 @@ class CountriesWithBlank(Countries):
     ]
 
 
-class SiteProfileSerializer(serializers.ModelSerializer):
+class ProfileTypeField(serializers.PrimaryKeyRelatedField):
+    """
+    Looks ProfileTypes up in `context['profiletypes']` (a dict by pk) when
+    given, so that a batch of SiteProfiles is validated without one query
+    per row.
+    """
+
+    def to_internal_value(self, data):
+        profiletypes = self.context.get('profiletypes')
+        if profiletypes is None:
+            return super().to_internal_value(data)
+        try:
+            return profiletypes[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class SparseFieldsetMixin(object):
+    """
+    Takes the names of the fields to represent as the `fields` argument, for
+    sparse fieldsets. All fields are kept when it is omitted.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class SiteProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     id = serializers.UUIDField(source='uuid', read_only=True)
+    profiletype = ProfileTypeField(
+        queryset=models.ProfileType.objects.all(), required=False, allow_null=True,
+        help_text='UUID of the related ProfileType of the SiteProfile.')
     country = CountryField(required=False, countries=CountriesWithBlank())
     organization_uuid = serializers.CharField(  # ToDo: remove organization_uuid when FE has removed it from POST
         required=False,
         help_text='Any value sent will be ignored and will be just taken '
                   'from JWT payload')
+    external_id = serializers.CharField(
+        required=False, allow_null=True, max_length=255,
+        help_text='Reference of the SiteProfile in an external system, unique per organization.')
 
     class Meta:
         model = models.SiteProfile
-        fields = '__all__'
+        exclude = ('content_hash', 'search_vector', 'name_normalized', 'address_line1_normalized',
+                   'postcode_normalized', 'city_normalized', )
         read_only_fields = ('uuid', )  # ToDo: add 'organization_uuid', for documentation
         # back when FE has removed it from POST
+        validators = []  # external_id is validated by validate_external_id
 
     def validate_profiletype(self, value):
         """ProfileType should be on the same organization except for global ProfileTypes."""
-        if value.is_global:
+        if value is None or value.is_global:
             return value
         if (self.initial_data['organization_uuid'] != str(value.organization_uuid)):
             raise serializers.ValidationError(
                 'Invalid ProfileType. It should belong to your organization')
         return value
 
+    def validate_external_id(self, value):
+        """
+        The external_id should be unique per organization. When
+        `context['external_ids']` holds the set of taken external_ids, it is
+        checked and extended instead of querying the database, so a batch of
+        SiteProfiles is validated without one query per row.
+        """
+        if value is None:
+            return value
+        external_ids = self.context.get('external_ids')
+        if external_ids is None:
+            taken = models.SiteProfile.objects.filter(
+                organization_uuid=self.initial_data['organization_uuid'], external_id=value)
+            if self.instance is not None:
+                taken = taken.exclude(pk=self.instance.pk)
+            taken = taken.exists()
+        else:
+            taken = value in external_ids
+            external_ids.add(value)
+        if taken:
+            raise serializers.ValidationError('A SiteProfile with this external_id already exists.')
+        return value
+
     def validate(self, attrs):
         """Validate that at least one of the defined fields is filled."""
         one_of_required_fields = (
@@ -59,3 +122,110 @@ class SiteProfileSerializer(serializers.ModelSerializer):
         if not set(one_of_required_fields).intersection(attrs.keys()):
             raise serializers.ValidationError(f'One of {one_of_required_fields} must be defined.')
         return super().validate(attrs)
+
+
+class SiteProfileUpsertSerializer(SiteProfileSerializer):
+    external_id = serializers.CharField(
+        max_length=255,
+        help_text='Reference of the SiteProfile in an external system, unique per organization.')
+
+
+class SiteProfileBulkUpdateSerializer(SiteProfileSerializer):
+    """Values set on many SiteProfiles at once."""
+
+    def validate(self, attrs):
+        """external_id is unique, so it can not be set on many SiteProfiles."""
+        if 'external_id' in attrs:
+            raise serializers.ValidationError({'external_id': ['Can not be set on many SiteProfiles.']})
+        return attrs
+
+
+class SiteProfileBulkSelectionSerializer(serializers.Serializer):
+    uuids = serializers.ListField(
+        child=serializers.UUIDField(), required=False,
+        help_text='UUIDs of the SiteProfiles. Filter query parameters select SiteProfiles too.')
+
+    def validate_uuids(self, value):
+        max_rows = self.context['view'].bulk_max_rows
+        if len(value) > max_rows:
+            raise serializers.ValidationError(f'At most {max_rows} UUIDs are allowed.')
+        return value
+
+
+class SiteProfileBulkPatchSerializer(SiteProfileBulkSelectionSerializer):
+    values = serializers.DictField(help_text='Values of the fields to update.')
+
+
+class SiteProfileWorkflowLevel2Serializer(SiteProfileBulkSelectionSerializer):
+    workflowlevel2_uuid = serializers.CharField(max_length=36, help_text='UUID of the WorkflowLevel2.')
+    operation = serializers.ChoiceField(
+        choices=('add', 'remove'), help_text='Whether to add the WorkflowLevel2 to or remove it from the SiteProfiles.')
+
+
+def validate_many(serializer, rows):
+    """
+    Validate each row with the same serializer instance and return
+    `(validated_rows, errors)`. `validated_rows` lists `(index, attrs)` of the
+    valid rows and `errors` lists `{'index', 'errors'}` of the invalid ones.
+    One invalid row does not prevent the others from being validated.
+    """
+    validated_rows, errors = [], []
+    for index, row in enumerate(rows):
+        serializer.initial_data = row
+        try:
+            validated_rows.append((index, serializer.run_validation(row)))
+        except serializers.ValidationError as exc:
+            errors.append({'index': index, 'errors': exc.detail})
+    return validated_rows, errors
+
+
+class SiteProfileMarkerSerializer(serializers.ModelSerializer):
+    """Lightweight representation of a SiteProfile for placing it on a map."""
+    id = serializers.UUIDField(source='uuid', read_only=True)
+
+    class Meta:
+        model = models.SiteProfile
+        fields = ('id', 'name', 'latitude', 'longitude', 'profiletype')
+        read_only_fields = fields
+
+
+class SiteProfileAutocompleteSerializer(serializers.Serializer):
+    """Minimal representation of a SiteProfile for autocompleting addresses."""
+    id = serializers.UUIDField(source='uuid', read_only=True)
+    name = serializers.CharField(read_only=True)
+    address_line1 = serializers.CharField(read_only=True)
+    postcode = serializers.CharField(read_only=True)
+    city = serializers.CharField(read_only=True)
+
+
+class AutocompleteQuerySerializer(serializers.Serializer):
+    prefix = serializers.CharField(min_length=autocomplete.MIN_PREFIX_LENGTH, max_length=255,
+                                   help_text='Beginning of the name, address line, postcode or city.')
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10,
+                                     help_text='Number of SiteProfiles to return.')
+
+
+class SiteProfileDistanceSerializer(SiteProfileSerializer):
+    distance = serializers.FloatField(read_only=True, help_text='Distance in km to the requested point.')
+
+
+class WorkflowLevel2CountSerializer(serializers.Serializer):
+    workflowlevel2_uuid = serializers.CharField(help_text='UUID of the WorkflowLevel2.')
+    count = serializers.IntegerField(help_text='Number of SiteProfiles of the WorkflowLevel2.')
+
+
+class NearestQuerySerializer(serializers.Serializer):
+    lat = serializers.FloatField(min_value=-90, max_value=90, help_text='Latitude of the point.')
+    lng = serializers.FloatField(min_value=-180, max_value=180, help_text='Longitude of the point.')
+    k = serializers.IntegerField(min_value=1, max_value=1000, default=10,
+                                 help_text='Number of SiteProfiles to return.')
+
+
+class SiteProfileClusterSerializer(serializers.Serializer):
+    latitude = serializers.FloatField(help_text='Latitude of the centroid of the cluster.')
+    longitude = serializers.FloatField(help_text='Longitude of the centroid of the cluster.')
+    count = serializers.IntegerField(help_text='Number of SiteProfiles in the cluster.')
+
+
+class ClustersQuerySerializer(serializers.Serializer):
+    zoom = serializers.IntegerField(min_value=0, max_value=22, help_text='Zoom level of the map.')
@@ -0,0 +1,47 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from .. import benchmarks
+from ..models import SiteProfile
+
+ROWS = 20
+NUMERIC_SUFFIXES = ('_ms', '_per_s', '_kb', 'bytes', 'url_length')
+EXPECTED_VALUES = {'identical': 'yes', 'status': 304, 'cache': 'HIT'}
+
+
+@override_settings(BENCHMARK_SCRATCH_DATABASE=True)
+class BenchmarkCommandTest(TestCase):
+    def _run(self, scenario):
+        """Run the scenario and return the headers and rows of its table."""
+        with mock.patch.object(benchmarks, 'write_table', wraps=benchmarks.write_table) as write_table:
+            call_command('benchmark', scenario, rows=[ROWS], repeat=1, stdout=StringIO())
+        self.assertFalse(SiteProfile.objects.exists())
+        self.assertEqual(write_table.call_count, 1)
+        _, headers, rows = write_table.call_args[0]
+        return headers, rows
+
+    def test_scenarios(self):
+        for scenario in sorted(benchmarks.SCENARIOS):
+            with self.subTest(scenario=scenario):
+                headers, rows = self._run(scenario)
+                self.assertEqual(headers[0], 'rows')
+                self.assertTrue(rows)
+                for row in rows:
+                    self.assertEqual(len(row), len(headers))
+                    self.assertEqual(row[0], ROWS)
+                    for header, value in zip(headers, row):
+                        if header in EXPECTED_VALUES:
+                            self.assertEqual(value, EXPECTED_VALUES[header], header)
+                        elif header == 'speedup' and value != '':
+                            self.assertRegex(value, r'^\d+(\.\d+)?x$')
+                        elif header.endswith(NUMERIC_SUFFIXES) and value != '':
+                            self.assertGreaterEqual(float(value), 0, header)
+
+    @override_settings(BENCHMARK_SCRATCH_DATABASE=False)
+    def test_scratch_database_only(self):
+        with self.assertRaises(CommandError):
+            call_command('benchmark', 'search', rows=[ROWS], repeat=1, stdout=StringIO())
@@ -0,0 +1,27 @@
+from django.test import SimpleTestCase
+
+from .. import geo
+
+
+class GeoTest(SimpleTestCase):
+    def test_haversine_km(self):
+        # Berlin - Paris
+        self.assertAlmostEqual(geo.haversine_km(52.5200, 13.4050, 48.8566, 2.3522), 877.5, delta=1)
+        self.assertEqual(geo.haversine_km(10, 10, 10, 10), 0)
+
+    def test_split_antimeridian(self):
+        self.assertEqual(geo.split_antimeridian(-10, 10), [(-10, 10)])
+        self.assertEqual(geo.split_antimeridian(170, -170), [(170, 180), (-180, -170)])
+        self.assertEqual(geo.split_antimeridian(170, 190), [(170, 180), (-180, -170)])
+        self.assertEqual(geo.split_antimeridian(-190, -170), [(170, 180), (-180, -170)])
+        self.assertEqual(geo.split_antimeridian(-200, 200), [(-180, 180)])
+
+    def test_bounding_box(self):
+        min_latitude, max_latitude, longitude_ranges = geo.bounding_box(0, 0, 111.2)
+        self.assertAlmostEqual(min_latitude, -1, places=2)
+        self.assertAlmostEqual(max_latitude, 1, places=2)
+        self.assertEqual(len(longitude_ranges), 1)
+        self.assertAlmostEqual(longitude_ranges[0][0], -1, places=2)
+
+    def test_bounding_box_pole(self):
+        self.assertEqual(geo.bounding_box(89.9, 0, 100)[1:], (90, [(-180, 180)]))
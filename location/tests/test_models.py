@@ -3,7 +3,7 @@ import uuid
 from django.core.exceptions import ValidationError
 from django.test import TestCase
 
-from ..models import ProfileType, SiteProfile
+from ..models import ProfileType, SiteProfile, SiteProfileCounter, WorkflowLevel2Membership
 
 
 class ProfileTypeTest(TestCase):
@@ -82,3 +82,94 @@ class SiteProfileTest(TestCase):
             notes='Patio interior',
             organization_uuid=uuid.uuid4(),
             workflowlevel2_uuid=[uuid.uuid4()],)
+
+    def test_save_siteprofile_clears_content_hash(self):
+        siteprofile = SiteProfile(organization_uuid=uuid.uuid4(), content_hash='abc')
+        siteprofile.save()
+        self.assertEqual(SiteProfile.objects.get(uuid=siteprofile.uuid).content_hash, '')
+
+    def test_search_vector_follows_writes(self):
+        siteprofile = SiteProfile.objects.create(
+            name='Office', city='Berlin', notes='Hinterhof', organization_uuid=uuid.uuid4())
+        search_vector = SiteProfile.objects.values_list('search_vector', flat=True).get(uuid=siteprofile.uuid)
+        self.assertEqual(search_vector, "'berlin':2B 'hinterhof':3 'office':1A")
+
+        SiteProfile.objects.filter(uuid=siteprofile.uuid).update(city='Köln')
+        search_vector = SiteProfile.objects.values_list('search_vector', flat=True).get(uuid=siteprofile.uuid)
+        self.assertEqual(search_vector, "'hinterhof':3 'köln':2B 'office':1A")
+
+    def test_normalized_fields_follow_writes(self):
+        siteprofile = SiteProfile.objects.create(
+            address_line1='  Hauptstraße\t 5 ', postcode='80331', city='MÜNCHEN', organization_uuid=uuid.uuid4())
+        siteprofile = SiteProfile.objects.get(uuid=siteprofile.uuid)
+        self.assertEqual(siteprofile.address_line1_normalized, 'hauptstrasse 5')
+        self.assertEqual(siteprofile.postcode_normalized, '80331')
+        self.assertEqual(siteprofile.city_normalized, 'munchen')
+
+        SiteProfile.objects.filter(uuid=siteprofile.uuid).update(city='Köln')
+        self.assertEqual(SiteProfile.objects.get(uuid=siteprofile.uuid).city_normalized, 'koln')
+
+
+class SiteProfileCounterTest(TestCase):
+    def _count(self, organization_uuid):
+        return SiteProfileCounter.objects.get(organization_uuid=organization_uuid).count
+
+    def test_counter_follows_writes(self):
+        organization_uuid, other_organization_uuid = uuid.uuid4(), uuid.uuid4()
+        siteprofile = SiteProfile.objects.create(organization_uuid=organization_uuid)
+        self.assertEqual(self._count(organization_uuid), 1)
+
+        SiteProfile.objects.bulk_create(
+            [SiteProfile(organization_uuid=organization_uuid) for _ in range(3)] +
+            [SiteProfile(organization_uuid=other_organization_uuid)])
+        self.assertEqual(self._count(organization_uuid), 4)
+        self.assertEqual(self._count(other_organization_uuid), 1)
+
+        siteprofile.organization_uuid = other_organization_uuid
+        siteprofile.save()
+        self.assertEqual(self._count(organization_uuid), 3)
+        self.assertEqual(self._count(other_organization_uuid), 2)
+
+        SiteProfile.objects.filter(organization_uuid=organization_uuid).update(name='renamed')
+        self.assertEqual(self._count(organization_uuid), 3)
+
+        SiteProfile.objects.filter(organization_uuid=organization_uuid).delete()
+        self.assertEqual(self._count(organization_uuid), 0)
+        siteprofile.delete()
+        self.assertEqual(self._count(other_organization_uuid), 1)
+
+
+class WorkflowLevel2MembershipTest(TestCase):
+    def _memberships(self, siteprofile):
+        return sorted(WorkflowLevel2Membership.objects.filter(
+            siteprofile=siteprofile).values_list('workflowlevel2_uuid', 'organization_uuid'))
+
+    def test_memberships_follow_writes(self):
+        organization_uuid, other_organization_uuid = uuid.uuid4(), uuid.uuid4()
+        wfl2_1, wfl2_2, wfl2_3 = (str(uuid.uuid4()) for _ in range(3))
+        siteprofile = SiteProfile.objects.create(
+            organization_uuid=organization_uuid, workflowlevel2_uuid=[wfl2_1, wfl2_2, wfl2_1])
+        self.assertEqual(self._memberships(siteprofile),
+                         sorted([(wfl2_1, organization_uuid), (wfl2_2, organization_uuid)]))
+
+        siteprofiles = SiteProfile.objects.bulk_create([
+            SiteProfile(organization_uuid=organization_uuid, workflowlevel2_uuid=[wfl2_3]),
+            SiteProfile(organization_uuid=organization_uuid, workflowlevel2_uuid=None),
+        ])
+        self.assertEqual(self._memberships(siteprofiles[0]), [(wfl2_3, organization_uuid)])
+        self.assertEqual(self._memberships(siteprofiles[1]), [])
+
+        siteprofile.workflowlevel2_uuid = [wfl2_2, wfl2_3]
+        siteprofile.save()
+        self.assertEqual(self._memberships(siteprofile),
+                         sorted([(wfl2_2, organization_uuid), (wfl2_3, organization_uuid)]))
+
+        SiteProfile.objects.filter(uuid=siteprofile.uuid).update(organization_uuid=other_organization_uuid)
+        self.assertEqual(self._memberships(siteprofile),
+                         sorted([(wfl2_2, other_organization_uuid), (wfl2_3, other_organization_uuid)]))
+
+        SiteProfile.objects.filter(uuid=siteprofile.uuid).update(workflowlevel2_uuid=None)
+        self.assertEqual(self._memberships(siteprofile), [])
+
+        SiteProfile.objects.filter(organization_uuid=organization_uuid).delete()
+        self.assertFalse(WorkflowLevel2Membership.objects.exists())
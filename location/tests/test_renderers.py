@@ -0,0 +1,84 @@
+import uuid
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+import msgpack
+from django.test import TestCase
+from rest_framework import renderers as drf_renderers
+from rest_framework.test import APIRequestFactory
+
+from . import model_factories as mfactories
+from ..models import SiteProfile
+from .. import renderers
+from ..renderers import JSONRenderer, MessagePackRenderer
+from ..views import SiteProfileViewSet
+
+
+class JSONRendererTest(TestCase):
+    data = {
+        'id': uuid.UUID('6b1d5f3a-1c2e-4b7f-9a8d-0e4f5c6b7a81'),
+        'name': 'Ñame \u2028',
+        'latitude': Decimal('52.5000000000000000'),
+        'workflowlevel2_uuid': ['a', None],
+        'count': 3,
+    }
+
+    def test_render_like_drf(self):
+        self.assertEqual(JSONRenderer().render(self.data), drf_renderers.JSONRenderer().render(self.data))
+
+    @skipUnless(renderers.orjson, 'orjson is not installed')
+    def test_render_with_orjson(self):
+        # The standard library fallback is the DRF renderer, which must not be used.
+        with mock.patch.object(drf_renderers.JSONRenderer, 'render', side_effect=AssertionError):
+            rendered = JSONRenderer().render(self.data)
+        self.assertEqual(rendered, drf_renderers.JSONRenderer().render(self.data))
+
+    def test_render_without_orjson(self):
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(JSONRenderer().render(self.data), drf_renderers.JSONRenderer().render(self.data))
+
+    def test_render_indented(self):
+        rendered = JSONRenderer().render(self.data, 'application/json; indent=4')
+        self.assertEqual(rendered, drf_renderers.JSONRenderer().render(self.data, 'application/json; indent=4'))
+
+    def test_render_none(self):
+        self.assertEqual(JSONRenderer().render(None), b'')
+
+
+class MessagePackViewsTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.organization_uuid = str(uuid.uuid4())
+        self.session = {
+            'jwt_organization_uuid': self.organization_uuid,
+        }
+
+    def test_render(self):
+        siteprofile = mfactories.SiteProfile.create(organization_uuid=self.organization_uuid)
+        siteprofile.refresh_from_db()
+        request = self.factory.get('', HTTP_ACCEPT='application/msgpack')
+        request.session = self.session
+        response = SiteProfileViewSet.as_view({'get': 'list'})(request).render()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        data = msgpack.unpackb(response.content, raw=False)
+        self.assertEqual(data['results'][0]['id'], str(siteprofile.uuid))
+        self.assertEqual(data['results'][0]['latitude'], str(siteprofile.latitude))
+
+    def test_render_with_format(self):
+        self.assertEqual(MessagePackRenderer().render({'id': uuid.UUID(int=1)}),
+                         msgpack.packb({'id': '00000000-0000-0000-0000-000000000001'}, use_bin_type=True))
+
+    def test_parse(self):
+        data = [{'name': 'Site 1', 'city': 'Berlin'}, {'name': 'Site 2'}]
+        request = self.factory.post('', msgpack.packb(data, use_bin_type=True), content_type='application/msgpack')
+        request.session = self.session
+        response = SiteProfileViewSet.as_view({'post': 'bulk'})(request)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(SiteProfile.objects.filter(organization_uuid=self.organization_uuid).count(), 2)
+
+    def test_parse_error(self):
+        request = self.factory.post('', b'\xc1', content_type='application/msgpack')
+        request.session = self.session
+        response = SiteProfileViewSet.as_view({'post': 'bulk'})(request)
+        self.assertEqual(response.status_code, 400)
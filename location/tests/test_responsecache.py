@@ -0,0 +1,166 @@
+import uuid
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.test import APIRequestFactory
+
+from . import model_factories as mfactories
+from ..models import ProfileType, SiteProfile
+from ..responsecache import DjangoResponseCache, LocalResponseCache, get_response_cache
+from ..views import ProfileTypeViewSet, SiteProfileViewSet
+
+LOCAL = {
+    'BACKEND': 'local',
+    'TIMEOUT': 300,
+    'MAX_ENTRIES': 100,
+    'MAX_BYTES': 1024 * 1024,
+    'MAX_ENTRY_BYTES': 1024 * 1024,
+    'CACHE_ALIAS': 'default',
+    'LOG_INTERVAL': 1000,
+}
+
+
+class LocalResponseCacheTest(SimpleTestCase):
+    def test_get_set(self):
+        cache = LocalResponseCache(timeout=60, max_entry_bytes=100, max_entries=10, max_bytes=1000)
+        self.assertIsNone(cache.get('a'))
+        cache.set('a', b'content', 'application/json')
+        self.assertEqual(cache.get('a'), (b'content', 'application/json'))
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'entries': 1, 'bytes': 7})
+
+    def test_max_entries(self):
+        cache = LocalResponseCache(timeout=60, max_entry_bytes=100, max_entries=2, max_bytes=1000)
+        cache.set('a', b'a', 'application/json')
+        cache.set('b', b'b', 'application/json')
+        cache.get('a')
+        cache.set('c', b'c', 'application/json')
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNotNone(cache.get('c'))
+
+    def test_max_bytes(self):
+        cache = LocalResponseCache(timeout=60, max_entry_bytes=100, max_entries=10, max_bytes=10)
+        cache.set('a', b'123456', 'application/json')
+        cache.set('b', b'123456', 'application/json')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['bytes'], 6)
+        cache.set('c', b'x' * 101, 'application/json')
+        self.assertIsNone(cache.get('c'))
+
+    def test_log_stats(self):
+        cache = LocalResponseCache(timeout=60, max_entry_bytes=100, max_entries=10, max_bytes=1000, log_interval=2)
+        cache.set('a', b'a', 'application/json')
+        with self.assertLogs('location.responsecache', 'INFO') as logs:
+            cache.get('a')
+            cache.get('b')
+            cache.get('a')
+            cache.get('a')
+        self.assertEqual(logs.output, [
+            'INFO:location.responsecache:Response cache: 1 hits, 1 misses, 1 entries, 1 bytes (hit rate 50.0%)',
+            'INFO:location.responsecache:Response cache: 3 hits, 1 misses, 1 entries, 1 bytes (hit rate 75.0%)',
+        ])
+
+    def test_timeout(self):
+        cache = LocalResponseCache(timeout=60, max_entry_bytes=100, max_entries=10, max_bytes=1000)
+        cache.set('a', b'a', 'application/json')
+        with mock.patch('location.responsecache.time.monotonic', return_value=10 ** 9):
+            self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_settings(self):
+        with override_settings(RESPONSE_CACHE=dict(LOCAL, BACKEND='')):
+            self.assertIsNone(get_response_cache())
+        with override_settings(RESPONSE_CACHE=LOCAL):
+            self.assertIsInstance(get_response_cache(), LocalResponseCache)
+            self.assertIs(get_response_cache(), get_response_cache())
+        with override_settings(RESPONSE_CACHE=dict(LOCAL, BACKEND='django')):
+            self.assertIsInstance(get_response_cache(), DjangoResponseCache)
+
+
+@override_settings(RESPONSE_CACHE=LOCAL)
+class ResponseCacheViewsTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.organization_uuid = str(uuid.uuid4())
+        self.session = {
+            'jwt_organization_uuid': self.organization_uuid,
+        }
+        self.siteprofile = mfactories.SiteProfile.create(organization_uuid=self.organization_uuid)
+
+    def _get(self, query='', action='list', viewset=SiteProfileViewSet, **extra):
+        request = self.factory.get(query, **extra)
+        request.session = self.session
+        kwargs = {'pk': self.siteprofile.pk} if action == 'retrieve' else {}
+        response = viewset.as_view({'get': action})(request, **kwargs)
+        return response.render() if hasattr(response, 'render') else response
+
+    def test_hit(self):
+        hits = get_response_cache().stats()['hits']
+        for action in ('list', 'retrieve'):
+            response = self._get(action=action)
+            self.assertEqual(response['X-Cache'], 'MISS')
+            with self.assertNumQueries(1):
+                cached = self._get(action=action)
+            self.assertEqual(cached.status_code, 200)
+            self.assertEqual(cached['X-Cache'], 'HIT')
+            self.assertEqual(cached.content, response.content)
+            self.assertEqual(cached['Content-Type'], response['Content-Type'])
+            self.assertEqual(cached['ETag'], response['ETag'])
+        self.assertEqual(get_response_cache().stats()['hits'], hits + 2)
+
+    def test_normalized_query(self):
+        self.assertEqual(self._get('?limit=5&offset=0')['X-Cache'], 'MISS')
+        self.assertEqual(self._get('?offset=0&limit=5')['X-Cache'], 'HIT')
+        self.assertEqual(self._get('?limit=6&offset=0')['X-Cache'], 'MISS')
+
+    def test_format(self):
+        self._get()
+        response = self._get(HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+
+    def test_browsable_api(self):
+        self._get(HTTP_ACCEPT='text/html')
+        self.assertFalse(self._get(HTTP_ACCEPT='text/html').has_header('X-Cache'))
+
+    def test_organizations(self):
+        self._get()
+        self.session = {'jwt_organization_uuid': str(uuid.uuid4())}
+        response = self._get()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'], [])
+
+    def test_writes(self):
+        self._get()
+        self.assertEqual(self._get()['X-Cache'], 'HIT')
+        for write in (lambda: mfactories.SiteProfile.create(organization_uuid=self.organization_uuid),
+                      lambda: SiteProfile.objects.filter(organization_uuid=self.organization_uuid).update(name='X'),
+                      lambda: SiteProfile.objects.filter(organization_uuid=self.organization_uuid).delete()):
+            write()
+            response = self._get()
+            self.assertEqual(response['X-Cache'], 'MISS')
+            self.assertEqual(self._get().content, response.content)
+
+    def test_not_found(self):
+        SiteProfile.objects.filter(pk=self.siteprofile.pk).delete()
+        self.assertEqual(self._get(action='retrieve').status_code, 404)
+        self.assertEqual(self._get(action='retrieve')['X-Cache'], 'MISS')
+
+    def test_database_json(self):
+        with override_settings(SITEPROFILE_DATABASE_JSON=True):
+            response = self._get()
+            cached = self._get()
+        self.assertEqual(cached['X-Cache'], 'HIT')
+        self.assertEqual(cached.content, response.content)
+
+    def test_profiletypes(self):
+        ProfileType.objects.create(name='A', organization_uuid=self.organization_uuid)
+        self._get(viewset=ProfileTypeViewSet)
+        self.assertEqual(self._get(viewset=ProfileTypeViewSet)['X-Cache'], 'HIT')
+        ProfileType.objects.create(name='Global', organization_uuid=uuid.uuid4(), is_global=True)
+        self.assertEqual(self._get(viewset=ProfileTypeViewSet)['X-Cache'], 'MISS')
+
+    @override_settings(RESPONSE_CACHE=dict(LOCAL, BACKEND=''))
+    def test_disabled(self):
+        self._get()
+        self.assertFalse(self._get().has_header('X-Cache'))
@@ -1,6 +1,10 @@
+from decimal import Decimal
+
 from django.test import TestCase
 from rest_framework.test import APIRequestFactory
 
+from location.models import SiteProfile
+from location.rows import RowSerializer
 from location.serializers import SiteProfileSerializer
 from . import model_factories as mfactories
 
@@ -36,6 +40,34 @@ class LocationSerializerTest(TestCase):
                 'create_date',
                 'edit_date',
                 'workflowlevel2_uuid',
+                'external_id',
                 'profiletype')
 
         self.assertEqual(set(data.keys()), set(keys))
+
+
+class RowSerializerTest(TestCase):
+    def setUp(self):
+        mfactories.SiteProfile(name='Ñame', country='DE', latitude=Decimal('52.5'), longitude=Decimal('-0.0000001'),
+                               external_id='A-1', notes='Notes')
+        mfactories.SiteProfile(profiletype=None, country='', workflowlevel2_uuid=None)
+        mfactories.SiteProfile(latitude=Decimal('0'), longitude=Decimal('180'), workflowlevel2_uuid=[])
+
+    def _assert_representations_equal(self, serializer):
+        row_serializer = RowSerializer(serializer)
+        siteprofiles = SiteProfile.objects.order_by('uuid')
+        rows = row_serializer.get_queryset(siteprofiles)
+        self.assertEqual(row_serializer.to_representation_many(rows),
+                         [serializer.to_representation(siteprofile) for siteprofile in siteprofiles])
+
+    def test_representation(self):
+        self._assert_representations_equal(SiteProfileSerializer())
+
+    def test_representation_sparse_fieldset(self):
+        self._assert_representations_equal(SiteProfileSerializer(fields=('id', 'name', 'profiletype', 'latitude')))
+
+    def test_extra_columns(self):
+        row_serializer = RowSerializer(SiteProfileSerializer(fields=('name', )), extra_columns=('organization_uuid', ))
+        row = row_serializer.get_queryset(SiteProfile.objects.order_by('name')).first()
+        self.assertIsNotNone(row.organization_uuid)
+        self.assertEqual(list(row_serializer.to_representation(row)), ['name'])
@@ -0,0 +1,105 @@
+import struct
+
+from django.test import SimpleTestCase
+
+from .. import tiles
+
+
+def read_varint(data, position):
+    result = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        result |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return result, position
+
+
+def read_message(data):
+    """Parse a protobuf message into a dict of field number -> list of raw values."""
+    fields, position = {}, 0
+    while position < len(data):
+        key, position = read_varint(data, position)
+        field, wire_type = key >> 3, key & 0x7
+        if wire_type == 0:
+            value, position = read_varint(data, position)
+        elif wire_type == 1:
+            value, position = data[position:position + 8], position + 8
+        else:
+            length, position = read_varint(data, position)
+            value, position = data[position:position + length], position + length
+        fields.setdefault(field, []).append(value)
+    return fields
+
+
+def read_packed(data):
+    values, position = [], 0
+    while position < len(data):
+        value, position = read_varint(data, position)
+        values.append(value)
+    return values
+
+
+def unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def decode_points(tile):
+    """Decode a point layer into its name, extent and `((x, y), properties)` features."""
+    layers = read_message(tile)[3]
+    layer = read_message(layers[0])
+    keys = [key.decode() for key in layer.get(3, [])]
+    values = []
+    for value in layer.get(4, []):
+        (field, (raw, )), = read_message(value).items()
+        values.append({1: lambda v: v.decode(),
+                       3: lambda v: struct.unpack('<d', v)[0],
+                       6: unzigzag,
+                       7: bool}[field](raw))
+    features = []
+    for feature in layer.get(2, []):
+        feature = read_message(feature)
+        tags = read_packed(feature[2][0])
+        command, x, y = read_packed(feature[4][0])
+        assert feature[3] == [1] and command == 9
+        features.append(((unzigzag(x), unzigzag(y)),
+                         {keys[k]: values[v] for k, v in zip(tags[::2], tags[1::2])}))
+    return layer[1][0].decode(), layer[5][0], features
+
+
+class TilesTest(SimpleTestCase):
+    def test_tile_bounds(self):
+        self.assertEqual(tiles.tile_bounds(0, 0, 0), (-180, -tiles.MAX_MERCATOR_LATITUDE,
+                                                      180, tiles.MAX_MERCATOR_LATITUDE))
+        min_longitude, min_latitude, max_longitude, max_latitude = tiles.tile_bounds(1, 1, 0)
+        self.assertEqual((min_longitude, max_longitude), (0, 180))
+        self.assertAlmostEqual(min_latitude, 0)
+        self.assertAlmostEqual(max_latitude, tiles.MAX_MERCATOR_LATITUDE)
+
+    def test_is_valid_tile(self):
+        self.assertTrue(tiles.is_valid_tile(0, 0, 0))
+        self.assertTrue(tiles.is_valid_tile(2, 3, 3))
+        self.assertFalse(tiles.is_valid_tile(2, 4, 0))
+        self.assertFalse(tiles.is_valid_tile(23, 0, 0))
+
+    def test_project(self):
+        self.assertEqual(tiles.project(0, 0, 0, 0, 0), (2048, 2048))
+        self.assertEqual(tiles.project(-180, tiles.MAX_MERCATOR_LATITUDE, 0, 0, 0), (0, 0))
+        self.assertEqual(tiles.project(0, 0, 1, 1, 1), (0, 0))
+
+    def test_encode_points(self):
+        tile = tiles.encode_points('siteprofiles', [
+            (0, 0, {'id': 'a', 'name': 'Ñame', 'profiletype': 7, 'global': True}),
+            (-90, 45, {'id': 'b', 'name': 'Ñame', 'profiletype': None, 'weight': -1.5}),
+        ], 0, 0, 0)
+        name, extent, features = decode_points(tile)
+        self.assertEqual(name, 'siteprofiles')
+        self.assertEqual(extent, 4096)
+        self.assertEqual(features[0], ((2048, 2048), {'id': 'a', 'name': 'Ñame', 'profiletype': 7, 'global': True}))
+        self.assertEqual(features[1][0], (1024, 1473))
+        self.assertEqual(features[1][1], {'id': 'b', 'name': 'Ñame', 'weight': -1.5})
+
+    def test_encode_empty(self):
+        self.assertEqual(decode_points(tiles.encode_points('siteprofiles', [], 3, 1, 2)),
+                         ('siteprofiles', 4096, []))
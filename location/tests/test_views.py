@@ -1,15 +1,24 @@
+import gzip
 import json
+from datetime import datetime
 from decimal import Decimal
 import uuid
 
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils.timezone import utc
 from rest_framework.exceptions import ValidationError
 from rest_framework.test import APIRequestFactory
 
 from . import model_factories as mfactories
+from .. import autocomplete
+from .test_tiles import decode_points
+from ..dbjson import DatabaseJSONSerializer
 from ..models import ProfileType, SiteProfile
-from ..views import ProfileTypeViewSet, SiteProfileViewSet
+from ..serializers import SiteProfileSerializer
+from ..views import ProfileTypeViewSet, SiteProfileViewSet, WorkflowLevel2ViewSet
 
 
 # ###########
@@ -90,6 +99,35 @@ class ProfileTypeListViewsTest(TestCase):
         self.assertEqual(response.data['results'][1]['name'], 'B')
         self.assertEqual(response.data['results'][2]['name'], 'A')
 
+    def test_list_cursor_pagination(self):
+        for name in ('C', 'A', 'B'):
+            ProfileType.objects.create(name=name, organization_uuid=self.organization_uuid)
+        ProfileType.objects.create(name='A', organization_uuid=uuid.uuid4(), is_global=True)
+
+        view = ProfileTypeViewSet.as_view({'get': 'list'})
+        request = self.factory.get('?cursor=&limit=3')
+        request.session = self.session
+        response = view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([pt['name'] for pt in response.data['results']], ['A', 'A', 'B'])
+
+        request = self.factory.get(response.data['next'])
+        request.session = self.session
+        response = view(request)
+        self.assertEqual([pt['name'] for pt in response.data['results']], ['C'])
+        self.assertIsNone(response.data['next'])
+
+    def test_list_estimated_count(self):
+        ProfileType.objects.create(name='A', organization_uuid=self.organization_uuid)
+        request = self.factory.get('?count=estimate')
+        request.session = self.session
+        view = ProfileTypeViewSet.as_view({'get': 'list'})
+        response = view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.data['count'], int)
+        self.assertTrue(response.data['approximate'])
+        self.assertEqual(len(response.data['results']), 1)
+
     def test_list_missing_organization_uuid(self):
         request = self.factory.get('')
         request.session = {}
@@ -142,6 +180,37 @@ class ProfileTypeListViewsTest(TestCase):
         self.assertEqual(response.data['results'][0]['id'], profile_type_global.pk)
 
 
+class ProfileTypeConditionalGetViewsTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.organization_uuid = str(uuid.uuid4())
+        self.session = {
+            'jwt_organization_uuid': self.organization_uuid,
+        }
+        self.profiletype = ProfileType.objects.create(name='A', organization_uuid=self.organization_uuid)
+
+    def _list(self, **extra):
+        request = self.factory.get('', **extra)
+        request.session = self.session
+        return ProfileTypeViewSet.as_view({'get': 'list'})(request)
+
+    def test_list_not_modified(self):
+        etag = self._list()['ETag']
+        with self.assertNumQueries(1):
+            response = self._list(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_list_modified_by_global_profiletype(self):
+        etag = self._list()['ETag']
+        ProfileType.objects.create(name='Other', organization_uuid=uuid.uuid4())
+        self.assertEqual(self._list(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        ProfileType.objects.create(name='Global', organization_uuid=uuid.uuid4(), is_global=True)
+        response = self._list(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
 class ProfileTypeRetrieveViewsTest(TestCase):
     def setUp(self):
         self.factory = APIRequestFactory()
@@ -452,6 +521,120 @@ class SiteProfileListViewsTest(TestCase):
         self.assertEqual(len(response.data['results']), 50)
         self.assertEqual(response.data['next'], 'http://testserver/?limit=50&offset=50')
 
+    def test_list_without_count(self):
+        mfactories.SiteProfile.create_batch(size=3, organization_uuid=self.organization_uuid)
+        view = SiteProfileViewSet.as_view({'get': 'list'})
+        request = self.factory.get('?count=false&limit=2')
+        request.session = self.session
+        response = view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.data), ['next', 'previous', 'results'])
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(response.data['next'], 'http://testserver/?count=false&limit=2&offset=2')
+
+        request = self.factory.get(response.data['next'])
+        request.session = self.session
+        response = view(request)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(response.data['previous'], 'http://testserver/?count=false&limit=2')
+
+    def test_list_estimated_count(self):
+        mfactories.SiteProfile.create_batch(size=3, organization_uuid=self.organization_uuid)
+        mfactories.SiteProfile.create(organization_uuid=str(uuid.uuid4()))
+        view = SiteProfileViewSet.as_view({'get': 'list'})
+        request = self.factory.get('?count=estimate&limit=2')
+        request.session = self.session
+        response = view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+        self.assertFalse(response.data['approximate'])
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+        request = self.factory.get('?count=estimate&search=Berlin')
+        request.session = self.session
+        response = view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.data['count'], int)
+        self.assertTrue(response.data['approximate'])
+
+        request = self.factory.get('?count=estimate&uuid=')
+        request.session = self.session
+        response = view(request)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_exact_count_cached(self):
+        mfactories.SiteProfile.create_batch(size=3, organization_uuid=self.organization_uuid)
+        mfactories.SiteProfile.create(organization_uuid=str(uuid.uuid4()))
+        view = SiteProfileViewSet.as_view({'get': 'list'})
+        for query, count in (('?limit=2', 3), ('?limit=2&uuid=' + str(uuid.uuid4()), 0)):
+            request = self.factory.get(query)
+            request.session = self.session
+            with CaptureQueriesContext(connection) as queries:
+                response = view(request)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['count'], count)
+            self.assertNotIn('approximate', response.data)
+            counted = any('COUNT(*)' in captured['sql'] for captured in queries.captured_queries)
+            self.assertEqual(counted, query != '?limit=2')
+
+    def test_list_count_invalid(self):
+        request = self.factory.get('?count=maybe')
+        request.session = self.session
+        view = SiteProfileViewSet.as_view({'get': 'list'})
+        response = view(request)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('count', response.data)
+
+    def _list_all_pages(self, query):
+        view = SiteProfileViewSet.as_view({'get': 'list'})
+        pages = []
+        url = query
+        while url:
+            request = self.factory.get(url)
+            request.session = self.session
+            response = view(request)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            pages.append([sp['name'] for sp in response.data['results']])
+            url = response.data['next']
+        return pages
+
+    def test_list_cursor_pagination(self):
+        for name in ('B', 'A', 'C', 'A', 'B'):
+            mfactories.SiteProfile.create(name=name, organization_uuid=self.organization_uuid)
+
+        pages = self._list_all_pages('?cursor=&limit=2')
+        self.assertEqual(pages, [['A', 'A'], ['B', 'B'], ['C']])
+
+        pages = self._list_all_pages('?cursor=&limit=2&ordering=-name')
+        self.assertEqual(pages, [['C', 'B'], ['B', 'A'], ['A']])
+
+        pages = self._list_all_pages('?cursor=&limit=3&ordering=create_date')
+        self.assertEqual(pages, [['B', 'A', 'C'], ['A', 'B']])
+
+        pages = self._list_all_pages('?cursor=&limit=5')
+        self.assertEqual(pages, [['A', 'A', 'B', 'B', 'C']])
+
+    def test_list_cursor_pagination_invalid(self):
+        view = SiteProfileViewSet.as_view({'get': 'list'})
+        for query in ('?cursor=invalid', '?cursor=&ordering=profiletype'):
+            request = self.factory.get(query)
+            request.session = self.session
+            response = view(request)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('cursor', response.data)
+
+        mfactories.SiteProfile.create_batch(size=3, organization_uuid=self.organization_uuid)
+        request = self.factory.get('?cursor=&limit=1')
+        request.session = self.session
+        response = view(request)
+        request = self.factory.get(response.data['next'] + '&ordering=-name')
+        request.session = self.session
+        response = view(request)
+        self.assertEqual(response.status_code, 400)
+
     def test_several_workflowlevel2_uuids_filter(self):
         wfl2_1, wfl2_2, wfl2_3 = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
         mfactories.SiteProfile.create(
@@ -513,6 +696,634 @@ class SiteProfileListViewsTest(TestCase):
         response = view(request)
         self.assertEqual(len(response.data['results']), 0)
 
+    def test_search_accent_and_case_insensitive(self):
+        mfactories.SiteProfile.create(name='a', city='München', address_line1='Maximilian-  Straße 1',
+                                      organization_uuid=self.organization_uuid)
+        mfactories.SiteProfile.create(name='b', city='Munster', organization_uuid=self.organization_uuid)
+        view = SiteProfileViewSet.as_view({'get': 'list'})
+        for search in ('Munchen', 'MÜNCHEN', 'münchen', 'maximilian- strasse'):
+            request = self.factory.get('', {'search': search})
+            request.session = self.session
+            response = view(request)
+            self.assertEqual([result['name'] for result in response.data['results']], ['a'], search)
+
+    def test_full_text_search(self):
+        mfactories.SiteProfile.create(name='Office', city='Berlin', notes='next to the station',
+                                      organization_uuid=self.organization_uuid)
+        mfactories.SiteProfile.create(name='Station', city='Hamburg', organization_uuid=self.organization_uuid)
+        mfactories.SiteProfile.create(name='Depot', administrative_level1='Station',
+                                      organization_uuid=self.organization_uuid)
+        mfactories.SiteProfile.create(name='Station', organization_uuid=uuid.uuid4())
+        mfactories.SiteProfile.create(name='Warehouse', city='Berlin', organization_uuid=self.organization_uuid)
+        view = SiteProfileViewSet.as_view({'get': 'list'})
+
+        request = self.factory.get('?q=station')
+        request.session = self.session
+        response = view(request)
+        self.assertEqual([result['name'] for result in response.data['results']], ['Station', 'Depot', 'Office'])
+
+        request = self.factory.get('?q=station berlin')
+        request.session = self.session
+        response = view(request)
+        self.assertEqual([result['name'] for result in response.data['results']], ['Office'])
+
+    def test_search_rank(self):
+        for name, city in (('a', 'Berlin-Mitte'), ('b', 'Berlin'), ('c', 'Paris'), ('d', 'Berlingen')):
+            mfactories.SiteProfile.create(name=name, city=city, organization_uuid=self.organization_uuid)
+        view = SiteProfileViewSet.as_view({'get': 'list'})
+
+        request = self.factory.get('?search=berlin&search_rank=true')
+        request.session = self.session
+        response = view(request)
+        self.assertEqual([result['name'] for result in response.data['results']], ['b', 'd', 'a'])
+
+        request = self.factory.get('?search=berlin')
+        request.session = self.session
+        response = view(request)
+        self.assertEqual([result['name'] for result in response.data['results']], ['a', 'b', 'd'])
+
+
+class SiteProfileGeoFilterViewsTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.organization_uuid = str(uuid.uuid4())
+        self.session = {
+            'jwt_organization_uuid': self.organization_uuid,
+        }
+        self.siteprofiles = {}
+        for name, latitude, longitude in (('Berlin', '52.5200', '13.4050'),
+                                          ('Potsdam', '52.3906', '13.0645'),
+                                          ('Hamburg', '53.5511', '9.9937'),
+                                          ('Suva', '-18.1416', '178.4419'),
+                                          ('Apia', '-13.8507', '-171.7514')):
+            self.siteprofiles[name] = mfactories.SiteProfile.create(
+                name=name, latitude=latitude, longitude=longitude,
+                organization_uuid=self.organization_uuid)
+        mfactories.SiteProfile.create(
+            name='Berlin other org', latitude='52.5200', longitude='13.4050',
+            organization_uuid=str(uuid.uuid4()))
+
+    def _list(self, query):
+        request = self.factory.get(query)
+        request.session = self.session
+        view = SiteProfileViewSet.as_view({'get': 'list'})
+        return view(request)
+
+    def test_near_filter(self):
+        response = self._list('?near=52.52,13.405&radius_km=30')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([sp['name'] for sp in response.data['results']], ['Berlin', 'Potsdam'])
+
+        response = self._list('?near=52.52,13.405&radius_km=300')
+        self.assertEqual([sp['name'] for sp in response.data['results']], ['Berlin', 'Hamburg', 'Potsdam'])
+
+    def test_near_filter_across_antimeridian(self):
+        response = self._list('?near=-16,179.9&radius_km=1500')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([sp['name'] for sp in response.data['results']], ['Apia', 'Suva'])
+
+    def test_near_filter_missing_radius(self):
+        response = self._list('?near=52.52,13.405')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('radius_km', response.data)
+
+    def test_near_filter_invalid_point(self):
+        for query in ('?near=52.52&radius_km=10', '?near=a,b&radius_km=10', '?near=91,0&radius_km=10'):
+            response = self._list(query)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('near', response.data)
+
+    def test_bbox_filter(self):
+        response = self._list('?bbox=9,52,14,54')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([sp['name'] for sp in response.data['results']], ['Berlin', 'Hamburg', 'Potsdam'])
+
+        response = self._list('?bbox=13,52.4,14,52.6')
+        self.assertEqual([sp['name'] for sp in response.data['results']], ['Berlin'])
+
+    def test_bbox_filter_across_antimeridian(self):
+        response = self._list('?bbox=170,-20,-170,-10')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([sp['name'] for sp in response.data['results']], ['Apia', 'Suva'])
+
+    def test_bbox_filter_invalid(self):
+        for query in ('?bbox=9,52,14', '?bbox=9,54,14,52', '?bbox=9,52,190,54'):
+            response = self._list(query)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('bbox', response.data)
+
+    def test_markers(self):
+        request = self.factory.get('?bbox=9,52,14,54')
+        request.session = self.session
+        view = SiteProfileViewSet.as_view({'get': 'markers'})
+        response = view(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 3)
+        berlin = self.siteprofiles['Berlin']
+        self.assertEqual(response.data['results'][0], {
+            'id': str(berlin.uuid),
+            'name': 'Berlin',
+            'latitude': '52.5200000000000000',
+            'longitude': '13.4050000000000000',
+            'profiletype': berlin.profiletype.pk,
+        })
+
+    def _clusters(self, query):
+        request = self.factory.get(query)
+        request.session = self.session
+        view = SiteProfileViewSet.as_view({'get': 'clusters'})
+        return view(request)
+
+    def test_clusters(self):
+        response = self._clusters('?zoom=2')
+        self.assertEqual(response.status_code, 200)
+        clusters = sorted(response.data, key=lambda cluster: -cluster['count'])
+        self.assertEqual([cluster['count'] for cluster in clusters], [3, 1, 1])
+        self.assertAlmostEqual(clusters[0]['latitude'], (52.52 + 52.3906 + 53.5511) / 3, places=4)
+        self.assertAlmostEqual(clusters[0]['longitude'], (13.405 + 13.0645 + 9.9937) / 3, places=4)
+
+        response = self._clusters('?zoom=8')
+        self.assertEqual(len(response.data), 5)
+
+    def test_clusters_with_bbox(self):
+        response = self._clusters('?zoom=0&bbox=170,-20,-170,-10')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(cluster['count'] for cluster in response.data), [1, 1])
+
+    def test_clusters_invalid_zoom(self):
+        for query in ('', '?zoom=-1', '?zoom=a'):
+            response = self._clusters(query)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('zoom', response.data)
+
+    def _tile(self, query, z, x, y, **extra):
+        request = self.factory.get(query, **extra)
+        request.session = self.session
+        view = SiteProfileViewSet.as_view({'get': 'tiles'}, **SiteProfileViewSet.tiles.kwargs)
+        return view(request, z=z, x=x, y=y)
+
+    def test_tiles(self):
+        response = self._tile('', '3', '4', '2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.mapbox-vector-tile')
+        name, extent, features = decode_points(response.content)
+        self.assertEqual(name, 'siteprofiles')
+        self.assertEqual(sorted(properties['name'] for _, properties in features), ['Berlin', 'Hamburg', 'Potsdam'])
+        berlin = self.siteprofiles['Berlin']
+        self.assertIn({'id': str(berlin.uuid), 'name': 'Berlin', 'profiletype': berlin.profiletype.pk},
+                      [properties for _, properties in features])
+
+        response = self._tile('', '0', '0', '0')
+        self.assertEqual(len(decode_points(response.content)[2]), 5)
+
+    def test_tiles_filtered(self):
+        hamburg = self.siteprofiles['Hamburg']
+        response = self._tile(f'?profiletype__id={hamburg.profiletype.pk}', '3', '4', '2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([properties['name'] for _, properties in decode_points(response.content)[2]], ['Hamburg'])
+
+        response = self._tile(f'?workflowlevel2_uuid={uuid.uuid4()}', '3', '4', '2')
+        self.assertEqual(decode_points(response.content)[2], [])
+
+    def test_tiles_invalid(self):
+        response = self._tile('', '3', '8', '2')
+        self.assertEqual(response.status_code, 404)
+
+    def test_tiles_accept(self):
+        response = self._tile('', '3', '4', '2', HTTP_ACCEPT='application/vnd.mapbox-vector-tile')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.mapbox-vector-tile')
+        self.assertEqual(len(decode_points(response.content)[2]), 3)
+
+        response = self._tile('', '3', '8', '2', HTTP_ACCEPT='application/vnd.mapbox-vector-tile').render()
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.content, b'')
+
+    def test_tiles_url(self):
+        self.assertEqual(reverse('location:siteprofile-tiles', kwargs={'z': 3, 'x': 4, 'y': 2}),
+                         '/siteprofiles/tiles/3/4/2.mvt')
+
+    def _nearest(self, query):
+        request = self.factory.get(query)
+        request.session = self.session
+        view = SiteProfileViewSet.as_view({'get': 'nearest'})
+        return view(request)
+
+    def test_nearest(self):
+        response = self._nearest('?lat=52.4&lng=13.1&k=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([sp['name'] for sp in response.data], ['Potsdam', 'Berlin'])
+        self.assertAlmostEqual(response.data[0]['distance'], 2.6, delta=0.1)
+        self.assertAlmostEqual(response.data[1]['distance'], 24.6, delta=0.1)
+
+    def test_nearest_far_away(self):
+        response = self._nearest('?lat=-16&lng=-179.9&k=10')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([sp['name'] for sp in response.data], ['Suva', 'Apia', 'Hamburg', 'Berlin', 'Potsdam'])
+
+    def test_nearest_with_filter(self):
+        hamburg = self.siteprofiles['Hamburg']
+        response = self._nearest(f'?lat=52.4&lng=13.1&k=2&uuid={hamburg.uuid}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([sp['name'] for sp in response.data], ['Hamburg'])
+
+    def test_nearest_invalid_params(self):
+        response = self._nearest('?lat=100&k=0')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {'lat', 'lng', 'k'})
+
+
+class SiteProfileConditionalGetViewsTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.organization_uuid = str(uuid.uuid4())
+        self.session = {
+            'jwt_organization_uuid': self.organization_uuid,
+        }
+        self.siteprofile = mfactories.SiteProfile.create(organization_uuid=self.organization_uuid)
+
+    def _get(self, query='', action='list', pk=None, **extra):
+        request = self.factory.get(query, **extra)
+        request.session = self.session
+        kwargs = {'pk': pk or self.siteprofile.pk} if action == 'retrieve' else {}
+        return SiteProfileViewSet.as_view({'get': action})(request, **kwargs)
+
+    def test_validators(self):
+        other = mfactories.SiteProfile.create(organization_uuid=self.organization_uuid)
+        response = self._get()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertTrue(response.has_header('Last-Modified'))
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotEqual(self._get('?name=A')['ETag'], response['ETag'])
+        self.assertNotEqual(self._get(action='retrieve')['ETag'], response['ETag'])
+        self.assertNotEqual(self._get(action='retrieve', pk=other.pk)['ETag'], self._get(action='retrieve')['ETag'])
+
+    def test_if_none_match(self):
+        for action in ('list', 'retrieve'):
+            etag = self._get(action=action)['ETag']
+            with self.assertNumQueries(1):
+                response = self._get(action=action, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], etag)
+            self.assertEqual(response.content, b'')
+
+    def test_if_modified_since(self):
+        last_modified = self._get()['Last-Modified']
+        response = self._get(HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_modified(self):
+        etag = self._get()['ETag']
+        mfactories.SiteProfile.create(organization_uuid=uuid.uuid4())
+        self.assertEqual(self._get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        for write in (lambda: mfactories.SiteProfile.create(organization_uuid=self.organization_uuid),
+                      lambda: SiteProfile.objects.filter(uuid=self.siteprofile.uuid).update(name='Updated'),
+                      lambda: SiteProfile.objects.filter(organization_uuid=self.organization_uuid).delete()):
+            write()
+            response = self._get(HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+            etag = response['ETag']
+
+    def test_format(self):
+        etag = self._get()['ETag']
+        response = self._get(HTTP_IF_NONE_MATCH=etag, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_auth(self):
+        request = self.factory.get('', HTTP_IF_NONE_MATCH='*')
+        response = SiteProfileViewSet.as_view({'get': 'list'})(request)
+        self.assertEqual(response.status_code, 403)
+
+
+class SiteProfileSparseFieldsetViewsTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.organization_uuid = str(uuid.uuid4())
+        self.session = {
+            'jwt_organization_uuid': self.organization_uuid,
+        }
+        self.siteprofiles = mfactories.SiteProfile.create_batch(
+            size=3, latitude=Decimal('52.5'), longitude=Decimal('13.4'), notes='Long notes',
+            organization_uuid=self.organization_uuid)
+
+    def _get(self, query, action='list', **kwargs):
+        request = self.factory.get(query)
+        request.session = self.session
+        view = SiteProfileViewSet.as_view({'get': action})
+        with CaptureQueriesContext(connection) as queries:
+            response = view(request, **kwargs)
+        return response, queries
+
+    def test_list_fields(self):
+        response, queries = self._get('?fields=id,name,latitude,longitude')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+        for result in response.data['results']:
+            self.assertEqual(set(result), {'id', 'name', 'latitude', 'longitude'})
+        self.assertNotIn('"notes"', queries[-1]['sql'])
+
+    def test_list_omit(self):
+        response, queries = self._get('?omit=notes,workflowlevel2_uuid')
+        all_fields = set(self._get('')[0].data['results'][0])
+        self.assertEqual(set(response.data['results'][0]), all_fields - {'notes', 'workflowlevel2_uuid'})
+        self.assertNotIn('"notes"', queries[-1]['sql'])
+
+    def test_list_fields_no_deferred_loading(self):
+        """The ordering field of the cursor is read with the page, not one query per row."""
+        _, all_queries = self._get('?cursor=&limit=2&ordering=-postcode')
+        response, queries = self._get('?cursor=&limit=2&ordering=-postcode&fields=id,name')
+        self.assertIsNotNone(response.data['next'])
+        self.assertEqual(len(queries), len(all_queries))
+
+    def test_retrieve_fields(self):
+        siteprofile = self.siteprofiles[0]
+        response, queries = self._get('?fields=id,profiletype', 'retrieve', pk=siteprofile.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'id': str(siteprofile.uuid), 'profiletype': siteprofile.profiletype_id})
+        self.assertEqual(len(queries), 2)  # ChangeVersion and SiteProfile
+
+    def test_export_fields(self):
+        response, _ = self._get('?fields=name', 'export')
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual([set(json.loads(line)) for line in lines], [{'name'}] * 3)
+
+    def test_unknown_fields(self):
+        response, _ = self._get('?fields=id,secret&omit=password')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {'fields', 'omit'})
+
+    def test_fields_ignored_by_other_actions(self):
+        response, _ = self._get('?lat=52.5&lng=13.4&fields=id', 'nearest')
+        self.assertIn('name', response.data[0])
+
+
+@override_settings(SITEPROFILE_DATABASE_JSON=True)
+class SiteProfileDatabaseJSONViewsTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.organization_uuid = str(uuid.uuid4())
+        self.session = {
+            'jwt_organization_uuid': self.organization_uuid,
+        }
+        mfactories.SiteProfile.create(
+            name='Ñame "quoted"\n', country='DE', latitude=Decimal('-0.0000001'), external_id='A-1',
+            organization_uuid=self.organization_uuid)
+        mfactories.SiteProfile.create(
+            name='B', profiletype=None, country='', workflowlevel2_uuid=None, organization_uuid=self.organization_uuid)
+        mfactories.SiteProfile.create(name='C', workflowlevel2_uuid=[], organization_uuid=self.organization_uuid)
+        SiteProfile.objects.filter(name='C').update(edit_date=datetime(2019, 5, 1, 12, tzinfo=utc))
+
+    def _list(self, query='', **extra):
+        request = self.factory.get(query, **extra)
+        request.session = self.session
+        view = SiteProfileViewSet.as_view({'get': 'list'})
+        return view(request)
+
+    def _assert_same_as_serializer(self, query):
+        response = self._list(query)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        with self.settings(SITEPROFILE_DATABASE_JSON=False):
+            expected = self._list(query).render()
+        self.assertEqual(json.loads(response.content.decode('utf-8')), json.loads(expected.content.decode('utf-8')))
+        return json.loads(response.content.decode('utf-8'))
+
+    def test_list(self):
+        data = self._assert_same_as_serializer('')
+        self.assertEqual(data['count'], 3)
+        edit_dates = {result['name']: result['edit_date'] for result in data['results']}
+        self.assertEqual(edit_dates['C'], '2019-05-01T12:00:00Z')
+
+    def test_list_paginated(self):
+        data = self._assert_same_as_serializer('?limit=1&offset=1&ordering=name')
+        self.assertEqual([result['name'] for result in data['results']], ['C'])
+        data = self._assert_same_as_serializer('?cursor=&limit=2&count=false')
+        self.assertIsNotNone(data['next'])
+
+    def test_list_filtered_and_sparse(self):
+        data = self._assert_same_as_serializer('?search=&fields=id,name,latitude&q=B')
+        self.assertEqual(len(data['results']), 1)
+
+    def test_list_empty(self):
+        data = self._assert_same_as_serializer('?uuid=' + str(uuid.uuid4()))
+        self.assertEqual(data['results'], [])
+
+    def test_list_line_separators(self):
+        SiteProfile.objects.filter(name='B').update(name='B\u2028\u2029')
+        response = self._list('?ordering=name')
+        with self.settings(SITEPROFILE_DATABASE_JSON=False):
+            expected = self._list('?ordering=name').render()
+        self.assertEqual(response.content, expected.content)
+        self.assertIn(b'B\\u2028\\u2029', response.content)
+
+    def test_render_deleted_rows(self):
+        serializer = DatabaseJSONSerializer(SiteProfileSerializer())
+        queryset = SiteProfile.objects.filter(organization_uuid=self.organization_uuid).order_by('name')
+        rows = list(serializer.get_queryset(queryset))
+        SiteProfile.objects.filter(name='B').delete()
+        data = json.loads(serializer.render(queryset, rows).decode('utf-8'))
+        self.assertEqual([result['name'] for result in data], ['C', 'Ñame "quoted"\n'])
+
+    def test_list_other_formats(self):
+        response = self._list('?format=api')
+        self.assertIn('results', response.data)
+        response = self._list('', HTTP_ACCEPT='application/json; indent=4')
+        self.assertIn('results', response.data)
+
+
+class SiteProfileExportViewsTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.organization_uuid = str(uuid.uuid4())
+        self.session = {
+            'jwt_organization_uuid': self.organization_uuid,
+        }
+        self.siteprofiles = mfactories.SiteProfile.create_batch(
+            size=3, name='Ñame', city='Berlin', organization_uuid=self.organization_uuid)
+        mfactories.SiteProfile.create(city='Berlin', organization_uuid=str(uuid.uuid4()))
+
+    def _export(self, query='', **extra):
+        request = self.factory.get(query, **extra)
+        request.session = self.session
+        view = SiteProfileViewSet.as_view({'get': 'export'}, **SiteProfileViewSet.export.kwargs)
+        return view(request)
+
+    def test_export(self):
+        response = self._export()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 3)
+        exported = {row['id']: row for row in map(json.loads, lines)}
+        self.assertEqual(set(exported), {str(siteprofile.uuid) for siteprofile in self.siteprofiles})
+
+        request = self.factory.get('')
+        request.session = self.session
+        detail = SiteProfileViewSet.as_view({'get': 'retrieve'})(request, pk=self.siteprofiles[0].pk).render()
+        self.assertEqual(exported[str(self.siteprofiles[0].uuid)], json.loads(detail.content))
+
+    def test_export_filtered(self):
+        response = self._export(f'?uuid={self.siteprofiles[1].uuid}')
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [str(self.siteprofiles[1].uuid)])
+
+    def test_export_gzip(self):
+        response = self._export(HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        lines = gzip.decompress(b''.join(response.streaming_content)).splitlines()
+        self.assertEqual(len(lines), 3)
+        for accept_encoding in ('deflate, *;q=0.5', 'GZIP;q=0.1'):
+            self.assertEqual(self._export(HTTP_ACCEPT_ENCODING=accept_encoding)['Content-Encoding'], 'gzip')
+        for accept_encoding in ('gzip;q=0, deflate', 'gzip; q=0.0', 'x-gzip-foo', '*;q=0', 'identity'):
+            self.assertFalse(self._export(HTTP_ACCEPT_ENCODING=accept_encoding).has_header('Content-Encoding'))
+
+    def test_export_accept(self):
+        response = self._export(HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 3)
+
+    def test_export_missing_auth(self):
+        request = self.factory.get('')
+        view = SiteProfileViewSet.as_view({'get': 'export'}, **SiteProfileViewSet.export.kwargs)
+        response = view(request)
+        self.assertEqual(response.status_code, 403)
+
+    def test_export_url(self):
+        self.assertEqual(reverse('location:siteprofile-export'), '/siteprofiles/export.ndjson')
+
+
+class SiteProfileBatchGetViewsTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.organization_uuid = str(uuid.uuid4())
+        self.session = {
+            'jwt_organization_uuid': self.organization_uuid,
+        }
+        self.siteprofiles = mfactories.SiteProfile.create_batch(size=3, organization_uuid=self.organization_uuid)
+        self.siteprofile_other = mfactories.SiteProfile.create(organization_uuid=uuid.uuid4())
+
+    def _batch_get(self, data):
+        request = self.factory.post('', data, format='json')
+        request.session = self.session
+        view = SiteProfileViewSet.as_view({'post': 'batch_get'})
+        return view(request)
+
+    def test_batch_get(self):
+        missing_uuid = str(uuid.uuid4())
+        data = [str(self.siteprofiles[2].uuid), missing_uuid, str(self.siteprofiles[0].uuid),
+                str(self.siteprofile_other.uuid), str(self.siteprofiles[2].uuid)]
+        with self.assertNumQueries(1):
+            response = self._batch_get(data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['uuid'] for result in response.data['results']], [data[0], data[2]])
+        self.assertEqual(response.data['results'][0]['name'], self.siteprofiles[2].name)
+        self.assertEqual([str(missing) for missing in response.data['missing']],
+                         [missing_uuid, str(self.siteprofile_other.uuid)])
+
+    def test_batch_get_chunks(self):
+        SiteProfileViewSet.batch_get_chunk_size, chunk_size = 2, SiteProfileViewSet.batch_get_chunk_size
+        try:
+            with self.assertNumQueries(2):
+                response = self._batch_get([str(siteprofile.uuid) for siteprofile in reversed(self.siteprofiles)])
+        finally:
+            SiteProfileViewSet.batch_get_chunk_size = chunk_size
+        self.assertEqual([result['uuid'] for result in response.data['results']],
+                         [str(siteprofile.uuid) for siteprofile in reversed(self.siteprofiles)])
+        self.assertEqual(response.data['missing'], [])
+
+    def test_batch_get_invalid(self):
+        for data in ({'uuids': [str(self.siteprofiles[0].uuid)]}, ['not-a-uuid']):
+            response = self._batch_get(data)
+            self.assertEqual(response.status_code, 400)
+
+    def test_batch_get_missing_auth(self):
+        request = self.factory.post('', [str(self.siteprofiles[0].uuid)], format='json')
+        view = SiteProfileViewSet.as_view({'post': 'batch_get'})
+        response = view(request)
+        self.assertEqual(response.status_code, 403)
+
+class SiteProfileAutocompleteViewsTest(TestCase):
+    def setUp(self):
+        autocomplete.cache.clear()
+        self.factory = APIRequestFactory()
+        self.organization_uuid = str(uuid.uuid4())
+        self.session = {
+            'jwt_organization_uuid': self.organization_uuid,
+        }
+        self.berlin = mfactories.SiteProfile.create(
+            name='Zentrale', address_line1='Straße des 17. Juni', postcode='10623', city='Berlin',
+            organization_uuid=self.organization_uuid)
+        self.bremen = mfactories.SiteProfile.create(
+            name='Bremer  Lager', postcode='10115', city='Bremen', organization_uuid=self.organization_uuid)
+        mfactories.SiteProfile.create(name='Bremen', city='Bremen', organization_uuid=str(uuid.uuid4()))
+
+    def _autocomplete(self, query):
+        request = self.factory.get(query)
+        request.session = self.session
+        view = SiteProfileViewSet.as_view({'get': 'autocomplete'})
+        return view(request)
+
+    def test_autocomplete(self):
+        response = self._autocomplete('?prefix=BRE')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [{
+            'id': str(self.bremen.uuid),
+            'name': 'Bremer  Lager',
+            'address_line1': self.bremen.address_line1,
+            'postcode': self.bremen.postcode,
+            'city': 'Bremen',
+        }])
+
+    def test_autocomplete_normalized(self):
+        for prefix in ('strasse des', 'STRASSE  DES 17', '106', 'bremer l', 'ze', 'be'):
+            response = self._autocomplete(f'?prefix={prefix}')
+            self.assertEqual(len(response.data), 1, prefix)
+        response = self._autocomplete('?prefix=10')
+        self.assertEqual([result['name'] for result in response.data], ['Bremer  Lager', 'Zentrale'])
+
+    def test_autocomplete_no_wildcards(self):
+        for prefix in ('%25%25', '__', 'erlin'):
+            response = self._autocomplete(f'?prefix={prefix}')
+            self.assertEqual(response.data, [], prefix)
+
+    def test_autocomplete_limit(self):
+        response = self._autocomplete('?prefix=10&limit=1')
+        self.assertEqual([result['name'] for result in response.data], ['Bremer  Lager'])
+
+    def test_autocomplete_cached(self):
+        self._autocomplete('?prefix=10')
+        with self.assertNumQueries(0):
+            response = self._autocomplete('?prefix=10')
+        self.assertEqual(len(response.data), 2)
+
+    def test_autocomplete_cache_invalidated_by_write(self):
+        self._autocomplete('?prefix=10')
+        request = self.factory.delete('')
+        request.session = self.session
+        SiteProfileViewSet.as_view({'delete': 'destroy'})(request, pk=self.bremen.pk)
+        response = self._autocomplete('?prefix=10')
+        self.assertEqual([result['name'] for result in response.data], ['Zentrale'])
+
+    def test_autocomplete_invalid_params(self):
+        response = self._autocomplete('?limit=100')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {'prefix', 'limit'})
+        response = self._autocomplete('?prefix=b')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {'prefix'})
+
+    def test_autocomplete_missing_auth(self):
+        request = self.factory.get('?prefix=10')
+        view = SiteProfileViewSet.as_view({'get': 'autocomplete'})
+        response = view(request)
+        self.assertEqual(response.status_code, 403)
+
 
 class SiteProfileCreateViewsTest(TestCase):
     def setUp(self):
@@ -646,6 +1457,389 @@ class SiteProfileCreateViewsTest(TestCase):
         self.assertEqual(float(siteprofile.latitude), data['latitude'])
         self.assertEqual(siteprofile.profiletype.pk, data['profiletype'])
 
+    def test_create_duplicate_external_id(self):
+        SiteProfile.objects.create(name='A', external_id='ext-1', organization_uuid=self.organization_uuid)
+        SiteProfile.objects.create(name='B', external_id='ext-2', organization_uuid=uuid.uuid4())
+        view = SiteProfileViewSet.as_view({'post': 'create'})
+
+        request = self.factory.post('', {'name': 'C', 'external_id': 'ext-1'})
+        request.session = self.session
+        response = view(request)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('external_id', response.data)
+
+        request = self.factory.post('', {'name': 'C', 'external_id': 'ext-2'})
+        request.session = self.session
+        response = view(request)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['external_id'], 'ext-2')
+
+
+class SiteProfileBulkCreateViewsTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.organization_uuid = str(uuid.uuid4())
+        self.session = {
+            'jwt_organization_uuid': self.organization_uuid,
+        }
+        self.profiletype = ProfileType.objects.create(
+            name='Nämé', organization_uuid=self.organization_uuid)
+        self.profiletype_other = ProfileType.objects.create(
+            name='Other', organization_uuid=uuid.uuid4())
+
+    def _bulk(self, data):
+        request = self.factory.post('', data, format='json')
+        request.session = self.session
+        view = SiteProfileViewSet.as_view({'post': 'bulk'})
+        return view(request)
+
+    def test_bulk_create(self):
+        wfl2_uuid = str(uuid.uuid4())
+        data = [
+            {'name': 'A', 'profiletype': self.profiletype.pk, 'country': 'DE', 'latitude': '52.52',
+             'workflowlevel2_uuid': [wfl2_uuid], 'organization_uuid': str(uuid.uuid4())},
+            {'name': 'B', 'profiletype': self.profiletype.pk},
+            {'city': 'Berlin', 'profiletype': None},
+        ]
+        with self.assertNumQueries(2):
+            response = self._bulk(data)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['errors'], [])
+        self.assertEqual([created['index'] for created in response.data['created']], [0, 1, 2])
+
+        siteprofile = SiteProfile.objects.get(uuid=response.data['created'][0]['id'])
+        self.assertEqual(siteprofile.name, 'A')
+        self.assertEqual(siteprofile.profiletype, self.profiletype)
+        self.assertEqual(siteprofile.country, 'DE')
+        self.assertEqual(siteprofile.latitude, Decimal('52.52'))
+        self.assertEqual(siteprofile.workflowlevel2_uuid, [wfl2_uuid])
+        self.assertEqual(str(siteprofile.organization_uuid), self.organization_uuid)
+        self.assertEqual(SiteProfile.objects.filter(organization_uuid=self.organization_uuid).count(), 3)
+
+    def test_bulk_create_partially_invalid(self):
+        data = [
+            {'name': 'A', 'profiletype': self.profiletype.pk},
+            {'name': 'B', 'profiletype': self.profiletype_other.pk},
+            {'name': 'C', 'profiletype': 0},
+            {'notes': 'missing fields'},
+            'not an object',
+            {'name': 'D'},
+        ]
+        response = self._bulk(data)
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([created['index'] for created in response.data['created']], [0, 5])
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2, 3, 4])
+        self.assertIn('profiletype', response.data['errors'][0]['errors'])
+        self.assertIn('profiletype', response.data['errors'][1]['errors'])
+        self.assertIn('non_field_errors', response.data['errors'][2]['errors'])
+        self.assertEqual(
+            sorted(SiteProfile.objects.filter(organization_uuid=self.organization_uuid).values_list('name', flat=True)),
+            ['A', 'D'])
+
+    def test_bulk_create_duplicate_external_id(self):
+        SiteProfile.objects.create(name='A', external_id='ext-1', organization_uuid=self.organization_uuid)
+        response = self._bulk([{'name': 'B', 'external_id': 'ext-1'},
+                               {'name': 'C', 'external_id': 'ext-2'},
+                               {'name': 'D', 'external_id': 'ext-2'}])
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([created['index'] for created in response.data['created']], [1])
+        self.assertEqual([error['index'] for error in response.data['errors']], [0, 2])
+
+    def test_bulk_create_all_invalid(self):
+        response = self._bulk([{'notes': 'missing fields'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], [])
+        self.assertFalse(SiteProfile.objects.exists())
+
+    def test_bulk_create_not_a_list(self):
+        response = self._bulk({'name': 'A'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('non_field_errors', response.data)
+
+    def test_bulk_create_too_many(self):
+        SiteProfileViewSet.bulk_max_rows, bulk_max_rows = 2, SiteProfileViewSet.bulk_max_rows
+        try:
+            response = self._bulk([{'name': 'A'}] * 3)
+        finally:
+            SiteProfileViewSet.bulk_max_rows = bulk_max_rows
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(SiteProfile.objects.exists())
+
+    def test_bulk_create_missing_auth(self):
+        request = self.factory.post('', [{'name': 'A'}], format='json')
+        view = SiteProfileViewSet.as_view({'post': 'bulk'})
+        response = view(request)
+        self.assertEqual(response.status_code, 403)
+
+
+class SiteProfileUpsertViewsTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.organization_uuid = str(uuid.uuid4())
+        self.session = {
+            'jwt_organization_uuid': self.organization_uuid,
+        }
+        self.profiletype = ProfileType.objects.create(
+            name='Nämé', organization_uuid=self.organization_uuid)
+
+    def _upsert(self, data):
+        request = self.factory.post('', data, format='json')
+        request.session = self.session
+        view = SiteProfileViewSet.as_view({'post': 'upsert'})
+        return view(request)
+
+    def test_upsert_create(self):
+        data = [
+            {'external_id': 'ext-1', 'name': 'A', 'profiletype': self.profiletype.pk, 'latitude': '52.52',
+             'workflowlevel2_uuid': [str(uuid.uuid4())]},
+            {'external_id': 'ext-2', 'city': 'Berlin'},
+        ]
+        response = self._upsert(data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([created['index'] for created in response.data['created']], [0, 1])
+        self.assertEqual(response.data['updated'], [])
+        self.assertEqual(response.data['unchanged'], [])
+
+        siteprofile = SiteProfile.objects.get(uuid=response.data['created'][0]['id'])
+        self.assertEqual(siteprofile.external_id, 'ext-1')
+        self.assertEqual(siteprofile.profiletype, self.profiletype)
+        self.assertEqual(siteprofile.latitude, Decimal('52.52'))
+        self.assertEqual(siteprofile.workflowlevel2_uuid, data[0]['workflowlevel2_uuid'])
+        self.assertEqual(str(siteprofile.organization_uuid), self.organization_uuid)
+        self.assertIsNotNone(siteprofile.create_date)
+        self.assertNotEqual(siteprofile.content_hash, '')
+
+    def test_upsert_update_and_unchanged(self):
+        self._upsert([{'external_id': 'ext-1', 'name': 'A', 'city': 'Berlin'},
+                      {'external_id': 'ext-2', 'name': 'B'}])
+        siteprofile = SiteProfile.objects.get(external_id='ext-1')
+        unchanged = SiteProfile.objects.get(external_id='ext-2')
+
+        response = self._upsert([{'external_id': 'ext-1', 'name': 'A2'},
+                                 {'external_id': 'ext-2', 'name': 'B'},
+                                 {'external_id': 'ext-3', 'name': 'C'}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['created'][0]['index'], 2)
+        self.assertEqual(response.data['updated'], [{'index': 0, 'id': siteprofile.uuid}])
+        self.assertEqual(response.data['unchanged'], [1])
+
+        updated = SiteProfile.objects.get(uuid=siteprofile.uuid)
+        self.assertEqual(updated.name, 'A2')
+        self.assertEqual(updated.city, '')
+        self.assertEqual(updated.create_date, siteprofile.create_date)
+        self.assertGreater(updated.edit_date, siteprofile.edit_date)
+        self.assertEqual(SiteProfile.objects.get(uuid=unchanged.uuid).edit_date, unchanged.edit_date)
+        self.assertEqual(SiteProfile.objects.filter(organization_uuid=self.organization_uuid).count(), 3)
+
+    def test_upsert_null_profiletype(self):
+        self._upsert([{'external_id': 'ext-1', 'name': 'A', 'profiletype': self.profiletype.pk}])
+        response = self._upsert([{'external_id': 'ext-1', 'name': 'A', 'profiletype': None},
+                                 {'external_id': 'ext-2', 'name': 'B', 'profiletype': None}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['errors'], [])
+        self.assertEqual(response.data['updated'][0]['index'], 0)
+        self.assertEqual(response.data['created'][0]['index'], 1)
+        self.assertIsNone(SiteProfile.objects.get(external_id='ext-1').profiletype)
+        self.assertIsNone(SiteProfile.objects.get(external_id='ext-2').profiletype)
+
+    def test_upsert_after_other_write(self):
+        self._upsert([{'external_id': 'ext-1', 'name': 'A'}])
+        siteprofile = SiteProfile.objects.get(external_id='ext-1')
+        siteprofile.name = 'Edited'
+        siteprofile.save()
+
+        response = self._upsert([{'external_id': 'ext-1', 'name': 'A'}])
+        self.assertEqual(response.data['updated'], [{'index': 0, 'id': siteprofile.uuid}])
+        self.assertEqual(SiteProfile.objects.get(uuid=siteprofile.uuid).name, 'A')
+
+    def test_upsert_other_organization(self):
+        other = SiteProfile.objects.create(name='A', external_id='ext-1', organization_uuid=uuid.uuid4())
+        response = self._upsert([{'external_id': 'ext-1', 'name': 'B'}])
+        self.assertEqual(len(response.data['created']), 1)
+        self.assertEqual(SiteProfile.objects.get(uuid=other.uuid).name, 'A')
+
+    def test_upsert_partially_invalid(self):
+        data = [
+            {'external_id': 'ext-1', 'name': 'A'},
+            {'name': 'B'},
+            {'external_id': 'ext-1', 'name': 'C'},
+            {'external_id': 'ext-4'},
+        ]
+        response = self._upsert(data)
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([created['index'] for created in response.data['created']], [0])
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2, 3])
+        self.assertIn('external_id', response.data['errors'][0]['errors'])
+        self.assertIn('external_id', response.data['errors'][1]['errors'])
+        self.assertEqual(SiteProfile.objects.get(external_id='ext-1').name, 'A')
+
+    def test_upsert_all_invalid(self):
+        response = self._upsert([{'name': 'A'}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(SiteProfile.objects.exists())
+
+    def test_upsert_missing_auth(self):
+        request = self.factory.post('', [{'external_id': 'ext-1', 'name': 'A'}], format='json')
+        view = SiteProfileViewSet.as_view({'post': 'upsert'})
+        response = view(request)
+        self.assertEqual(response.status_code, 403)
+
+class SiteProfileBulkUpdateDeleteViewsTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.organization_uuid = str(uuid.uuid4())
+        self.session = {
+            'jwt_organization_uuid': self.organization_uuid,
+        }
+        self.profiletype = ProfileType.objects.create(
+            name='Nämé', organization_uuid=self.organization_uuid)
+        self.siteprofiles = [
+            SiteProfile.objects.create(name=name, city=city, organization_uuid=self.organization_uuid)
+            for name, city in (('A', 'Berlin'), ('B', 'Berlin'), ('C', 'Madrid'))]
+        self.siteprofile_other = SiteProfile.objects.create(
+            name='D', city='Berlin', organization_uuid=uuid.uuid4())
+
+    def _call(self, method, data, query=''):
+        request = getattr(self.factory, method)(query, data, format='json')
+        request.session = self.session
+        view = SiteProfileViewSet.as_view({'patch': 'bulk_update', 'delete': 'bulk_destroy'})
+        return view(request)
+
+    def test_bulk_update_by_uuids(self):
+        uuids = [str(self.siteprofiles[0].uuid), str(self.siteprofiles[2].uuid), str(self.siteprofile_other.uuid)]
+        with self.assertNumQueries(2):
+            response = self._call('patch', {'uuids': uuids, 'values': {'profiletype': self.profiletype.pk}})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'updated': 2})
+        self.assertEqual(
+            sorted(SiteProfile.objects.filter(profiletype=self.profiletype).values_list('name', flat=True)),
+            ['A', 'C'])
+        siteprofile = SiteProfile.objects.get(uuid=self.siteprofiles[0].uuid)
+        self.assertGreater(siteprofile.edit_date, self.siteprofiles[0].edit_date)
+        self.assertEqual(siteprofile.city, 'Berlin')
+
+    def test_bulk_update_by_filter(self):
+        response = self._call('patch', {'values': {'notes': 'Retagged'}}, '?search=Berlin')
+        self.assertEqual(response.data, {'updated': 2})
+        self.assertEqual(
+            sorted(SiteProfile.objects.filter(notes='Retagged').values_list('name', flat=True)), ['A', 'B'])
+
+    def test_bulk_update_invalid_values(self):
+        profiletype_other = ProfileType.objects.create(name='Other', organization_uuid=uuid.uuid4())
+        for values in ({'profiletype': profiletype_other.pk}, {'external_id': 'ext-1'}, {'country': 'XX'}):
+            response = self._call('patch', {'uuids': [str(self.siteprofiles[0].uuid)], 'values': values})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('values', response.data)
+        self.assertEqual(SiteProfile.objects.get(uuid=self.siteprofiles[0].uuid).country, '')
+
+    def test_bulk_update_without_selection(self):
+        response = self._call('patch', {'values': {'notes': 'All'}})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(SiteProfile.objects.filter(notes='All').exists())
+
+    def test_bulk_delete_by_uuids(self):
+        uuids = [str(self.siteprofiles[0].uuid), str(self.siteprofile_other.uuid)]
+        response = self._call('delete', {'uuids': uuids})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'deleted': 1})
+        self.assertEqual(SiteProfile.objects.count(), 3)
+        self.assertTrue(SiteProfile.objects.filter(uuid=self.siteprofile_other.uuid).exists())
+
+    def test_bulk_delete_by_filter(self):
+        response = self._call('delete', {}, '?near=52.52,13.40&radius_km=10000&search=Berlin')
+        self.assertEqual(response.data, {'deleted': 2})
+        self.assertEqual(
+            sorted(SiteProfile.objects.values_list('name', flat=True)), ['C', 'D'])
+
+    def test_bulk_delete_without_selection(self):
+        response = self._call('delete', {})
+        self.assertEqual(response.status_code, 400)
+        response = self._call('delete', {}, '?search=&workflowlevel2_uuid=')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(SiteProfile.objects.count(), 4)
+
+    def test_bulk_delete_radius_without_near(self):
+        response = self._call('delete', {}, '?radius_km=5')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(SiteProfile.objects.count(), 4)
+
+    def test_bulk_delete_without_search_terms(self):
+        response = self._call('delete', {}, '?search=,')
+        self.assertEqual(response.status_code, 400)
+        response = self._call('patch', {'values': {'notes': 'x'}}, '?search=%20,%20')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(SiteProfile.objects.count(), 4)
+        self.assertFalse(SiteProfile.objects.filter(notes='x').exists())
+
+    def test_bulk_delete_missing_auth(self):
+        request = self.factory.delete('', {'uuids': [str(self.siteprofiles[0].uuid)]}, format='json')
+        view = SiteProfileViewSet.as_view({'delete': 'bulk_destroy'})
+        response = view(request)
+        self.assertEqual(response.status_code, 403)
+
+class SiteProfileWorkflowLevel2ViewsTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.organization_uuid = str(uuid.uuid4())
+        self.session = {
+            'jwt_organization_uuid': self.organization_uuid,
+        }
+        self.wfl2_uuid, self.wfl2_uuid_other = str(uuid.uuid4()), str(uuid.uuid4())
+        self.siteprofile_none = SiteProfile.objects.create(
+            name='A', organization_uuid=self.organization_uuid, workflowlevel2_uuid=None)
+        self.siteprofile_other = SiteProfile.objects.create(
+            name='B', organization_uuid=self.organization_uuid, workflowlevel2_uuid=[self.wfl2_uuid_other])
+        self.siteprofile_both = SiteProfile.objects.create(
+            name='C', organization_uuid=self.organization_uuid,
+            workflowlevel2_uuid=[self.wfl2_uuid_other, self.wfl2_uuid])
+        self.siteprofile_other_org = SiteProfile.objects.create(
+            name='D', organization_uuid=uuid.uuid4(), workflowlevel2_uuid=[self.wfl2_uuid_other])
+
+    def _workflowlevel2(self, data, query=''):
+        request = self.factory.post(query, data, format='json')
+        request.session = self.session
+        view = SiteProfileViewSet.as_view({'post': 'workflowlevel2'})
+        return view(request)
+
+    def _workflowlevel2_uuid(self, siteprofile):
+        return SiteProfile.objects.get(uuid=siteprofile.uuid).workflowlevel2_uuid
+
+    def test_add(self):
+        uuids = [str(siteprofile.uuid) for siteprofile in (
+            self.siteprofile_none, self.siteprofile_other, self.siteprofile_both, self.siteprofile_other_org)]
+        with self.assertNumQueries(1):
+            response = self._workflowlevel2(
+                {'uuids': uuids, 'workflowlevel2_uuid': self.wfl2_uuid, 'operation': 'add'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'updated': 2})
+        self.assertEqual(self._workflowlevel2_uuid(self.siteprofile_none), [self.wfl2_uuid])
+        self.assertEqual(self._workflowlevel2_uuid(self.siteprofile_other), [self.wfl2_uuid_other, self.wfl2_uuid])
+        self.assertEqual(self._workflowlevel2_uuid(self.siteprofile_both), [self.wfl2_uuid_other, self.wfl2_uuid])
+        self.assertEqual(self._workflowlevel2_uuid(self.siteprofile_other_org), [self.wfl2_uuid_other])
+
+    def test_remove_by_filter(self):
+        response = self._workflowlevel2({'workflowlevel2_uuid': self.wfl2_uuid_other, 'operation': 'remove'},
+                                        f'?workflowlevel2_uuid={self.wfl2_uuid_other}')
+        self.assertEqual(response.data, {'updated': 2})
+        self.assertEqual(self._workflowlevel2_uuid(self.siteprofile_other), [])
+        self.assertEqual(self._workflowlevel2_uuid(self.siteprofile_both), [self.wfl2_uuid])
+        self.assertEqual(self._workflowlevel2_uuid(self.siteprofile_other_org), [self.wfl2_uuid_other])
+
+    def test_invalid(self):
+        uuids = [str(self.siteprofile_none.uuid)]
+        for data in ({'uuids': uuids, 'workflowlevel2_uuid': self.wfl2_uuid, 'operation': 'replace'},
+                     {'uuids': uuids, 'operation': 'add'},
+                     {'workflowlevel2_uuid': self.wfl2_uuid, 'operation': 'add'}):
+            response = self._workflowlevel2(data)
+            self.assertEqual(response.status_code, 400)
+        self.assertIsNone(self._workflowlevel2_uuid(self.siteprofile_none))
+
+    def test_missing_auth(self):
+        request = self.factory.post('', {'uuids': [str(self.siteprofile_none.uuid)],
+                                         'workflowlevel2_uuid': self.wfl2_uuid, 'operation': 'add'}, format='json')
+        view = SiteProfileViewSet.as_view({'post': 'workflowlevel2'})
+        response = view(request)
+        self.assertEqual(response.status_code, 403)
 
 class SiteProfileUpdateViewsTest(TestCase):
     def setUp(self):
@@ -731,3 +1925,55 @@ class SiteProfileDeleteViewsTest(TestCase):
         view = SiteProfileViewSet.as_view({'delete': 'destroy'})
         response = view(request, pk=self.siteprofile.pk)
         self.assertEqual(response.status_code, 403)
+
+
+# ##############
+# WorkflowLevel2
+
+class WorkflowLevel2ViewsTest(TestCase):
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        self.organization_uuid = str(uuid.uuid4())
+        self.session = {
+            'jwt_organization_uuid': self.organization_uuid,
+        }
+        self.wfl2_1, self.wfl2_2 = sorted(str(uuid.uuid4()) for _ in range(2))
+        self.siteprofile_a = SiteProfile.objects.create(
+            name='A', organization_uuid=self.organization_uuid, workflowlevel2_uuid=[self.wfl2_1, self.wfl2_2])
+        self.siteprofile_b = SiteProfile.objects.create(
+            name='B', organization_uuid=self.organization_uuid, workflowlevel2_uuid=[self.wfl2_1])
+        SiteProfile.objects.create(
+            name='C', organization_uuid=uuid.uuid4(), workflowlevel2_uuid=[self.wfl2_1])
+
+    def _get(self, action, query='', **kwargs):
+        request = self.factory.get(query)
+        request.session = self.session
+        view = WorkflowLevel2ViewSet.as_view({'get': action})
+        return view(request, **kwargs)
+
+    def test_list_counts(self):
+        response = self._get('list')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual([dict(result) for result in response.data['results']],
+                         [{'workflowlevel2_uuid': self.wfl2_1, 'count': 2},
+                          {'workflowlevel2_uuid': self.wfl2_2, 'count': 1}])
+
+    def test_list_counts_by_siteprofile(self):
+        response = self._get('list', f'?siteprofile={self.siteprofile_b.uuid}')
+        self.assertEqual([dict(result) for result in response.data['results']],
+                         [{'workflowlevel2_uuid': self.wfl2_1, 'count': 1}])
+
+    def test_siteprofiles(self):
+        response = self._get('siteprofiles', workflowlevel2_uuid=self.wfl2_1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['name'] for result in response.data['results']], ['A', 'B'])
+
+        response = self._get('siteprofiles', workflowlevel2_uuid=self.wfl2_2)
+        self.assertEqual([result['name'] for result in response.data['results']], ['A'])
+
+    def test_missing_auth(self):
+        request = self.factory.get('')
+        view = WorkflowLevel2ViewSet.as_view({'get': 'list'})
+        response = view(request)
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,134 @@
+"""
+Minimal Mapbox Vector Tile encoder for point layers.
+
+Implements the subset of the vector tile specification (version 2) needed to
+serve SiteProfiles as points, writing the protobuf wire format directly:
+https://github.com/mapbox/vector-tile-spec/tree/master/2.1
+"""
+import math
+import struct
+
+CONTENT_TYPE = 'application/vnd.mapbox-vector-tile'
+EXTENT = 4096
+MAX_ZOOM = 22
+MAX_MERCATOR_LATITUDE = 85.0511287798066
+
+# protobuf wire types
+_VARINT = 0
+_FIXED64 = 1
+_LENGTH_DELIMITED = 2
+
+# Tile.Layer fields
+_LAYER = 3
+_LAYER_VERSION = 15
+_LAYER_NAME = 1
+_LAYER_FEATURE = 2
+_LAYER_KEY = 3
+_LAYER_VALUE = 4
+_LAYER_EXTENT = 5
+
+# Tile.Feature fields
+_FEATURE_TAGS = 2
+_FEATURE_TYPE = 3
+_FEATURE_GEOMETRY = 4
+_GEOM_TYPE_POINT = 1
+_COMMAND_MOVE_TO_ONE = (1 & 0x7) | (1 << 3)
+
+# Tile.Value fields
+_VALUE_STRING = 1
+_VALUE_DOUBLE = 3
+_VALUE_SINT = 6
+_VALUE_BOOL = 7
+
+
+def _varint(value):
+    encoded = bytearray()
+    while value > 0x7f:
+        encoded.append((value & 0x7f) | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _key(field, wire_type):
+    return _varint((field << 3) | wire_type)
+
+
+def _length_delimited(field, payload):
+    return _key(field, _LENGTH_DELIMITED) + _varint(len(payload)) + payload
+
+
+def _packed(field, values):
+    return _length_delimited(field, b''.join(_varint(value) for value in values))
+
+
+def _encode_value(value):
+    if isinstance(value, bool):
+        return _key(_VALUE_BOOL, _VARINT) + _varint(int(value))
+    if isinstance(value, int):
+        return _key(_VALUE_SINT, _VARINT) + _varint(_zigzag(value))
+    if isinstance(value, float):
+        return _key(_VALUE_DOUBLE, _FIXED64) + struct.pack('<d', value)
+    return _length_delimited(_VALUE_STRING, str(value).encode('utf-8'))
+
+
+def is_valid_tile(z, x, y):
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def tile_bounds(z, x, y):
+    """Return `(min_longitude, min_latitude, max_longitude, max_latitude)` of a web mercator tile."""
+    tiles = 2 ** z
+
+    def latitude(tile_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / tiles))))
+
+    return x / tiles * 360 - 180, latitude(y + 1), (x + 1) / tiles * 360 - 180, latitude(y)
+
+
+def project(longitude, latitude, z, x, y, extent=EXTENT):
+    """Project WGS84 coordinates to integer coordinates inside the given tile."""
+    scale = 2 ** z * extent
+    latitude = max(-MAX_MERCATOR_LATITUDE, min(MAX_MERCATOR_LATITUDE, latitude))
+    sin_latitude = math.sin(math.radians(latitude))
+    world_x = (longitude + 180) / 360 * scale
+    world_y = (0.5 - math.log((1 + sin_latitude) / (1 - sin_latitude)) / (4 * math.pi)) * scale
+    return int(round(world_x - x * extent)), int(round(world_y - y * extent))
+
+
+def encode_points(layer_name, points, z, x, y, extent=EXTENT):
+    """
+    Encode a tile with a single point layer.
+
+    `points` is an iterable of `(longitude, latitude, properties)` where
+    `properties` is a dict of str, int, float or bool values. `None` values
+    are left out.
+    """
+    keys, values = {}, {}
+    features = []
+    for longitude, latitude, properties in points:
+        tags = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((type(value), value), len(values)))
+        point_x, point_y = project(longitude, latitude, z, x, y, extent)
+        features.append(_length_delimited(_LAYER_FEATURE, b''.join((
+            _packed(_FEATURE_TAGS, tags),
+            _key(_FEATURE_TYPE, _VARINT) + _varint(_GEOM_TYPE_POINT),
+            _packed(_FEATURE_GEOMETRY, (_COMMAND_MOVE_TO_ONE, _zigzag(point_x), _zigzag(point_y))),
+        ))))
+    layer = b''.join([
+        _key(_LAYER_VERSION, _VARINT) + _varint(2),
+        _length_delimited(_LAYER_NAME, layer_name.encode('utf-8')),
+        *features,
+        *(_length_delimited(_LAYER_KEY, key.encode('utf-8')) for key in keys),
+        *(_length_delimited(_LAYER_VALUE, _encode_value(value)) for _, value in values),
+        _key(_LAYER_EXTENT, _VARINT) + _varint(extent),
+    ])
+    return _length_delimited(_LAYER, layer)
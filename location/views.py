@@ -1,16 +1,38 @@
-
-from django.db.models import Q
-from django.http import HttpRequest
+import hashlib
+import json
+from calendar import timegm
+
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db.models import Count, Q
+from django.http import Http404, HttpRequest, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag, urlencode
 from django_filters import rest_framework as django_filters
 from rest_framework import viewsets, status
 from rest_framework import filters as drf_filters
+from rest_framework import serializers
+from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.exceptions import ValidationError
 from rest_framework.request import Request
 from rest_framework.response import Response
 
-from .models import ProfileType, SiteProfile
+from .dbjson import DatabaseJSONSerializer
+from .models import ChangeVersion, ProfileType, SiteProfile, SiteProfileCounter, WorkflowLevel2Membership
+from .pagination import AggregateLimitOffsetPagination
 from .permissions import OrganizationPermission
-from .serializers import ProfileTypeSerializer, SiteProfileSerializer
-from . import filters
+from .responsecache import get_response_cache
+from .rows import RowSerializer
+from .serializers import (AutocompleteQuerySerializer, ClustersQuerySerializer, NearestQuerySerializer,
+                          ProfileTypeSerializer, SiteProfileAutocompleteSerializer, SiteProfileClusterSerializer,
+                          SiteProfileDistanceSerializer, SiteProfileMarkerSerializer,
+                          SiteProfileBulkPatchSerializer, SiteProfileBulkSelectionSerializer,
+                          SiteProfileBulkUpdateSerializer, SiteProfileSerializer, SiteProfileUpsertSerializer,
+                          SiteProfileWorkflowLevel2Serializer, WorkflowLevel2CountSerializer, validate_many)
+from . import autocomplete, bulk as bulk_writes, export, filters, geo, renderers, tiles
 
 
 class OrganizationQuerySetMixin(object):
@@ -51,7 +73,122 @@ class OrganizationExtensionMixin(object):
         return super().update(request_extended, *args, **kwargs)
 
 
-class ProfileTypeViewSet(OrganizationQuerySetMixin,
+def is_filtered(queryset, unfiltered_queryset):
+    """Whether the WHERE clause of the queryset is narrower than the one of the unfiltered queryset."""
+    def where(queryset):
+        return queryset.query.get_compiler(queryset.db).compile(queryset.query.where)
+
+    try:
+        return where(queryset) != where(unfiltered_queryset)
+    except EmptyResultSet:
+        return True
+
+
+class ConditionalResponse(Exception):
+    """Raised to answer a request with the response of its preconditions instead of running the handler."""
+
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalGetMixin(object):
+    """
+    Adds a strong ETag and Last-Modified to the responses of the
+    `conditional_actions`, and answers their If-None-Match and
+    If-Modified-Since requests with 304 Not Modified before any query or
+    serialization. Both are derived from the ChangeVersion of the view's
+    `change_version_resource` for the organization, plus the global one when
+    `global_change_versions` is set, so computing them takes one indexed
+    lookup.
+
+    When the response cache is enabled, other requests are answered with the
+    response cached under their ETag, see `responsecache`.
+    """
+    change_version_resource = None
+    global_change_versions = False
+    conditional_actions = ('list', 'retrieve')
+    conditional_validators = None
+    response_cache = None
+    response_cache_status = None
+
+    def get_normalized_uri(self, request):
+        """Absolute URI of the request with its query parameters sorted by name."""
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        return request.build_absolute_uri(request.path + (f'?{query}' if query else ''))
+
+    def get_conditional_validators(self, request):
+        """Return `(etag, last_modified)` of the response to the request."""
+        organization_uuid = request.session['jwt_organization_uuid']
+        organization_uuids = [organization_uuid]
+        if self.global_change_versions:
+            organization_uuids.append(ChangeVersion.ALL_ORGANIZATIONS)
+        versions = list(ChangeVersion.objects.filter(
+            resource=self.change_version_resource, organization_uuid__in=organization_uuids).order_by(
+            'organization_uuid').values_list('organization_uuid', 'version', 'edit_date'))
+        # The representation depends on the organization, the action with its URL kwargs, the URL with its query
+        # and the format. The edit dates tell apart versions that were rolled back and increased again.
+        key = json.dumps([str(organization_uuid), self.action,
+                          sorted((name, str(value)) for name, value in self.kwargs.items()),
+                          self.get_normalized_uri(request), request.accepted_media_type,
+                          [(str(organization), version, edit_date.isoformat())
+                           for organization, version, edit_date in versions]])
+        etag = quote_etag(hashlib.sha256(key.encode('utf-8')).hexdigest()[:32])
+        last_modified = max((edit_date for _, _, edit_date in versions), default=None)
+        return etag, last_modified
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method not in ('GET', 'HEAD') or self.action not in self.conditional_actions:
+            return
+        self.conditional_validators = etag, last_modified = self.get_conditional_validators(request)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timegm(last_modified.utctimetuple()) if last_modified else None)
+        if response is not None:
+            raise ConditionalResponse(response)
+        self.response_cache = self.get_response_cache(request)
+        if self.response_cache is not None:
+            cached = self.response_cache.get(etag)
+            self.response_cache_status = 'MISS' if cached is None else 'HIT'
+            if cached is not None:
+                content, content_type = cached
+                raise ConditionalResponse(HttpResponse(content, content_type=content_type))
+
+    def get_response_cache(self, request):
+        """The response cache, unless it is disabled or the format depends on the user, like the browsable API."""
+        if request.accepted_renderer.format == 'api':
+            return None
+        return get_response_cache()
+
+    def cache_response(self, response):
+        if response.status_code == 200 and not response.streaming:
+            self.response_cache.set(self.conditional_validators[0], response.content, response['Content-Type'])
+
+    def handle_exception(self, exc):
+        if isinstance(exc, ConditionalResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.conditional_validators and response.status_code in (200, 304):
+            etag, last_modified = self.conditional_validators
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(timegm(last_modified.utctimetuple()))
+            # Clients have to revalidate and shared caches must not mix organizations.
+            patch_cache_control(response, private=True, no_cache=True)
+        if self.response_cache_status:
+            response['X-Cache'] = self.response_cache_status
+            if self.response_cache_status == 'MISS' and request.method == 'GET':
+                if isinstance(response, Response):
+                    response.add_post_render_callback(self.cache_response)
+                else:
+                    self.cache_response(response)
+        return response
+
+
+class ProfileTypeViewSet(ConditionalGetMixin,
+                         OrganizationQuerySetMixin,
                          OrganizationExtensionMixin,
                          viewsets.ModelViewSet):
     """
@@ -109,9 +246,12 @@ class ProfileTypeViewSet(OrganizationQuerySetMixin,
                        drf_filters.OrderingFilter,)
     filter_fields = ('is_global', )
     ordering = ('name',)
+    change_version_resource = ChangeVersion.PROFILETYPE
+    global_change_versions = True
 
 
-class SiteProfileViewSet(OrganizationQuerySetMixin,
+class SiteProfileViewSet(ConditionalGetMixin,
+                         OrganizationQuerySetMixin,
                          OrganizationExtensionMixin,
                          viewsets.ModelViewSet):
     """
@@ -123,7 +263,9 @@ class SiteProfileViewSet(OrganizationQuerySetMixin,
     list:
     Retrieves a list of SiteProfiles.
 
-    Retrieves a list of SiteProfiles.
+    Retrieves a list of SiteProfiles. Like `retrieve` and `export`, it only
+    returns the fields listed in `fields`, or all but those listed in `omit`,
+    when given.
 
     create:
     Creates a new SiteProfile.
@@ -144,14 +286,444 @@ class SiteProfileViewSet(OrganizationQuerySetMixin,
     Deletes the SiteProfile with the given UUID.
 
     Deletes the SiteProfile with the given UUID.
+
+    nearest:
+    Retrieves the k SiteProfiles closest to a point.
+
+    Retrieves the `k` SiteProfiles closest to the point `lat`,`lng` ordered
+    by distance. The distance in km is added to every SiteProfile.
+
+    autocomplete:
+    Retrieves the SiteProfiles whose name, address or city begin with a prefix.
+
+    Retrieves at most `limit` SiteProfiles with only `id`, `name`,
+    `address_line1`, `postcode` and `city`, ordered by name, whose name,
+    `address_line1`, `postcode` or `city` begins with `prefix`, ignoring case,
+    accents and repeated whitespace. Results may be cached for up to a
+    minute.
+
+    markers:
+    Retrieves a list of SiteProfiles with only the fields needed for map markers.
+
+    Retrieves a list of SiteProfiles with only `id`, `name`, `latitude`,
+    `longitude` and `profiletype`. Supports the same filters as the list,
+    typically `bbox` with the current viewport.
+
+    clusters:
+    Retrieves SiteProfiles aggregated into clusters for a map zoom level.
+
+    Groups the SiteProfiles into grid cells sized for the given `zoom` and
+    retrieves one centroid and count per non-empty cell. Supports the same
+    filters as the list, typically `bbox` with the current viewport.
+
+    tiles:
+    Retrieves a Mapbox Vector Tile with the SiteProfiles in a map tile.
+
+    Retrieves the SiteProfiles inside the web mercator tile `z`/`x`/`y` as a
+    binary vector tile with a single point layer named `siteprofiles`. The
+    features have the properties `id`, `name` and `profiletype`. Supports
+    the same filters as the list, e.g. `profiletype__id` and
+    `workflowlevel2_uuid`.
+
+    export:
+    Exports all SiteProfiles as newline-delimited JSON.
+
+    Streams every SiteProfile of the organization, one JSON object per line
+    in the same format as the list, without pagination. Supports the same
+    filters as the list. The response is gzip-compressed when the client
+    accepts it.
+
+    batch_get:
+    Retrieves SiteProfiles by a list of UUIDs.
+
+    Retrieves the SiteProfiles whose UUIDs are given as a list in the body
+    (at most 10000 per request), in the order of the list. The UUIDs that do
+    not match a SiteProfile of the organization are listed in `missing`.
+
+    bulk:
+    Creates many SiteProfiles.
+
+    Creates the SiteProfiles of a list (at most 10000 per request). Valid
+    SiteProfiles are created even if others are invalid: the response lists
+    the `index` and `id` of the created ones in `created` and the `index` and
+    validation `errors` of the rejected ones in `errors`. The status is 201
+    when all were created, 207 when only some were and 400 when none was.
+
+    bulk_update:
+    Updates many SiteProfiles.
+
+    Sets the `values` (only specified fields) on all SiteProfiles selected by
+    the list of `uuids` and/or by the filter query parameters of the list, in
+    a single statement. The response contains the number of `updated`
+    SiteProfiles.
+
+    bulk_destroy:
+    Deletes many SiteProfiles.
+
+    Deletes all SiteProfiles selected by the list of `uuids` and/or by the
+    filter query parameters of the list, in a single statement. The response
+    contains the number of `deleted` SiteProfiles.
+
+    workflowlevel2:
+    Adds a WorkflowLevel2 to or removes it from many SiteProfiles.
+
+    Adds the `workflowlevel2_uuid` to, or removes it from, all SiteProfiles
+    selected by the list of `uuids` and/or by the filter query parameters of
+    the list, in a single statement. SiteProfiles that already have, or do
+    not have, the WorkflowLevel2 are left untouched. The response contains
+    the number of `updated` SiteProfiles.
+
+    upsert:
+    Creates or updates many SiteProfiles by their external_id.
+
+    Creates the SiteProfiles of a list (at most 10000 per request) whose
+    `external_id` is new to the organization and replaces all fields of the
+    existing ones. SiteProfiles whose content did not change are not written.
+    The response lists the `index` and `id` of the SiteProfiles in `created`
+    and `updated`, the `index` of the unchanged ones in `unchanged` and the
+    `index` and validation `errors` of the rejected ones in `errors`. The
+    status is 200 when no SiteProfile was rejected, 207 when some were and
+    400 when all were.
     """
+    bulk_max_rows = 10000
+    bulk_batch_size = 1000
+    batch_get_chunk_size = 1000
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Writes drop the autocomplete results cached for the organization."""
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            autocomplete.cache.invalidate(request.session.get('jwt_organization_uuid'))
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def get_serializer(self, *args, **kwargs):
+        fieldset = filters.SparseFieldsetFilter().get_fieldset(self.request, self)
+        if fieldset is not None:
+            kwargs.setdefault('fields', fieldset)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_row_serializer(self):
+        return RowSerializer(self.get_serializer(), extra_columns=self.sparse_fieldset_columns)
+
+    def get_rows(self, row_serializer):
+        return row_serializer.get_queryset(self.filter_queryset(self.get_queryset()))
+
+    def get_database_json_serializer(self):
+        """
+        Return a DatabaseJSONSerializer when SITEPROFILE_DATABASE_JSON is on
+        and compact JSON of all the requested fields can be built by Postgres.
+        """
+        if not settings.SITEPROFILE_DATABASE_JSON or self.paginator is None:
+            return None
+        renderer = self.request.accepted_renderer
+        if renderer.format != 'json' or renderer.get_indent(self.request.accepted_media_type, {}):
+            return None
+        database_json_serializer = DatabaseJSONSerializer(self.get_serializer())
+        return database_json_serializer if database_json_serializer.is_supported() else None
+
+    def list_database_json(self, database_json_serializer):
+        """The page rendered around the JSON of the SiteProfiles built by Postgres."""
+        queryset = self.get_queryset()
+        page = self.paginate_queryset(database_json_serializer.get_queryset(self.filter_queryset(queryset)))
+        renderer = self.request.accepted_renderer
+        envelope = renderer.render(self.get_paginated_response([]).data, self.request.accepted_media_type)
+        # The results are the last member of every page.
+        content = envelope[:-len(b'[]}')] + database_json_serializer.render(queryset, page) + b'}'
+        return HttpResponse(content, content_type=renderer.media_type)
+
+    # list and retrieve represent database rows without instantiating SiteProfiles, see RowSerializer.
+    def list(self, request, *args, **kwargs):
+        database_json_serializer = self.get_database_json_serializer()
+        if database_json_serializer is not None:
+            return self.list_database_json(database_json_serializer)
+        row_serializer = self.get_row_serializer()
+        rows = self.get_rows(row_serializer)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(row_serializer.to_representation_many(page))
+        return Response(row_serializer.to_representation_many(rows))
+
+    def retrieve(self, request, *args, **kwargs):
+        row_serializer = self.get_row_serializer()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(self.get_rows(row_serializer), **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(request, row)
+        return Response(row_serializer.to_representation(row))
+
+    def get_cached_count(self, queryset):
+        """Exact count of the unfiltered list from SiteProfileCounter."""
+        if is_filtered(queryset, self.get_queryset()):
+            return None
+        counter = SiteProfileCounter.objects.filter(
+            organization_uuid=self.request.session['jwt_organization_uuid']).first()
+        return counter.count if counter else 0
+
+    @action(detail=False)
+    def nearest(self, request, *args, **kwargs):
+        query_serializer = NearestQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        params = query_serializer.validated_data
+        queryset = geo.nearest(self.filter_queryset(self.get_queryset()),
+                               params['lat'], params['lng'], params['k'])
+        serializer = SiteProfileDistanceSerializer(queryset, many=True, context=self.get_serializer_context())
+        return Response(serializer.data)
+
+    @action(detail=False)
+    def autocomplete(self, request, *args, **kwargs):
+        query_serializer = AutocompleteQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        params = query_serializer.validated_data
+        organization_uuid = request.session['jwt_organization_uuid']
+        key = (params['prefix'], params['limit'])
+        siteprofiles = autocomplete.cache.get(organization_uuid, key)
+        if siteprofiles is None:
+            siteprofiles = autocomplete.search(self.get_queryset(), params['prefix'], params['limit'])
+            autocomplete.cache.set(organization_uuid, key, siteprofiles)
+        return Response(SiteProfileAutocompleteSerializer(siteprofiles, many=True).data)
+
+    @action(detail=False)
+    def markers(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).only(
+            'uuid', 'name', 'latitude', 'longitude', 'profiletype')
+        page = self.paginate_queryset(queryset)
+        serializer = SiteProfileMarkerSerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False)
+    def clusters(self, request, *args, **kwargs):
+        query_serializer = ClustersQuerySerializer(data=request.query_params)
+        query_serializer.is_valid(raise_exception=True)
+        clusters = geo.clusters(self.filter_queryset(self.get_queryset()),
+                                query_serializer.validated_data['zoom'])
+        serializer = SiteProfileClusterSerializer(clusters, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, url_path=r'tiles/(?P<z>[0-9]+)/(?P<x>[0-9]+)/(?P<y>[0-9]+)\.mvt',
+            renderer_classes=(renderers.JSONRenderer, renderers.VectorTileRenderer))
+    def tiles(self, request, z, x, y, *args, **kwargs):
+        z, x, y = int(z), int(x), int(y)
+        if not tiles.is_valid_tile(z, x, y):
+            raise Http404
+        min_longitude, min_latitude, max_longitude, max_latitude = tiles.tile_bounds(z, x, y)
+        rows = self.filter_queryset(self.get_queryset()).filter(
+            geo.bounding_box_q(min_latitude, max_latitude, [(min_longitude, max_longitude)])
+        ).order_by().values_list('uuid', 'name', 'profiletype', 'latitude', 'longitude')
+        points = ((float(longitude), float(latitude), {'id': str(uuid), 'name': name, 'profiletype': profiletype})
+                  for uuid, name, profiletype, latitude, longitude in rows.iterator())
+        return HttpResponse(tiles.encode_points('siteprofiles', points, z, x, y),
+                            content_type=tiles.CONTENT_TYPE)
+
+    @action(detail=False, methods=['post'])
+    def batch_get(self, request, *args, **kwargs):
+        uuids = serializers.ListField(child=serializers.UUIDField()).run_validation(request.data)
+        if len(uuids) > self.bulk_max_rows:
+            raise ValidationError({'non_field_errors': [f'At most {self.bulk_max_rows} UUIDs are allowed.']})
+        uuids = list(dict.fromkeys(uuids))
+
+        siteprofiles = {}
+        queryset = self.get_queryset()
+        for start in range(0, len(uuids), self.batch_get_chunk_size):
+            siteprofiles.update(
+                (siteprofile.pk, siteprofile)
+                for siteprofile in queryset.filter(pk__in=uuids[start:start + self.batch_get_chunk_size]))
+        serializer = self.get_serializer([siteprofiles[uuid] for uuid in uuids if uuid in siteprofiles], many=True)
+        return Response({'results': serializer.data, 'missing': [uuid for uuid in uuids if uuid not in siteprofiles]})
+
+    def _get_bulk_rows(self, request):
+        rows = request.data
+        if not isinstance(rows, list):
+            raise ValidationError({'non_field_errors': ['Expected a list of SiteProfiles.']})
+        if len(rows) > self.bulk_max_rows:
+            raise ValidationError({'non_field_errors': [f'At most {self.bulk_max_rows} SiteProfiles are allowed.']})
+        return rows
+
+    def _get_bulk_serializer(self, rows, serializer_class=SiteProfileSerializer, external_ids=None):
+        """
+        Return a serializer that resolves the ProfileTypes referenced by the
+        rows from a single query. Unless the taken `external_ids` are given,
+        the ones of the rows that already exist are read with one query too.
+        """
+        profiletype_ids, row_external_ids = set(), set()
+        for row in rows:
+            try:
+                profiletype_ids.add(int(row['profiletype']))
+            except (KeyError, TypeError, ValueError):
+                pass
+            try:
+                row_external_ids.add(str(row['external_id']))
+            except (KeyError, TypeError):
+                pass
+        if external_ids is None and row_external_ids:
+            external_ids = set(self.get_queryset().filter(
+                external_id__in=row_external_ids).values_list('external_id', flat=True))
+        context = self.get_serializer_context()
+        context['profiletypes'] = ProfileType.objects.in_bulk(profiletype_ids)
+        context['external_ids'] = external_ids or set()
+        return serializer_class(context=context)
+
+    def _validate_bulk_rows(self, request, **kwargs):
+        """Return `(validated_rows, errors)` of the SiteProfiles in the request body."""
+        organization_uuid = request.session['jwt_organization_uuid']
+        rows = [dict(row, organization_uuid=organization_uuid) if isinstance(row, dict) else row
+                for row in self._get_bulk_rows(request)]
+        return validate_many(self._get_bulk_serializer(rows, **kwargs), rows)
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request, *args, **kwargs):
+        organization_uuid = request.session['jwt_organization_uuid']
+        validated_rows, errors = self._validate_bulk_rows(request)
+
+        siteprofiles = SiteProfile.objects.bulk_create(
+            [SiteProfile(**dict(attrs, organization_uuid=organization_uuid)) for _, attrs in validated_rows],
+            batch_size=self.bulk_batch_size)
+        created = [{'index': index, 'id': siteprofile.uuid}
+                   for (index, _), siteprofile in zip(validated_rows, siteprofiles)]
+        if not errors:
+            response_status = status.HTTP_201_CREATED
+        elif created:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({'created': created, 'errors': errors}, status=response_status)
+
+    def _get_bulk_selection(self, request, serializer_class=SiteProfileBulkSelectionSerializer):
+        """
+        Return the validated request body and a queryset of the SiteProfiles
+        selected by its `uuids` and the filter query parameters, which can be
+        updated or deleted with a single statement.
+        """
+        serializer = serializer_class(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        selection = serializer.validated_data
+        queryset = self.filter_queryset(self.get_queryset())
+        # Only parameters that narrow the query select SiteProfiles, e.g. `radius_km` without `near` does not.
+        if 'uuids' not in selection and not is_filtered(queryset, self.get_queryset()):
+            raise ValidationError({'non_field_errors': ['Select the SiteProfiles with `uuids` or filter parameters.']})
+        if 'uuids' in selection:
+            queryset = queryset.filter(pk__in=selection['uuids'])
+        # Filters may annotate the queryset (e.g. `near`), so the statement
+        # selects the primary keys with a subquery.
+        return selection, self.get_queryset().filter(pk__in=queryset.order_by().values('pk'))
+
+    @bulk.mapping.patch
+    def bulk_update(self, request, *args, **kwargs):
+        selection, queryset = self._get_bulk_selection(request, SiteProfileBulkPatchSerializer)
+        serializer = SiteProfileBulkUpdateSerializer(
+            data=dict(selection['values'], organization_uuid=request.session['jwt_organization_uuid']),
+            partial=True, context=self.get_serializer_context())
+        if not serializer.is_valid():
+            raise ValidationError({'values': serializer.errors})
+        values = dict(serializer.validated_data)
+        values.pop('organization_uuid', None)
+        updated = queryset.update(edit_date=timezone.now(), content_hash='', **values)
+        return Response({'updated': updated})
+
+    @bulk.mapping.delete
+    def bulk_destroy(self, request, *args, **kwargs):
+        _, queryset = self._get_bulk_selection(request)
+        deleted, _ = queryset.delete()
+        return Response({'deleted': deleted})
+
+    @action(detail=False, methods=['post'], url_path='bulk/workflowlevel2')
+    def workflowlevel2(self, request, *args, **kwargs):
+        selection, queryset = self._get_bulk_selection(request, SiteProfileWorkflowLevel2Serializer)
+        updated = bulk_writes.update_workflowlevel2(
+            queryset, selection['workflowlevel2_uuid'], add=selection['operation'] == 'add')
+        return Response({'updated': updated})
+
+    @action(detail=False, methods=['post'], url_path='bulk/upsert')
+    def upsert(self, request, *args, **kwargs):
+        # Within the request external_ids must be distinct; existing ones are updated.
+        validated_rows, errors = self._validate_bulk_rows(
+            request, serializer_class=SiteProfileUpsertSerializer, external_ids=set())
+        written = bulk_writes.upsert_siteprofiles(
+            request.session['jwt_organization_uuid'], [attrs for _, attrs in validated_rows])
+
+        created, updated, unchanged = [], [], []
+        for index, attrs in validated_rows:
+            if attrs['external_id'] not in written:
+                unchanged.append(index)
+                continue
+            uuid, is_created = written[attrs['external_id']]
+            (created if is_created else updated).append({'index': index, 'id': uuid})
+        if not errors:
+            response_status = status.HTTP_200_OK
+        elif validated_rows:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        return Response({'created': created, 'updated': updated, 'unchanged': unchanged, 'errors': errors},
+                        status=response_status)
+
+    @action(detail=False, url_path=r'export\.ndjson',
+            renderer_classes=(renderers.JSONRenderer, renderers.NDJSONRenderer))
+    def export(self, request, *args, **kwargs):
+        row_serializer = self.get_row_serializer()
+        rows = self.get_rows(row_serializer).order_by()
+        content = export.ndjson_stream(rows.iterator(chunk_size=export.EXPORT_CHUNK_SIZE),
+                                       row_serializer.to_representation)
+        gzip = export.accepts_gzip(request)
+        response = StreamingHttpResponse(export.gzip_stream(content) if gzip else content,
+                                         content_type=export.NDJSON_CONTENT_TYPE)
+        if gzip:
+            response['Content-Encoding'] = 'gzip'
+        response['Vary'] = 'Accept-Encoding'
+        response['Content-Disposition'] = 'attachment; filename="siteprofiles.ndjson"'
+        return response
 
     filter_backends = (django_filters.DjangoFilterBackend,
-                       drf_filters.SearchFilter,
-                       drf_filters.OrderingFilter)
+                       drf_filters.OrderingFilter,
+                       filters.TrigramSearchFilter,
+                       filters.FullTextSearchFilter,
+                       filters.SparseFieldsetFilter)
     filter_class = filters.SiteProfileFilter
     ordering = ('name',)
     permission_classes = (OrganizationPermission,)
     queryset = SiteProfile.objects.all()
     serializer_class = SiteProfileSerializer
     search_fields = ('address_line1', 'postcode', 'city', )
+    sparse_fieldset_actions = ('list', 'retrieve', 'export')
+    change_version_resource = ChangeVersion.SITEPROFILE
+    sparse_fieldset_columns = ('organization_uuid', )  # checked by OrganizationPermission
+
+
+class WorkflowLevel2ViewSet(OrganizationQuerySetMixin,
+                            viewsets.GenericViewSet):
+    """
+    list:
+    Retrieves the number of SiteProfiles per WorkflowLevel2.
+
+    Retrieves the WorkflowLevel2s that have SiteProfiles with the number of
+    their SiteProfiles. Filter by `siteprofile` to find the WorkflowLevel2s
+    of some SiteProfiles, or by `workflowlevel2_uuid`.
+
+    siteprofiles:
+    Retrieves the SiteProfiles of a WorkflowLevel2.
+
+    Retrieves a list of the SiteProfiles whose `workflowlevel2_uuid` contains
+    the given UUID.
+    """
+    queryset = WorkflowLevel2Membership.objects.all()
+    permission_classes = (OrganizationPermission,)
+    serializer_class = WorkflowLevel2CountSerializer
+    pagination_class = AggregateLimitOffsetPagination
+    filter_backends = (django_filters.DjangoFilterBackend, )
+    filter_class = filters.WorkflowLevel2MembershipFilter
+    lookup_field = 'workflowlevel2_uuid'
+    lookup_value_regex = '[^/]+'
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).values('workflowlevel2_uuid').annotate(
+            count=Count('siteprofile')).order_by('workflowlevel2_uuid')
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True)
+    def siteprofiles(self, request, workflowlevel2_uuid=None, *args, **kwargs):
+        queryset = SiteProfile.objects.filter(
+            organization_uuid=request.session['jwt_organization_uuid'],
+            workflowlevel2_memberships__workflowlevel2_uuid=workflowlevel2_uuid,
+        ).order_by('name', 'uuid')
+        page = self.paginate_queryset(queryset)
+        serializer = SiteProfileSerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
@@ -163,6 +163,55 @@ REST_FRAMEWORK = {
         'oauth2_provider_jwt.authentication.JWTAuthentication',
     ),
     'DEFAULT_PAGINATION_CLASS': 'location.pagination.DefaultLimitOffsetPagination',
+    'DEFAULT_RENDERER_CLASSES': (
+        'location.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'location.renderers.MessagePackRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        'location.parsers.MessagePackParser',
+    ),
+}
+
+
+# Location service
+
+# The configured database is a scratch database, on which the benchmark command may run scenarios that lock tables.
+BENCHMARK_SCRATCH_DATABASE = os.getenv('BENCHMARK_SCRATCH_DATABASE') == 'True'
+
+# Build the JSON of SiteProfile lists in Postgres instead of serializing them in Python.
+SITEPROFILE_DATABASE_JSON = os.getenv('SITEPROFILE_DATABASE_JSON') == 'True'
+
+# Cache of the rendered SiteProfile and ProfileType GET responses: '' (disabled), 'local' (an LRU cache in every
+# process, bounded by MAX_ENTRIES and MAX_BYTES) or 'django' (the Django cache CACHE_ALIAS). Every process logs its
+# hits and misses after every LOG_INTERVAL lookups (0 disables the log).
+RESPONSE_CACHE = {
+    'BACKEND': os.getenv('RESPONSE_CACHE_BACKEND', ''),
+    'TIMEOUT': int(os.getenv('RESPONSE_CACHE_TIMEOUT', 300)),
+    'MAX_ENTRIES': int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1000)),
+    'MAX_BYTES': int(os.getenv('RESPONSE_CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+    'MAX_ENTRY_BYTES': int(os.getenv('RESPONSE_CACHE_MAX_ENTRY_BYTES', 1024 * 1024)),
+    'CACHE_ALIAS': os.getenv('RESPONSE_CACHE_ALIAS', 'default'),
+    'LOG_INTERVAL': int(os.getenv('RESPONSE_CACHE_LOG_INTERVAL', 1000)),
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'location.responsecache': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
 }
 
 